@@ -0,0 +1,3 @@
+"""
+Benchmarks of the hot paths of deeplogs, run with ``python -m benchmarks``. See ``benchmarks/__main__.py``.
+"""
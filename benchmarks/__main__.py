@@ -0,0 +1,50 @@
+"""
+Run the benchmarks and save their results as JSON, or compare two saved results.
+
+    python -m benchmarks run [--quick] [-k "reader.*"] [--repeat 3] [--output results.json]
+    python -m benchmarks compare base.json head.json [--threshold 0.1]
+
+Results are saved by default to ``benchmarks/results/{commit}.json``. ``compare`` exits with status 1 when a metric
+regressed by more than the threshold, so that it can gate a change.
+"""
+
+from argparse import ArgumentParser
+import sys
+
+from benchmarks import bench_import, bench_logger, bench_bar, bench_reader
+from benchmarks._runner import run, save, load, compare
+
+def main(argv: list[str] = None) -> int:
+    parser = ArgumentParser(prog="python -m benchmarks", description="Benchmarks of deeplogs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-k", dest="patterns", action="append", default=[], help="benchmarks to run, e.g. 'reader.*'")
+    run_parser.add_argument("--quick", action="store_true", help="use smaller parameters")
+    run_parser.add_argument("--repeat", type=int, default=3, help="repetitions of each run (default: 3)")
+    run_parser.add_argument("--output", "-o", help="path of the JSON results (default: benchmarks/results/{commit}.json)")
+    compare_parser = commands.add_parser("compare", help="compare two results")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="relative change reported (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(args.patterns, args.quick, args.repeat)
+        environment = results["environment"]
+        output = args.output or f"benchmarks/results/{(environment['commit'] or 'unknown')[:12]}{'-dirty' * environment['dirty']}.json"
+        save(results, output)
+        print(f"Results saved to {output}")
+        return 0
+
+    comparison = compare(load(args.base), load(args.head), args.threshold)
+    for entry in comparison:
+        if entry["status"] == "same": continue
+        params = ", ".join(f"{key}={value}" for key, value in entry["params"].items())
+        print(f"{entry['status']:<12} {entry['benchmark']}[{params}] {entry['metric']}: "
+              f"{entry['base']:.4g} -> {entry['head']:.4g} (x{entry['ratio']:.2f})")
+    regressions = sum(entry["status"] == "regression" for entry in comparison)
+    print(f"{len(comparison)} metrics compared, {regressions} regressions")
+    return int(regressions > 0)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+from os import makedirs
+import numpy as np
+
+from deeplogs import Log
+from deeplogs._column import Series
+
+def scalar_rows(nb_rows: int, nb_metrics: int, sparsity: float = 0., seed: int = 0) -> list[dict[str: float]]:
+
+    """
+    Generate the keyword arguments of ``Logger.scalar`` calls: each row holds a random subset of the metrics, in the
+    manner of training metrics logged every step and validation metrics logged every few steps.
+
+    Args:
+        nb_rows (int): Number of rows.
+        nb_metrics (int): Number of distinct metrics.
+        sparsity (float, optional): Probability of a metric being missing from a row. Default is 0.
+        seed (int, optional): Seed of the generator. Default is 0.
+
+    Returns:
+        list of dict[str: float]: The rows, never empty.
+    """
+
+    rng = np.random.default_rng(seed)
+    values = rng.standard_normal((nb_rows, nb_metrics))
+    present = rng.random((nb_rows, nb_metrics)) >= sparsity
+    present[:, 0] = True
+    names = [f"metric{i}" for i in range(nb_metrics)]
+    return [
+        {name: value for name, value, keep in zip(names, row.tolist(), mask) if keep}
+        for row, mask in zip(values, present)
+    ]
+
+def session(name: str, nb_rows: int, nb_metrics: int, sparsity: float = 0., seed: int = 0) -> Log:
+
+    """
+    Generate a session with float timesteps and sparse float metrics, the first metric being dense.
+
+    Args:
+        name (str): Name of the session.
+        nb_rows (int): Number of rows.
+        nb_metrics (int): Number of distinct metrics.
+        sparsity (float, optional): Probability of a metric being missing from a row. Default is 0.
+        seed (int, optional): Seed of the generator. Default is 0.
+
+    Returns:
+        Log: The session.
+    """
+
+    rng = np.random.default_rng(seed)
+    logs = {}
+    for i in range(nb_metrics):
+        rows = np.arange(nb_rows) if i == 0 else np.flatnonzero(rng.random(nb_rows) >= sparsity)
+        logs[f"metric{i}"] = Series(rows, np.cumsum(rng.standard_normal(len(rows))))
+    return Log(name, "benchmark session", {"lr": 1e-3, "seed": seed}, np.arange(nb_rows, dtype=np.int64), logs)
+
+def write_sessions(
+    folder_path: str,
+    nb_sessions: int,
+    nb_rows: int,
+    nb_metrics: int,
+    sparsity: float = 0.,
+) -> list[str]:
+
+    """
+    Write sessions to a log folder, as ``Logger`` would but without its background thread and catalog.
+
+    Args:
+        folder_path (str): The log folder, ending with a separator.
+        nb_sessions (int): Number of sessions.
+        nb_rows (int): Number of rows of each session.
+        nb_metrics (int): Number of distinct metrics of each session.
+        sparsity (float, optional): Probability of a metric being missing from a row. Default is 0.
+
+    Returns:
+        list of str: The names of the sessions.
+    """
+
+    names = [f"session{i:05d}" for i in range(nb_sessions)]
+    for seed, name in enumerate(names):
+        makedirs(f"{folder_path}{name}/", exist_ok=True)
+        session(name, nb_rows, nb_metrics, sparsity, seed).save(f"{folder_path}{name}/.log")
+    return names
+
+def images(batch_size: int, size: int = 64, seed: int = 0) -> np.ndarray:
+
+    """
+    Generate a batch of float32 RGB images in [0, 1], in the "NCHW" format.
+
+    Args:
+        batch_size (int): Number of images.
+        size (int, optional): Height and width of the images. Default is 64.
+        seed (int, optional): Seed of the generator. Default is 0.
+
+    Returns:
+        np.ndarray: The images.
+    """
+
+    return np.random.default_rng(seed).random((batch_size, 3, size, size), dtype=np.float32)
@@ -0,0 +1,229 @@
+from typing import Any, Callable
+from dataclasses import dataclass, field
+from itertools import product
+from statistics import median
+from datetime import datetime, timezone
+from time import perf_counter
+from fnmatch import fnmatch
+import subprocess
+import platform
+import json
+import os
+
+from deeplogs import __version__
+
+FORMAT_VERSION: int = 1
+
+@dataclass
+class Benchmark():
+
+    """
+    A benchmark function, run once per combination of its parameters.
+
+    Args:
+        name (str): Name of the benchmark, e.g. "logger.scalar".
+        func (Callable): Function called with one value of each parameter as keyword arguments, returning its
+            measurements as a dict of metric names to numbers.
+        params (dict of str to list): Values of each parameter.
+        quick (dict of str to list): Values of the parameters overridden in quick runs.
+    """
+
+    name: str
+    func: Callable[..., dict[str: float]]
+    params: dict[str: list] = field(default_factory=lambda: {})
+    quick: dict[str: list] = field(default_factory=lambda: {})
+
+    def combinations(self, quick: bool = False) -> list[dict[str: Any]]:
+
+        """
+        List the combinations of parameters to run.
+
+        Args:
+            quick (bool, optional): Use the values of quick runs. Default is False.
+
+        Returns:
+            list of dict[str: Any]: The keyword arguments of each run.
+        """
+
+        params = {**self.params, **self.quick} if quick else self.params
+        return [dict(zip(params, values)) for values in product(*params.values())]
+
+BENCHMARKS: dict[str: Benchmark] = {}
+CACHE: dict[Any: Any] = {}
+
+def benchmark(name: str, params: dict[str: list] = {}, quick: dict[str: list] = {}) -> Callable:
+
+    """
+    Register a benchmark function under a name.
+
+    Args:
+        name (str): Name of the benchmark.
+        params (dict of str to list, optional): Values of each parameter. Default is no parameter.
+        quick (dict of str to list, optional): Values of the parameters overridden in quick runs. Default is none.
+    """
+
+    def register(func: Callable) -> Callable:
+        BENCHMARKS[name] = Benchmark(name, func, params, quick)
+        return func
+    return register
+
+def cached(key: Any, factory: Callable[[], Any]) -> Any:
+
+    """
+    Share a fixture (e.g. a folder of sessions) between the repetitions of a benchmark. Fixtures are dropped, and cleaned
+    up if they have a ``cleanup`` method, once all the runs of the benchmark are done.
+
+    Args:
+        key (Any): Key of the fixture.
+        factory (Callable): Function creating the fixture.
+
+    Returns:
+        Any: The fixture.
+    """
+
+    if key not in CACHE: CACHE[key] = factory()
+    return CACHE[key]
+
+def clear_cache() -> None:
+
+    """
+    Drop the fixtures, cleaning them up.
+    """
+
+    for value in CACHE.values():
+        if hasattr(value, "cleanup"): value.cleanup()
+    CACHE.clear()
+
+def timed(func: Callable, *args, **kwargs) -> float:
+
+    """
+    Call a function and return its duration in seconds.
+    """
+
+    start = perf_counter()
+    func(*args, **kwargs)
+    return perf_counter() - start
+
+def is_higher_better(metric: str) -> bool:
+
+    """
+    Whether higher values of a metric are better: rates end with "_per_second", every other metric is a cost.
+    """
+
+    return metric.endswith("_per_second")
+
+def environment() -> dict[str: Any]:
+
+    """
+    Describe the code and the machine the benchmarks run on, so that results are only compared when it makes sense.
+    """
+
+    def git(*args: str) -> str:
+        try: return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError): return None
+
+    return {
+        "deeplogs": __version__,
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def run(patterns: list[str] = [], quick: bool = False, repeat: int = 3, verbose: bool = True) -> dict[str: Any]:
+
+    """
+    Run the registered benchmarks, each combination of parameters ``repeat`` times.
+
+    Args:
+        patterns (list of str, optional): Shell-style patterns of the benchmarks to run, e.g. "reader.*". Default is all.
+        quick (bool, optional): Use the smaller parameters of quick runs. Default is False.
+        repeat (int, optional): Number of repetitions of each run. Default is 3.
+        verbose (bool, optional): Print each result as it is measured. Default is True.
+
+    Returns:
+        dict[str: Any]: The results, with the median and every sample of each metric, ready to be saved as JSON.
+    """
+
+    results = []
+    for bench in BENCHMARKS.values():
+        if patterns and not any(fnmatch(bench.name, pattern) for pattern in patterns): continue
+        try:
+            for params in bench.combinations(quick):
+                samples: dict[str: list[float]] = {}
+                for _ in range(repeat):
+                    for metric, value in bench.func(**params).items(): samples.setdefault(metric, []).append(value)
+                metrics = {metric: median(values) for metric, values in samples.items()}
+                results.append({"benchmark": bench.name, "params": params, "metrics": metrics, "samples": samples})
+                if verbose: print(format_result(results[-1]), flush=True)
+        finally: clear_cache()
+    return {"format": FORMAT_VERSION, "environment": environment(), "quick": quick, "repeat": repeat, "results": results}
+
+def format_result(result: dict[str: Any]) -> str:
+
+    """
+    Format a result on one line.
+    """
+
+    params = ", ".join(f"{key}={value}" for key, value in result["params"].items())
+    metrics = "  ".join(f"{metric}={value:.4g}" for metric, value in result["metrics"].items())
+    return f"{result['benchmark']}[{params}]  {metrics}"
+
+def save(results: dict[str: Any], path: str) -> None:
+
+    """
+    Save results as JSON.
+    """
+
+    directory = os.path.dirname(path)
+    if directory: os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f: json.dump(results, f, indent=2)
+
+def load(path: str) -> dict[str: Any]:
+
+    """
+    Load results saved with ``save``.
+    """
+
+    with open(path) as f: results = json.load(f)
+    if results.get("format") != FORMAT_VERSION: raise ValueError(f"Unsupported benchmark results format in {path}")
+    return results
+
+def compare(base: dict[str: Any], head: dict[str: Any], threshold: float = 0.1) -> list[dict[str: Any]]:
+
+    """
+    Compare the medians of two sets of results, run by run and metric by metric.
+
+    Args:
+        base (dict[str: Any]): The reference results.
+        head (dict[str: Any]): The new results.
+        threshold (float, optional): Relative change beyond which a metric is reported as a regression or an improvement.
+            Default is 0.1 (10%).
+
+    Returns:
+        list of dict[str: Any]: One entry per metric measured in both results, with the "benchmark", "params", "metric",
+        "base" and "head" values, their "ratio" (head / base) and the "status": "regression", "improvement" or "same".
+    """
+
+    def key(result: dict) -> tuple[str, str]:
+        return result["benchmark"], json.dumps(result["params"], sort_keys=True)
+
+    base_results = {key(result): result for result in base["results"]}
+    comparison = []
+    for result in head["results"]:
+        if key(result) not in base_results: continue
+        base_metrics = base_results[key(result)]["metrics"]
+        for metric, value in result["metrics"].items():
+            if metric not in base_metrics: continue
+            reference = base_metrics[metric]
+            ratio = value / reference if reference else float("inf") if value else 1.
+            gain = ratio if is_higher_better(metric) else 1 / ratio if ratio else float("inf")
+            status = "improvement" if gain > 1 + threshold else "regression" if gain < 1 / (1 + threshold) else "same"
+            comparison.append({
+                "benchmark": result["benchmark"], "params": result["params"], "metric": metric,
+                "base": reference, "head": value, "ratio": ratio, "status": status,
+            })
+    return comparison
@@ -0,0 +1,34 @@
+from tempfile import TemporaryDirectory
+from contextlib import redirect_stdout
+from time import perf_counter
+import io
+
+from deeplogs import Bar, Logger
+from benchmarks._runner import benchmark
+
+@benchmark(
+    "bar.iteration",
+    params={"nb_iterations": [100000, 1000000], "logger": [False, True], "render_thread": [False, True]},
+    quick={"nb_iterations": [100000]},
+)
+def iteration(nb_iterations: int, logger: bool, render_thread: bool) -> dict[str: float]:
+
+    """
+    Per-iteration overhead of a Bar wrapping an empty loop, compared to the bare loop. The bar is drawn to a buffer.
+    """
+
+    start = perf_counter()
+    for _ in range(nb_iterations): pass
+    bare_seconds = perf_counter() - start
+    with TemporaryDirectory() as folder, redirect_stdout(io.StringIO()):
+        L = Logger("bench", folder_path=folder + "/") if logger else None
+        if L: L.scalar(0, loss=1., accuracy=0.5)
+        bar = Bar(L, "bench", running_mean_size=10, render_thread=render_thread)
+        start = perf_counter()
+        for _ in bar(range(nb_iterations)): pass
+        bar_seconds = perf_counter() - start
+        if L: L.close()
+    return {
+        "iterations_per_second": nb_iterations / bar_seconds,
+        "overhead_ns_per_iteration": max(bar_seconds - bare_seconds, 0.) / nb_iterations * 1e9,
+    }
@@ -0,0 +1,27 @@
+from time import perf_counter
+import subprocess
+import sys
+
+from benchmarks._runner import benchmark
+
+def interpreter_seconds(code: str) -> float:
+
+    """
+    Wall time of a fresh interpreter running code.
+    """
+
+    start = perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return perf_counter() - start
+
+@benchmark(
+    "import",
+    params={"statement": ["import deeplogs", "from deeplogs import Logger, Bar", "from deeplogs import Reader"]},
+)
+def import_time(statement: str) -> dict[str: float]:
+
+    """
+    Import time of deeplogs in a fresh interpreter, the startup of the interpreter being subtracted.
+    """
+
+    return {"seconds": max(interpreter_seconds(statement) - interpreter_seconds("pass"), 0.)}
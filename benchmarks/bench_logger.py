@@ -0,0 +1,141 @@
+from tempfile import TemporaryDirectory
+from os.path import getsize
+from time import perf_counter
+import numpy as np
+
+from deeplogs import Logger
+from benchmarks._runner import benchmark, cached, timed
+from benchmarks import _data
+
+@benchmark(
+    "logger.scalar",
+    params={"nb_rows": [20000], "nb_metrics": [1, 10, 100], "sparsity": [0., 0.9]},
+    quick={"nb_rows": [2000], "nb_metrics": [1, 10]},
+)
+def scalar(nb_rows: int, nb_metrics: int, sparsity: float) -> dict[str: float]:
+
+    """
+    Throughput of ``Logger.scalar``, the rows being saved by the background thread meanwhile.
+    """
+
+    rows = cached(("rows", nb_rows, nb_metrics, sparsity), lambda: _data.scalar_rows(nb_rows, nb_metrics, sparsity))
+    with TemporaryDirectory() as folder:
+        logger = Logger("bench", folder_path=folder + "/", save_interval=0.5)
+        start = perf_counter()
+        for timestep, row in enumerate(rows): logger.scalar(timestep, **row)
+        seconds = perf_counter() - start
+        logger.close()
+    return {"calls_per_second": nb_rows / seconds, "values_per_second": sum(map(len, rows)) / seconds}
+
+@benchmark(
+    "logger.scalar_sparse",
+    params={"nb_rows": [20000], "nb_sparse": [0, 200, 1000]},
+    quick={"nb_rows": [2000], "nb_sparse": [0, 200]},
+)
+def scalar_sparse(nb_rows: int, nb_sparse: int, every: int = 10) -> dict[str: float]:
+
+    """
+    Cost of a ``Logger.scalar`` call logging ``lr`` and ``loss``, with one of ``nb_sparse`` other metrics every ``every``
+    steps. It should not depend on the number of sparse metrics of the session.
+    """
+
+    def rows() -> list[dict[str: float]]:
+        sparse = lambda timestep: {f"sparse{timestep // every % nb_sparse}": 1.} if nb_sparse and not timestep % every else {}
+        return [{"lr": 1e-3, "loss": 1 / (timestep + 1), **sparse(timestep)} for timestep in range(nb_rows)]
+
+    rows = cached(("sparse_rows", nb_rows, nb_sparse, every), rows)
+    with TemporaryDirectory() as folder:
+        logger = Logger("bench", folder_path=folder + "/", save_interval=0.5)
+        start = perf_counter()
+        for timestep, row in enumerate(rows): logger.scalar(timestep, **row)
+        seconds = perf_counter() - start
+        logger.close()
+    return {"microseconds_per_call": seconds / nb_rows * 1e6}
+
+@benchmark(
+    "logger.scalars_batch",
+    params={"nb_rows": [100000], "nb_metrics": [1, 10, 100], "batch_size": [100, 1000]},
+    quick={"nb_rows": [10000], "nb_metrics": [1, 10]},
+)
+def scalars_batch(nb_rows: int, nb_metrics: int, batch_size: int, sparsity: float = 0.5) -> dict[str: float]:
+
+    """
+    Throughput of ``Logger.scalars_batch``, for metrics pulled back every ``batch_size`` steps with NaN for missing values.
+    """
+
+    def arrays() -> dict[str: np.ndarray]:
+        rng = np.random.default_rng(0)
+        values = rng.standard_normal((nb_metrics, nb_rows))
+        values[1:][rng.random((nb_metrics - 1, nb_rows)) < sparsity] = np.nan
+        return {f"metric{i}": metric for i, metric in enumerate(values)}
+
+    metrics = cached(("arrays", nb_rows, nb_metrics, sparsity), arrays)
+    timesteps = np.arange(nb_rows)
+    with TemporaryDirectory() as folder:
+        logger = Logger("bench", folder_path=folder + "/", save_interval=0.5)
+        start = perf_counter()
+        for first in range(0, nb_rows, batch_size):
+            logger.scalars_batch(
+                timesteps[first:first + batch_size],
+                **{name: values[first:first + batch_size] for name, values in metrics.items()},
+            )
+        seconds = perf_counter() - start
+        logger.close()
+    return {"rows_per_second": nb_rows / seconds}
+
+@benchmark(
+    "logger.save",
+    params={"history": [1000, 10000, 100000], "compression": ["none", "zlib"]},
+    quick={"history": [1000, 10000]},
+)
+def save(history: int, compression: str, nb_metrics: int = 10, nb_new_rows: int = 1000) -> dict[str: float]:
+
+    """
+    Latency and size of the saves of a session: the first save of ``history`` rows, a later save of ``nb_new_rows`` rows
+    (which should not depend on the history), and a full rewrite of the session with ``Log.save``.
+    """
+
+    rows = cached(("rows", history + nb_new_rows, nb_metrics), lambda: _data.scalar_rows(history + nb_new_rows, nb_metrics))
+    with TemporaryDirectory() as folder:
+        logger = Logger(
+            "bench", folder_path=folder + "/", save_interval=1e9, batch_size=len(rows) + 1, queue_size=len(rows) + 1,
+            compression=compression,
+        )
+        path = logger.log_folder_path + ".log"
+        for timestep, row in enumerate(rows[:history]): logger.scalar(timestep, **row)
+        flush_seconds = timed(logger.flush)
+        history_bytes = getsize(path)
+        for timestep, row in enumerate(rows[history:], history): logger.scalar(timestep, **row)
+        append_seconds = timed(logger.flush)
+        logger.close()
+        rewrite_seconds = timed(logger.L.save, f"{folder}/rewrite.log")
+    return {
+        "flush_seconds": flush_seconds,
+        "append_seconds": append_seconds,
+        "rewrite_seconds": rewrite_seconds,
+        "bytes": history_bytes,
+        "bytes_per_value": history_bytes / sum(map(len, rows[:history])),
+    }
+
+@benchmark(
+    "logger.image",
+    params={"batch_size": [1, 16, 64], "image_workers": [0, 2]},
+    quick={"batch_size": [1, 16]},
+)
+def image(batch_size: int, image_workers: int, nb_calls: int = 10, size: int = 64) -> dict[str: float]:
+
+    """
+    Latency of ``Logger.image`` for a batch of RGB images, assembled into a grid and saved as PNG. With image workers,
+    the call only hands the batch over, and the total includes waiting for the workers.
+    """
+
+    img = cached(("images", batch_size, size), lambda: _data.images(batch_size, size))
+    with TemporaryDirectory() as folder:
+        logger = Logger("bench", folder_path=folder + "/", image_workers=image_workers)
+        start = perf_counter()
+        for timestep in range(nb_calls): logger.image(timestep, img, "images", "NCHW")
+        call_seconds = (perf_counter() - start) / nb_calls
+        logger.flush()
+        total_seconds = (perf_counter() - start) / nb_calls
+        logger.close()
+    return {"call_seconds": call_seconds, "seconds_per_batch": total_seconds}
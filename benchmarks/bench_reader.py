@@ -0,0 +1,127 @@
+from tempfile import TemporaryDirectory
+from os import makedirs
+from plotly import io
+import matplotlib
+import matplotlib.pyplot as plt
+
+from deeplogs import Log, Reader
+from benchmarks._runner import benchmark, cached, timed
+from benchmarks import _data
+
+matplotlib.use("Agg")
+io.renderers.default = None
+
+def log_folder(nb_sessions: int, nb_rows: int, nb_metrics: int, sparsity: float = 0.) -> TemporaryDirectory:
+
+    """
+    A temporary log folder of generated sessions, shared by the repetitions of a benchmark.
+    """
+
+    def create() -> TemporaryDirectory:
+        folder = TemporaryDirectory()
+        _data.write_sessions(folder.name + "/", nb_sessions, nb_rows, nb_metrics, sparsity)
+        return folder
+
+    return cached(("sessions", nb_sessions, nb_rows, nb_metrics, sparsity), create)
+
+@benchmark(
+    "reader.load",
+    params={"nb_sessions": [1, 100, 1000, 5000], "workers": [1, 8]},
+    quick={"nb_sessions": [1, 100]},
+)
+def load(nb_sessions: int, workers: int, nb_rows: int = 1000, nb_metrics: int = 5) -> dict[str: float]:
+
+    """
+    Time to list the sessions of a folder (``Reader.__init__``) and to load all of them.
+    """
+
+    folder = log_folder(nb_sessions, nb_rows, nb_metrics).name + "/"
+    reader = None
+    def init() -> None:
+        nonlocal reader
+        reader = Reader(log_folder_path=folder, workers=workers)
+    init_seconds = timed(init)
+    load_seconds = timed(lambda: reader.LS)
+    return {
+        "init_seconds": init_seconds,
+        "load_seconds": load_seconds,
+        "sessions_per_second": nb_sessions / (init_seconds + load_seconds),
+    }
+
+@benchmark(
+    "log.load",
+    params={"nb_rows": [10000, 100000, 1000000], "sparsity": [0., 0.9]},
+    quick={"nb_rows": [10000, 100000]},
+)
+def log_load(nb_rows: int, sparsity: float, nb_metrics: int = 10) -> dict[str: float]:
+
+    """
+    Time to load a single session with ``Log.load`` as its history grows.
+    """
+
+    folder = log_folder(1, nb_rows, nb_metrics, sparsity).name
+    seconds = timed(Log.load, f"{folder}/session00000/.log")
+    return {"seconds": seconds, "rows_per_second": nb_rows / seconds}
+
+def chunked_session(nb_rows: int, chunk_size: int, nb_metrics: int = 10) -> TemporaryDirectory:
+
+    """
+    A temporary log folder holding a single generated session, saved in chunks of ``chunk_size`` rows as a Logger would.
+    """
+
+    def create() -> TemporaryDirectory:
+        folder = TemporaryDirectory()
+        makedirs(f"{folder.name}/session/")
+        path = f"{folder.name}/session/.log"
+        L = _data.session("session", nb_rows, nb_metrics, 0.5)
+        saved = Log(L.name, L.description, L.hyperparams)
+        saved.save(path)
+        for start in range(0, nb_rows, chunk_size):
+            saved.extend([{
+                "start": start,
+                "timestep": L.timestep.take(start, start + chunk_size),
+                "logs": {log_name: series.take_rows(start, start + chunk_size) for log_name, series in L.logs.items()},
+            }])
+            saved.append(path, start)
+        return folder
+
+    return cached(("chunked", nb_rows, chunk_size, nb_metrics), create)
+
+@benchmark(
+    "reader.query",
+    params={"nb_rows": [100000, 1000000], "range_size": [1000, 100000]},
+    quick={"nb_rows": [100000], "range_size": [1000]},
+)
+def query(nb_rows: int, range_size: int, chunk_size: int = 4096) -> dict[str: float]:
+
+    """
+    Time to select the values of a metric over a range of timesteps in the middle of a session that is not loaded, with
+    ``Reader.query`` (reading the overlapping chunks only), against loading the session and slicing its DataFrame.
+    """
+
+    folder = chunked_session(nb_rows, chunk_size).name + "/"
+    start = nb_rows // 2
+    query_seconds = timed(lambda: Reader(log_folder_path=folder, progress=False).query(["metric1"], start, start + range_size))
+    def load_and_slice() -> None:
+        df = Reader(log_folder_path=folder, progress=False).LS[0].scalar_to_dataframe()
+        df.loc[(df.index.get_level_values(1) >= start) & (df.index.get_level_values(1) < start + range_size), ["metric1"]]
+    return {"query_seconds": query_seconds, "load_seconds": timed(load_and_slice)}
+
+@benchmark(
+    "reader.scalar",
+    params={"using": ["matplotlib", "plotly"], "nb_rows": [10000, 1000000]},
+    quick={"nb_rows": [10000]},
+)
+def scalar(using: str, nb_rows: int, nb_sessions: int = 4, nb_metrics: int = 4) -> dict[str: float]:
+
+    """
+    Time to build the figure of ``Reader.scalar`` for loaded sessions: the first call smooths and decimates the curves,
+    the second one reuses the smoothed curves.
+    """
+
+    reader = Reader(log_folder_path=log_folder(nb_sessions, nb_rows, nb_metrics, 0.5).name + "/")
+    reader.LS
+    first_seconds = timed(reader.scalar, using=using)
+    cached_seconds = timed(reader.scalar, using=using)
+    plt.close("all")
+    return {"first_seconds": first_seconds, "cached_seconds": cached_seconds}
@@ -1,5 +1,24 @@
+from typing import TYPE_CHECKING
+from importlib import import_module
+
 from ._version import __version__
 
-from .logger import Logger, Log
-from .bar import Bar
-from .reader import Reader
\ No newline at end of file
+if TYPE_CHECKING:
+    from .logger import Logger, Log
+    from .bar import Bar
+    from .reader import Reader
+
+__all__: list[str] = ["Logger", "Log", "Bar", "Reader"]
+
+# The public classes are imported on first access: training processes only importing Logger and Bar never import
+# pandas, matplotlib, plotly or Pillow.
+_MODULES: dict[str: str] = {"Logger": "logger", "Log": "logger", "Bar": "bar", "Reader": "reader"}
+
+def __getattr__(name: str):
+    if name not in _MODULES: raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{_MODULES[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,92 @@
+from typing import Any
+from os import PathLike
+import json
+
+def import_pyarrow():
+
+    """
+    Import pyarrow, which is an optional dependency.
+    """
+
+    try: import pyarrow
+    except ImportError as error: raise ImportError("Arrow and Parquet support requires pyarrow: pip install deeplogs[arrow]") from error
+    return pyarrow
+
+def is_parquet(path: PathLike|str) -> bool:
+
+    """
+    Whether a path designates a Parquet file, from its extension. Other files are Arrow IPC files.
+    """
+
+    return str(path).endswith((".parquet", ".pq"))
+
+def log_to_arrow(L: Any, logs: list[str] = []):
+
+    """
+    Convert the scalar logs of a Log object to an Arrow table with a "timestep" column and a column per log.
+    Numeric columns without missing values share the memory of the Log. The session metadata is kept in the schema.
+
+    Args:
+        L (Log): The Log object.
+        logs (list of str, optional): Names of the logs to convert. Default is all.
+
+    Returns:
+        pyarrow.Table: The table.
+    """
+
+    pa = import_pyarrow()
+    nb_rows = len(L.timestep)
+    columns = {"timestep": L.timestep.values}
+    for log_name in (logs or L.logs):
+        if log_name not in L.logs: continue
+        series = L.logs[log_name]
+        values = series.to_dense(nb_rows)
+        if series.dtype is not None and series.dtype.kind == "O":
+            values = [None if value is None else value for value in values]
+            try: columns[log_name] = pa.array(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError): columns[log_name] = pa.array([None if value is None else str(value) for value in values])
+        else: columns[log_name] = pa.array(values, from_pandas=True)
+    return pa.table(columns).replace_schema_metadata({
+        "deeplogs.name": L.name,
+        "deeplogs.description": L.description,
+        "deeplogs.hyperparams": json.dumps(L.hyperparams, default=str),
+    })
+
+def write_table(table: Any, path: PathLike|str, parquet: bool = None) -> None:
+
+    """
+    Write an Arrow table to an Arrow IPC file or to a Parquet file.
+
+    Args:
+        table (pyarrow.Table): The table.
+        path (PathLike or str): The destination file.
+        parquet (bool, optional): Write a Parquet file. Default is True if the path ends with ".parquet" or ".pq".
+    """
+
+    pa = import_pyarrow()
+    if parquet or (parquet is None and is_parquet(path)):
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+        return
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer: writer.write_table(table)
+
+def read_table(path: PathLike|str, columns: list[str] = None):
+
+    """
+    Read an Arrow table from an Arrow IPC or Parquet file through a memory map, only reading the requested columns.
+    The columns of an Arrow IPC file are not copied: they point into the memory map.
+
+    Args:
+        path (PathLike or str): The file.
+        columns (list of str, optional): The columns to read. Default is all.
+
+    Returns:
+        pyarrow.Table: The table.
+    """
+
+    pa = import_pyarrow()
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns, memory_map=True)
+    table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    return table if columns is None else table.select([column for column in columns if column in table.column_names])
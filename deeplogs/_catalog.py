@@ -0,0 +1,158 @@
+from os import PathLike
+from os.path import exists
+from pickle import dumps, loads
+from contextlib import closing, nullcontext
+import sqlite3
+import json
+
+from deeplogs._stats import Summary
+
+class Catalog():
+
+    """
+    An SQLite index of the sessions of a log folder, holding their metadata and the shape of their scalar logs,
+    so that runs can be listed and filtered without loading their logs. The ranks of a multi-process session update their
+    own shard entry, and the entries of a session are aggregated when it is read.
+
+    Args:
+        folder_path (PathLike or str): Path to the folder where logs are saved.
+    """
+
+    FILE_NAME: str = ".catalog"
+    TIMEOUT: float = 30.
+
+    def __init__(self, folder_path: PathLike|str):
+        self.path: str = f"{folder_path}{self.FILE_NAME}"
+
+    def connect(self) -> sqlite3.Connection:
+
+        """
+        Open a new connection, so that the catalog can be used from any thread or process. A thread updating the catalog
+        repeatedly can open one and pass it to ``update``.
+
+        Returns:
+            sqlite3.Connection: The connection, to be closed by the caller.
+        """
+
+        connection = sqlite3.connect(self.path, timeout=self.TIMEOUT)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "name TEXT PRIMARY KEY, description TEXT, hyperparams BLOB, "
+            "metrics TEXT, rows INTEGER, last_timestep REAL, summary BLOB)"
+        )
+        columns = [column for _, column, *_ in connection.execute("PRAGMA table_info(sessions)")]
+        if "summary" not in columns:
+            with connection: connection.execute("ALTER TABLE sessions ADD COLUMN summary BLOB")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS shards ("
+            "name TEXT, rank INTEGER, metrics TEXT, rows INTEGER, last_timestep REAL, summary BLOB, PRIMARY KEY (name, rank))"
+        )
+        return connection
+
+    def register(self, name: str, description: str, hyperparams: dict) -> None:
+
+        """
+        Add a session to the catalog, replacing any previous session with the same name and its shard entries.
+
+        Args:
+            name (str): Name of the session.
+            description (str): Description of the session.
+            hyperparams (dict): Hyperparameters of the session.
+        """
+
+        with closing(self.connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, description, dumps(hyperparams), "[]", 0, None, None),
+            )
+            connection.execute("DELETE FROM shards WHERE name = ?", (name,))
+
+    def update(
+        self,
+        name: str,
+        metrics: list[str],
+        rows: int,
+        last_timestep: int|float,
+        summary: dict[str: Summary] = None,
+        rank: int = None,
+        connection: sqlite3.Connection = None,
+    ) -> None:
+
+        """
+        Update the shape and the summary statistics of the scalar logs of a session, or of the shard of one of its ranks.
+
+        Args:
+            name (str): Name of the session.
+            metrics (list of str): Names of the logged metrics.
+            rows (int): Number of saved rows.
+            last_timestep (int or float): Timestep of the last saved row.
+            summary (dict[str: Summary], optional): Summary statistics of the numeric metrics. Default is None.
+            rank (int, optional): Rank of the process that saved the rows. Default is None (single process).
+            connection (sqlite3.Connection, optional): Connection opened with ``connect``, kept open. Default is None,
+                opening a new one.
+        """
+
+        values = (json.dumps(metrics), rows, last_timestep, None if summary is None else dumps(summary))
+        with closing(self.connect()) if connection is None else nullcontext(connection) as connection, connection:
+            if rank is None:
+                connection.execute(
+                    "UPDATE sessions SET metrics = ?, rows = ?, last_timestep = ?, summary = ? WHERE name = ?", (*values, name),
+                )
+            else: connection.execute("INSERT OR REPLACE INTO shards VALUES (?, ?, ?, ?, ?, ?)", (name, rank, *values))
+
+    @staticmethod
+    def __merge_shards(shards: list[tuple]) -> dict:
+
+        """
+        Aggregate the shard entries of a session: the union of the metrics, the largest number of rows and last timestep,
+        and the summary statistics of the values of all the ranks.
+        """
+
+        metrics, summary = {}, {}
+        for shard_metrics, _, _, shard_summary in shards:
+            metrics.update(dict.fromkeys(json.loads(shard_metrics)))
+            for log_name, shard in ({} if shard_summary is None else loads(shard_summary)).items():
+                summary.setdefault(log_name, Summary(shard.sketch.relative_accuracy)).merge(shard)
+        last_timesteps = [last_timestep for _, _, last_timestep, _ in shards if last_timestep is not None]
+        return {
+            "metrics": list(metrics),
+            "rows": max(rows for _, rows, _, _ in shards),
+            "last_timestep": max(last_timesteps) if last_timesteps else None,
+            "summary": summary or None,
+        }
+
+    def read(self, names: list[str] = []) -> dict[str: dict]:
+
+        """
+        Read the entries of the catalog.
+
+        Args:
+            names (list of str, optional): Names of the sessions to read. Default is all.
+
+        Returns:
+            dict[str: dict]: The entries, by session name. Empty if the folder has no catalog.
+        """
+
+        if not exists(self.path): return {}
+        with closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT name, description, hyperparams, metrics, rows, last_timestep, summary FROM sessions"
+            ).fetchall()
+            shards: dict[str: list[tuple]] = {}
+            for name, *shard in connection.execute(
+                "SELECT name, metrics, rows, last_timestep, summary FROM shards ORDER BY name, rank"
+            ): shards.setdefault(name, []).append(shard)
+        return {
+            name: {
+                "name": name,
+                "description": description,
+                "hyperparams": loads(hyperparams),
+                "metrics": json.loads(metrics),
+                "rows": nb_rows,
+                "last_timestep": last_timestep,
+                "summary": None if summary is None else loads(summary),
+                **(self.__merge_shards(shards[name]) if name in shards else {}),
+            }
+            for name, description, hyperparams, metrics, nb_rows, last_timestep, summary in rows
+            if not names or name in names
+        }
@@ -0,0 +1,207 @@
+from typing import Literal
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+import zlib
+import numpy as np
+
+from deeplogs._column import Column, Series
+
+try: import zstandard
+except ImportError: zstandard = None
+
+try: import lz4.frame as lz4
+except ImportError: lz4 = None
+
+TIMESTEP_ENCODINGS: tuple[str] = ("raw", "delta", "delta2")
+VALUE_ENCODINGS: tuple[str] = ("raw", "xor", "float32")
+COMPRESSIONS: tuple[str] = ("none", "zlib", "zstd", "lz4")
+
+def compress(data: bytes, compression: Literal["none", "zlib", "zstd", "lz4"]) -> bytes:
+
+    """
+    Compress bytes with one of the supported compressions. "zstd" and "lz4" require the zstandard and lz4 packages.
+
+    Args:
+        data (bytes): The data.
+        compression (Literal["none", "zlib", "zstd", "lz4"]): The compression.
+
+    Returns:
+        bytes: The compressed data.
+    """
+
+    if compression == "zlib": return zlib.compress(data)
+    if compression == "zstd":
+        if zstandard is None: raise ImportError("The zstd compression requires zstandard: pip install deeplogs[compression]")
+        return zstandard.ZstdCompressor().compress(data)
+    if compression == "lz4":
+        if lz4 is None: raise ImportError("The lz4 compression requires lz4: pip install deeplogs[compression]")
+        return lz4.compress(data)
+    return data
+
+def decompress(data: bytes, compression: Literal["none", "zlib", "zstd", "lz4"]) -> bytes:
+
+    """
+    Decompress bytes compressed with ``compress``.
+
+    Args:
+        data (bytes): The compressed data.
+        compression (Literal["none", "zlib", "zstd", "lz4"]): The compression.
+
+    Returns:
+        bytes: The data.
+    """
+
+    if compression == "zlib": return zlib.decompress(data)
+    if compression == "zstd":
+        if zstandard is None: raise ImportError("The zstd compression requires zstandard: pip install deeplogs[compression]")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == "lz4":
+        if lz4 is None: raise ImportError("The lz4 compression requires lz4: pip install deeplogs[compression]")
+        return lz4.decompress(data)
+    return data
+
+def narrowest_int(values: np.ndarray) -> np.ndarray:
+
+    """
+    Cast integers to the narrowest signed type holding all of them.
+    """
+
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if not len(values) or (values.min() >= info.min and values.max() <= info.max): return values.astype(dtype)
+    return values.astype(np.int64)
+
+def encode_data(data: np.ndarray, encoding: Literal["raw", "delta", "delta2", "xor", "float32"]) -> tuple|np.ndarray:
+
+    """
+    Encode the data array of a column. Integers support "delta" (first differences) and "delta2" (second differences),
+    stored in the narrowest integer type. Floats support "xor" (each value XORed with the previous one, in the manner of
+    Gorilla, which leaves runs of zero bits for the compression) and "float32" (lossy downcast). Other combinations, and
+    object data, are stored raw.
+
+    Args:
+        data (np.ndarray): The data array.
+        encoding (Literal["raw", "delta", "delta2", "xor", "float32"]): The encoding.
+
+    Returns:
+        tuple or np.ndarray: The encoded data, decoded by ``decode_data``.
+    """
+
+    if data.dtype.kind in "iu" and encoding in ("delta", "delta2"):
+        heads, deltas = [], data.astype(np.int64)
+        for _ in range(1 + (encoding == "delta2")):
+            if not len(deltas): break
+            heads.append(int(deltas[0]))
+            deltas = np.diff(deltas)
+        return ("delta", data.dtype, heads, narrowest_int(deltas))
+    if data.dtype.kind == "f" and encoding == "xor":
+        bits = data.view(np.uint64 if data.itemsize == 8 else np.uint32)
+        return ("xor", data.dtype, bits ^ np.concatenate([bits[:1] * 0, bits[:-1]]))
+    if data.dtype == np.float64 and encoding == "float32": return data.astype(np.float32)
+    return data
+
+def decode_data(data: tuple|np.ndarray) -> np.ndarray:
+
+    """
+    Decode a data array encoded with ``encode_data``.
+    """
+
+    if not isinstance(data, tuple): return data
+    if data[0] == "delta":
+        _, dtype, heads, values = data
+        values = values.astype(np.int64)
+        for head in reversed(heads): values = np.concatenate([[head], head + np.cumsum(values)])
+        return values.astype(dtype)
+    _, dtype, bits = data
+    return np.bitwise_xor.accumulate(bits).view(dtype)
+
+def encode_column(column: Column, encoding: Literal["raw", "delta", "delta2", "xor", "float32"]) -> dict:
+
+    """
+    Encode a column into its picklable state, with an encoded data array.
+    """
+
+    state = column.__getstate__()
+    if state["data"] is not None:
+        state["data"] = encode_data(state["data"], encoding)
+        if isinstance(state["data"], np.ndarray): state["dtype"] = state["data"].dtype
+    return state
+
+def decode_column(state: dict) -> Column:
+
+    """
+    Decode a column encoded with ``encode_column``.
+    """
+
+    column = Column(dtype=state["dtype"])
+    column.__setstate__({**state, "data": None if state["data"] is None else decode_data(state["data"])})
+    return column
+
+def check_encoding(
+    timestep_encoding: Literal["raw", "delta", "delta2"] = "raw",
+    value_encoding: Literal["raw", "xor", "float32"] = "raw",
+    compression: Literal["none", "zlib", "zstd", "lz4"] = "none",
+) -> None:
+
+    """
+    Check that encoding arguments of ``encode_chunk`` are known, and that their compression is available.
+    """
+
+    if timestep_encoding not in TIMESTEP_ENCODINGS: raise ValueError(f"Unknown timestep encoding: {timestep_encoding}")
+    if value_encoding not in VALUE_ENCODINGS: raise ValueError(f"Unknown value encoding: {value_encoding}")
+    if compression not in COMPRESSIONS: raise ValueError(f"Unknown compression: {compression}")
+    compress(b"", compression)
+
+def encode_chunk(
+    chunk: dict,
+    timestep_encoding: Literal["raw", "delta", "delta2"] = "raw",
+    value_encoding: Literal["raw", "xor", "float32"] = "raw",
+    compression: Literal["none", "zlib", "zstd", "lz4"] = "none",
+) -> dict:
+
+    """
+    Encode and compress a chunk of rows into the payload of a ``PACKED`` record.
+
+    Args:
+        chunk (dict): The chunk, as appended in ``CHUNK`` records.
+        timestep_encoding (Literal["raw", "delta", "delta2"], optional): Encoding of integer timesteps. Float timesteps
+            are XOR encoded with any encoding but "raw". Default is "raw".
+        value_encoding (Literal["raw", "xor", "float32"], optional): Encoding of float values. "float32" is lossy.
+            Integer values are always delta encoded, as are the rows. Default is "raw".
+        compression (Literal["none", "zlib", "zstd", "lz4"], optional): Compression of the whole chunk. Default is "none".
+
+    Returns:
+        dict: The payload.
+    """
+
+    timestep = chunk["timestep"]
+    if timestep_encoding != "raw" and timestep.dtype is not None and timestep.dtype.kind == "f": timestep_encoding = "xor"
+    encoded = {
+        "start": chunk["start"],
+        "timestep": encode_column(timestep, timestep_encoding),
+        "logs": {
+            log_name: (encode_column(series.rows, "delta"), encode_column(series.values, value_encoding if
+                series.dtype is not None and series.dtype.kind == "f" else "delta"))
+            for log_name, series in chunk["logs"].items()
+        },
+    }
+    return {"compression": compression, "data": compress(dumps(encoded, protocol=HIGHEST_PROTOCOL), compression)}
+
+def decode_chunk(payload: dict) -> dict:
+
+    """
+    Decode the payload of a ``PACKED`` record into a chunk.
+
+    Args:
+        payload (dict): The payload, as returned by ``encode_chunk``.
+
+    Returns:
+        dict: The chunk, as appended in ``CHUNK`` records.
+    """
+
+    encoded = loads(decompress(payload["data"], payload["compression"]))
+    logs = {}
+    for log_name, (rows, values) in encoded["logs"].items():
+        series = Series()
+        series.rows, series.values = decode_column(rows), decode_column(values)
+        logs[log_name] = series
+    return {"start": encoded["start"], "timestep": decode_column(encoded["timestep"]), "logs": logs}
@@ -0,0 +1,628 @@
+from typing import Any, Iterable, TYPE_CHECKING
+from bisect import bisect_left
+import numpy as np
+
+if TYPE_CHECKING: import pandas as pd
+
+class Column():
+
+    """
+    A growable typed array with amortized doubling and a validity bitmap.
+
+    Values are stored unboxed in a NumPy array (bool, int64, float32 or float64, object as a fallback for non numeric
+    values). Missing values (``None``) only cost one bit in the validity bitmap and are stored as ``NaN`` in float columns.
+    Appended values are buffered in a list and stored by blocks of ``PENDING_SIZE``, or when the column is read.
+    The type is widened without loss as values arrive (e.g. float32 to float64 when a float64 or an int is appended),
+    unless it was given explicitly.
+
+    Args:
+        values (Iterable, optional): Initial values of the column, ``None`` marking a missing value. Default is empty.
+        dtype (str or np.dtype, optional): Type of the stored values, values of other numeric types being cast to it.
+            Default is inferred from the values.
+    """
+
+    INITIAL_CAPACITY: int = 16
+    PENDING_SIZE: int = 1024
+
+    def __init__(self, values: Iterable = (), dtype: str|np.dtype = None):
+        self.__dtype: np.dtype = np.dtype(dtype) if dtype is not None else None
+        self.__fixed: bool = dtype is not None
+        self.__data: np.ndarray = None
+        self.__valid: np.ndarray = np.zeros(0, np.uint8)
+        self.__size: int = 0
+        self.__null_count: int = 0
+        self.__pending: list = []
+        if not isinstance(values, tuple) or values: self.extend(values)
+
+    @staticmethod
+    def __infer_dtype(value: Any) -> np.dtype:
+
+        """
+        Infer the storage type of a value.
+        """
+
+        dtype = np.asarray(value).dtype
+        if dtype.kind == "b": return np.dtype(bool)
+        if dtype.kind in "iu": return np.dtype(np.int64)
+        if dtype.kind == "f": return np.dtype(np.float32) if dtype.itemsize <= 4 else np.dtype(np.float64)
+        return np.dtype(object)
+
+    @staticmethod
+    def __fill_value(dtype: np.dtype) -> Any:
+
+        """
+        Value stored in the slots of missing values.
+        """
+
+        return {"f": np.nan, "i": 0, "b": False}.get(dtype.kind)
+
+    @property
+    def dtype(self) -> np.dtype:
+        self.__flush()
+        return self.__dtype
+
+    @property
+    def null_count(self) -> int:
+        self.__flush()
+        return self.__null_count
+
+    @property
+    def values(self) -> np.ndarray:
+
+        """
+        A read-only view (no copy) on the stored values. Missing values are ``NaN`` in float columns, ``0`` in int columns
+        and ``False`` in bool columns.
+        """
+
+        self.__flush()
+        if self.__data is None: return np.full(self.__size, np.nan)
+        values = self.__data[:self.__size]
+        values.flags.writeable = False
+        return values
+
+    @property
+    def valid(self) -> np.ndarray:
+
+        """
+        A boolean array, True where a value is present.
+        """
+
+        self.__flush()
+        return np.unpackbits(self.__valid, count=self.__size, bitorder="little").view(bool)
+
+    def __valid_range(self, start: int, end: int) -> np.ndarray:
+
+        """
+        The validity of the values in ``[start, end)``, only unpacking the bytes of the range.
+        """
+
+        if self.__null_count == 0: return np.ones(end - start, bool)
+        bits = np.unpackbits(self.__valid[start // 8:(end + 7) // 8], bitorder="little").view(bool)
+        return bits[start % 8:start % 8 + end - start]
+
+    def __promote(self, dtype: np.dtype) -> None:
+
+        """
+        Change the storage type so that values of type ``dtype`` can be stored without loss.
+        """
+
+        if self.__dtype is None: new_dtype = dtype
+        elif self.__dtype.kind == "O" or self.__dtype == dtype: return
+        elif dtype.kind == "O": new_dtype = np.dtype(object)
+        elif self.__fixed or dtype.kind == "b": return
+        elif self.__dtype.kind == "b": new_dtype = dtype
+        elif self.__dtype.kind == "i" and dtype.kind == "i": return
+        elif self.__dtype.kind == "f" and self.__dtype.itemsize >= 8: return
+        else: new_dtype = np.dtype(np.float64)
+        self.__dtype = new_dtype
+        data = np.full(self.__valid.size * 8, self.__fill_value(new_dtype), new_dtype)
+        if self.__data is not None:
+            valid = self.valid
+            data[:self.__size][valid] = self.__data[:self.__size][valid]
+        self.__data = data
+
+    def __reserve(self, size: int) -> None:
+
+        """
+        Grow the buffers, doubling their capacity, so that they can hold at least ``size`` values.
+        """
+
+        capacity = self.__valid.size * 8
+        if size <= capacity: return
+        capacity = max(capacity, self.INITIAL_CAPACITY)
+        while capacity < size: capacity *= 2
+        self.__valid = np.concatenate([self.__valid, np.zeros(capacity // 8 - self.__valid.size, np.uint8)])
+        if self.__dtype is not None:
+            data = np.full(capacity, self.__fill_value(self.__dtype), self.__dtype)
+            if self.__data is not None: data[:self.__size] = self.__data[:self.__size]
+            self.__data = data
+
+    def __write_valid(self, start: int, valid: np.ndarray) -> None:
+
+        """
+        Write the bits of ``valid`` in the validity bitmap starting at position ``start``.
+        """
+
+        end = start + len(valid)
+        first_byte, last_byte = start // 8, (end + 7) // 8
+        if start % 8 == 0:
+            self.__valid[first_byte:last_byte] = np.packbits(valid, bitorder="little")
+            return
+        bits = np.unpackbits(self.__valid[first_byte:last_byte], bitorder="little")
+        bits[start - first_byte * 8:end - first_byte * 8] = valid
+        self.__valid[first_byte:last_byte] = np.packbits(bits, bitorder="little")
+
+    def append(self, value: Any) -> None:
+
+        """
+        Append a value at the end of the column. It only costs a list append until the pending values are stored.
+
+        Args:
+            value (Any): The value to append, ``None`` for a missing value.
+        """
+
+        self.__pending.append(value)
+        if len(self.__pending) >= self.PENDING_SIZE: self.__flush()
+
+    def __flush(self) -> None:
+
+        """
+        Store the pending appended values in the array.
+        """
+
+        if not self.__pending: return
+        pending, self.__pending = self.__pending, []
+        self.__extend(pending)
+
+    def extend(self, values: Iterable) -> None:
+
+        """
+        Append several values at the end of the column.
+
+        Args:
+            values (Iterable): The values to append, either another Column, a numeric NumPy array, or an iterable with
+                ``None`` for missing values.
+        """
+
+        self.__flush()
+        self.__extend(values)
+
+    def __extend(self, values: Iterable) -> None:
+
+        """
+        Store several values in the array, after the stored values.
+        """
+
+        if isinstance(values, Column):
+            valid, dtypes = values.valid, [values.dtype]
+            present = values.values[valid] if values.null_count else values.values
+        elif isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+            valid, present, dtypes = np.ones(len(values), bool), values, [self.__infer_dtype(values[:0])]
+        else:
+            values = list(values)
+            valid = [value is not None for value in values]
+            present = values if all(valid) else [value for value, is_valid in zip(values, valid) if is_valid]
+            valid = np.array(valid, bool)
+            dtypes = [self.__infer_dtype(value) for value in {type(value): value for value in present}.values()]
+        if not len(valid): return
+        if len(present):
+            for dtype in dtypes: self.__promote(dtype)
+        start, size = self.__size, len(valid)
+        self.__reserve(start + size)
+        if len(present):
+            if self.__dtype.kind == "O":
+                objects = np.empty(len(present), object)
+                for i, value in enumerate(present): objects[i] = value
+                present = objects
+            if len(present) == size: self.__data[start:start + size] = present
+            else: self.__data[start:start + size][valid] = present
+        self.__write_valid(start, valid)
+        self.__null_count += size - len(present)
+        self.__size += size
+
+    @classmethod
+    def concatenate(cls, columns: list):
+
+        """
+        Concatenate several columns at once, which is much faster than extending a column with each of them.
+
+        Args:
+            columns (list of Column): The columns to concatenate.
+
+        Returns:
+            Column: The new column.
+        """
+
+        column = cls()
+        for other in columns: other.__flush()
+        columns = [other for other in columns if len(other)]
+        for other in columns:
+            if len(other) > other.null_count: column.__promote(other.dtype)
+        valid = np.concatenate([other.valid for other in columns]) if columns else np.zeros(0, bool)
+        column.__reserve(len(valid))
+        if column.__dtype is not None:
+            start = 0
+            for other in columns:
+                if len(other) > other.null_count: column.__data[start:start + len(other)] = other.values
+                start += len(other)
+            if column.__dtype.kind != "i": column.__data[:len(valid)][~valid] = column.__fill_value(column.__dtype)
+        column.__write_valid(0, valid)
+        column.__size, column.__null_count = len(valid), len(valid) - int(valid.sum())
+        return column
+
+    def take(self, start: int, end: int = None):
+
+        """
+        Copy a range of the column into a new, trimmed column.
+
+        Args:
+            start (int): Index of the first value.
+            end (int, optional): Index after the last value. Default is the end of the column.
+
+        Returns:
+            Column: The new column.
+        """
+
+        self.__flush()
+        end = self.__size if end is None else min(end, self.__size)
+        start = min(start, end)
+        valid = self.__valid_range(start, end)
+        column = Column(dtype=self.__dtype)
+        column.__setstate__({
+            "dtype": self.__dtype,
+            "data": None if self.__data is None else self.__data[start:end].copy(),
+            "valid": np.packbits(valid, bitorder="little"),
+            "size": end - start,
+            "null_count": end - start - int(valid.sum()),
+            "fixed": self.__fixed,
+        })
+        return column
+
+    def compress(self, keep: np.ndarray):
+
+        """
+        Copy the values selected by a mask into a new, trimmed column.
+
+        Args:
+            keep (np.ndarray): A boolean array of the length of the column, True for the values to copy.
+
+        Returns:
+            Column: The new column.
+        """
+
+        valid = self.valid[keep]
+        column = Column(dtype=self.__dtype)
+        column.__setstate__({
+            "dtype": self.__dtype,
+            "data": None if self.__data is None else self.__data[:self.__size][keep],
+            "valid": np.packbits(valid, bitorder="little"),
+            "size": len(valid),
+            "null_count": len(valid) - int(valid.sum()),
+            "fixed": self.__fixed,
+        })
+        return column
+
+    def tolist(self) -> list:
+
+        """
+        Convert the column to a list of Python objects, with ``None`` for missing values.
+
+        Returns:
+            list: The values of the column.
+        """
+
+        self.__flush()
+        if self.__null_count == 0: return self.values.tolist()
+        return [value if is_valid else None for value, is_valid in zip(self.values.tolist(), self.valid)]
+
+    def __getitem__(self, key: int|slice) -> Any:
+        self.__flush()
+        indices = range(self.__size)[key]
+        if isinstance(indices, int): indices = [indices]
+        values = [self.__data[i] if self.__valid[i >> 3] >> (i & 7) & 1 else None for i in indices]
+        values = [value.item() if isinstance(value, np.generic) else value for value in values]
+        return values if isinstance(key, slice) else values[0]
+
+    def __len__(self) -> int:
+        return self.__size + len(self.__pending)
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Column): return self.tolist() == other.tolist()
+        if isinstance(other, list): return self.tolist() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Column({self.tolist()!r}, dtype={self.__dtype})"
+
+    def __getstate__(self) -> dict:
+        self.__flush()
+        return {
+            "dtype": self.__dtype,
+            "data": None if self.__data is None else self.__data[:self.__size],
+            "valid": self.__valid[:(self.__size + 7) // 8],
+            "size": self.__size,
+            "null_count": self.__null_count,
+            "fixed": self.__fixed,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dtype, self.__size, self.__null_count = state["dtype"], state["size"], state["null_count"]
+        self.__fixed, self.__pending = state.get("fixed", False), []
+        self.__valid = np.array(state["valid"], np.uint8)
+        self.__data = state["data"]
+        if self.__data is not None and self.__data.size != self.__valid.size * 8:
+            data = np.full(self.__valid.size * 8, self.__fill_value(self.__dtype), self.__dtype)
+            data[:self.__size] = self.__data[:self.__size]
+            self.__data = data
+
+class Series():
+
+    """
+    A sparse series of values, each attached to the row (index in ``Log.timestep``) at which it was logged.
+    Appending to a series never touches the other series of a Log, so logging a row only costs the logs it holds.
+    Appended values are buffered in lists, and stored in the columns by blocks or when the series is read.
+
+    Args:
+        rows (Iterable of int, optional): Rows of the values, in strictly increasing order. Default is empty.
+        values (Iterable, optional): The logged values. Default is empty.
+        dtype (str or np.dtype, optional): Type of the stored values. Default is inferred from the values.
+    """
+
+    def __init__(self, rows: Iterable[int] = (), values: Iterable = (), dtype: str|np.dtype = None):
+        self.__rows: Column = Column(rows, np.int64)
+        self.__values: Column = Column(values, dtype)
+        self.__pending_rows: list[int] = []
+        self.__pending_values: list = []
+
+    @property
+    def rows(self) -> Column:
+
+        """
+        The rows of the values.
+        """
+
+        self.__flush()
+        return self.__rows
+
+    @rows.setter
+    def rows(self, rows: Column) -> None:
+        self.__flush()
+        self.__rows = rows
+
+    @property
+    def values(self) -> Column:
+
+        """
+        The logged values.
+        """
+
+        self.__flush()
+        return self.__values
+
+    @values.setter
+    def values(self, values: Column) -> None:
+        self.__flush()
+        self.__values = values
+
+    @property
+    def last_row(self) -> int:
+
+        """
+        The row of the last value, or -1 for an empty series. Reading it does not store the pending values.
+        """
+
+        if self.__pending_rows: return self.__pending_rows[-1]
+        return int(self.__rows.values[-1]) if len(self.__rows) else -1
+
+    def __flush(self) -> None:
+
+        """
+        Store the pending appended values in the columns.
+        """
+
+        if not self.__pending_rows: return
+        rows, values = self.__pending_rows, self.__pending_values
+        self.__pending_rows, self.__pending_values = [], []
+        self.__rows.extend(np.array(rows, np.int64))
+        self.__values.extend(values)
+
+    @classmethod
+    def from_dense(cls, values: Iterable, dtype: str|np.dtype = None):
+
+        """
+        Create a series from a dense list of values, ``None`` marking the rows without a value.
+
+        Args:
+            values (Iterable): The dense values.
+            dtype (str or np.dtype, optional): Type of the stored values. Default is inferred from the values.
+
+        Returns:
+            Series: The created series.
+        """
+
+        rows = [row for row, value in enumerate(values) if value is not None]
+        return cls(rows, [value for value in values if value is not None], dtype)
+
+    @classmethod
+    def from_pandas(cls, values: "pd.Series", dtype: str|np.dtype = None):
+
+        """
+        Create a series from a dense pandas Series, missing values marking the rows without a value.
+
+        Args:
+            values (pd.Series): The dense values.
+            dtype (str or np.dtype, optional): Type of the stored values. Default is inferred from the values.
+
+        Returns:
+            Series: The created series.
+        """
+
+        import pandas as pd
+        present = values.notna().to_numpy()
+        values = values[present]
+        if values.dtype.kind in "biuf": values = values.to_numpy()
+        elif pd.api.types.is_numeric_dtype(values.dtype): values = values.to_numpy(values.dtype.numpy_dtype)
+        return cls(np.flatnonzero(present), values, dtype)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.values.dtype
+
+    def append(self, row: int, value: Any) -> None:
+
+        """
+        Append a value logged at a given row. It only costs two list appends until the pending values are stored.
+
+        Args:
+            row (int): The row of the value, greater than the last row of the series.
+            value (Any): The value to append.
+        """
+
+        self.__pending_rows.append(row)
+        self.__pending_values.append(value)
+        if len(self.__pending_rows) >= Column.PENDING_SIZE: self.__flush()
+
+    def extend(self, series) -> None:
+
+        """
+        Append the values of another series, whose rows all come after the last row of this series.
+
+        Args:
+            series (Series): The series to append.
+        """
+
+        self.rows.extend(series.rows)
+        self.values.extend(series.values)
+
+    @classmethod
+    def concatenate(cls, series: list):
+
+        """
+        Concatenate several series at once, each one starting after the last row of the previous one.
+
+        Args:
+            series (list of Series): The series to concatenate.
+
+        Returns:
+            Series: The new series.
+        """
+
+        concatenated = cls()
+        concatenated.rows = Column.concatenate([other.rows for other in series])
+        concatenated.values = Column.concatenate([other.values for other in series])
+        return concatenated
+
+    def take_rows(self, start: int, end: int = None):
+
+        """
+        Copy the values logged at rows in ``[start, end)`` into a new series.
+
+        Args:
+            start (int): First row.
+            end (int, optional): Row after the last row. Default is the end of the series.
+
+        Returns:
+            Series: The new series.
+        """
+
+        if self.__pending_rows and self.__pending_rows[0] >= start and (not len(self.__rows) or self.__rows.values[-1] < start):
+            rows = self.__pending_rows
+            last = len(rows) if end is None or rows[-1] < end else bisect_left(rows, end)
+            series = Series(rows[:last])
+            series.values = self.__values.take(0, 0)
+            series.values.extend(self.__pending_values[:last])
+            return series
+        rows = self.rows.values
+        first, last = np.searchsorted(rows, [start, np.iinfo(np.int64).max if end is None else end]).tolist()
+        series = Series()
+        series.rows, series.values = self.rows.take(first, last), self.values.take(first, last)
+        return series
+
+    def select_rows(self, keep: np.ndarray, start: int = 0, first: int = 0):
+
+        """
+        Copy the values logged at the rows selected by a mask into a new series, the selected rows being numbered in order
+        from ``first``.
+
+        Args:
+            keep (np.ndarray): A boolean array, True for the rows to select, its first element being row ``start``.
+            start (int, optional): Row of the first element of ``keep``. Default is 0.
+            first (int, optional): New number of the first selected row. Default is 0.
+
+        Returns:
+            Series: The new series.
+        """
+
+        rows = self.rows.values - start
+        kept = keep[rows]
+        series = Series()
+        series.rows = Column(np.cumsum(keep, dtype=np.int64)[rows[kept]] + (first - 1), np.int64)
+        series.values = self.values.compress(kept)
+        return series
+
+    def is_consistent(self, nb_rows: int) -> bool:
+
+        """
+        Check that the series is well formed for a Log with ``nb_rows`` rows.
+
+        Args:
+            nb_rows (int): Number of rows of the Log.
+
+        Returns:
+            bool: True if rows and values have the same length and rows are strictly increasing and lower than ``nb_rows``.
+        """
+
+        rows = self.rows.values
+        if len(rows) != len(self.values): return False
+        return len(rows) == 0 or (rows[0] >= 0 and rows[-1] < nb_rows and bool(np.all(rows[1:] > rows[:-1])))
+
+    def to_dense(self, nb_rows: int) -> np.ndarray:
+
+        """
+        Outer join the series on the rows of a Log. The values are not copied when the series is dense.
+
+        Args:
+            nb_rows (int): Number of rows of the Log.
+
+        Returns:
+            np.ndarray or pd.arrays.IntegerArray or pd.arrays.BooleanArray: The dense values, missing ones being ``NaN``
+            (``<NA>`` for int and bool, ``None`` for object).
+        """
+
+        values, rows = self.values.values, self.rows.values.astype(np.int64, copy=False)
+        if len(values) == nb_rows: return values
+        if self.dtype is None or self.dtype.kind == "f":
+            dense = np.full(nb_rows, np.nan, np.float64 if self.dtype is None else self.dtype)
+        elif self.dtype.kind in "ib":
+            import pandas as pd
+            dense, mask = np.zeros(nb_rows, self.dtype), np.ones(nb_rows, bool)
+            mask[rows] = False
+            dense[rows] = values
+            return pd.arrays.IntegerArray(dense, mask) if self.dtype.kind == "i" else pd.arrays.BooleanArray(dense, mask)
+        else: dense = np.full(nb_rows, None, object)
+        dense[rows] = values
+        return dense
+
+    def __getitem__(self, key: int|slice) -> Any:
+        return self.values[key]
+
+    def __len__(self) -> int:
+        return len(self.__values) + len(self.__pending_values)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, list): other = Series.from_dense(other)
+        if isinstance(other, Series): return self.rows == other.rows and self.values == other.values
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Series(rows={self.rows.tolist()!r}, values={self.values.tolist()!r}, dtype={self.dtype})"
+
+    def __getstate__(self) -> dict:
+        return {"rows": self.rows, "values": self.values}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__rows, self.__values = state["rows"], state["values"]
+        self.__pending_rows, self.__pending_values = [], []
@@ -0,0 +1,78 @@
+import numpy as np
+
+def minmax(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+
+    """
+    Select the points to draw with per-pixel min/max buckets: the x range is split into ``(n_out - 2) // 2`` buckets and the
+    lowest and highest points of each bucket are kept, so that spikes are never lost.
+
+    Args:
+        x (np.ndarray): The x values.
+        y (np.ndarray): The y values, without NaN.
+        n_out (int): Maximum number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points.
+    """
+
+    if len(x) <= n_out: return np.arange(len(x))
+    nb_buckets = max((n_out - 2) // 2, 1)
+    x = np.asarray(x, np.float64)
+    span = x.max() - x.min()
+    buckets = np.zeros(len(x), np.int64) if span == 0 else np.minimum(
+        ((x - x.min()) / span * nb_buckets).astype(np.int64), nb_buckets - 1
+    )
+    if np.all(buckets[1:] >= buckets[:-1]):
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        segments = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(x)]))
+        kept = []
+        for reduce in (np.minimum, np.maximum):
+            extremes = np.flatnonzero(y == reduce.reduceat(y, starts)[segments])
+            kept.append(extremes[np.r_[True, segments[extremes][1:] != segments[extremes][:-1]]])
+    else:
+        order = np.lexsort((y, buckets))
+        sorted_buckets = buckets[order]
+        first = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+        kept = [order[first], order[np.r_[first[1:] - 1, len(order) - 1]]]
+    return np.unique(np.r_[kept[0], kept[1], 0, len(x) - 1])
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+
+    """
+    Select the points to draw with the Largest-Triangle-Three-Buckets algorithm. Each bucket keeps the point forming the
+    largest triangle with the point kept in the previous bucket and the average of the next bucket. Points whose x values
+    do not increase (e.g. a run restarted from a checkpoint) are bucketed in stable x order.
+
+    Args:
+        x (np.ndarray): The x values.
+        y (np.ndarray): The y values, without NaN.
+        n_out (int): Maximum number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points.
+    """
+
+    n = len(x)
+    if n <= n_out or n_out < 3: return np.arange(n)
+    x, y = np.asarray(x, np.float64), np.asarray(y, np.float64)
+    if np.any(x[1:] < x[:-1]):
+        order = np.argsort(x, kind="stable")
+        return np.sort(order[lttb(x[order], y[order], n_out)])
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sums_x, sums_y = np.add.reduceat(x[:-1], edges[:-1]), np.add.reduceat(y[:-1], edges[:-1])
+    counts = np.diff(edges)
+    means_x, means_y = sums_x / counts, sums_y / counts
+    indices = np.empty(n_out, np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_x, next_y = (means_x[i + 1], means_y[i + 1]) if i + 1 < len(means_x) else (x[-1], y[-1])
+        prev_x, prev_y = x[indices[i]], y[indices[i]]
+        areas = np.abs((prev_x - next_x) * (y[start:end] - prev_y) - (prev_x - x[start:end]) * (next_y - prev_y))
+        indices[i + 1] = start + np.argmax(areas)
+    return indices
+
+DOWNSAMPLE: dict = {
+    "minmax": minmax,
+    "lttb": lttb,
+}
@@ -0,0 +1,260 @@
+from typing import Callable, Literal
+from os import PathLike
+from threading import BoundedSemaphore, Condition
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from functools import partial
+import numpy as np
+from math import ceil
+
+from deeplogs._imagestore import encode_image
+
+VALID_FORMAT: str = "NHWC"
+
+def value_range(img: np.ndarray, normalize: Literal["minmax"]|tuple[float, float]|None = None) -> tuple[float, float]:
+
+    """
+    Range of the image data mapped to [0, 255].
+
+    Args:
+        img (np.ndarray): The image data.
+        normalize (Literal["minmax"] or tuple of float or None, optional): "minmax" maps the lowest and highest values of
+            the data, a (low, high) tuple maps the given range. Default is [0, 1] for float and bool data (e.g. masks) and
+            [0, 255] for integer data.
+
+    Returns:
+        tuple[float, float]: The (low, high) range.
+    """
+
+    if normalize == "minmax": return float(img.min()), float(img.max())
+    if normalize is not None: return float(normalize[0]), float(normalize[1])
+    return (0., 1.) if img.dtype == bool or np.issubdtype(img.dtype, np.floating) else (0., 255.)
+
+def to_uint8(img: np.ndarray, low: float, high: float, out: np.ndarray) -> None:
+
+    """
+    Map image data from [low, high] to uint8, clipping outside values, and write it to ``out``.
+    uint8 data in [0, 255] is copied as is, other data goes through a single float32 buffer of the size of ``img``.
+
+    Args:
+        img (np.ndarray): The image data.
+        low (float): Value mapped to 0.
+        high (float): Value mapped to 255.
+        out (np.ndarray): The uint8 destination, with the shape of ``img``.
+    """
+
+    if img.dtype == np.uint8 and (low, high) == (0., 255.):
+        out[...] = img
+        return
+    buffer = img.astype(np.float32)
+    buffer -= low
+    buffer *= 255 / (high - low) if high > low else 0
+    np.clip(buffer, 0, 255, out=buffer)
+    out[...] = buffer
+
+def create_image_grid(
+    img: np.ndarray,
+    padding: int = 0,
+    border: int = 0,
+    pad_value: int = 0,
+    normalize: Literal["minmax"]|tuple[float, float]|None = None,
+) -> np.ndarray:
+
+    """
+    Create a single uint8 image with a grid layout from a batch of images.
+    The grid is allocated once and each image is converted directly into its tile.
+
+    Args:
+        img (np.ndarray): A numpy array representing a batch of images, in "NHWC" format.
+        padding (int, optional): Number of pixels between two images. Default is 0.
+        border (int, optional): Number of pixels around the grid. Default is 0.
+        pad_value (int, optional): Value of the padding and border pixels, and of the empty tiles. Default is 0.
+        normalize (Literal["minmax"] or tuple of float or None, optional): Range of the data mapped to [0, 255], see
+            ``value_range``. Default is [0, 1] for float and bool data and [0, 255] for integer data.
+
+    Returns:
+        np.ndarray: A numpy array representing the grid layout of the images.
+    """
+
+    n, h, w, c = img.shape
+    nrows = int(n**(1/2))
+    ncols = ceil(n / nrows)
+    low, high = value_range(img, normalize)
+    grid = np.full(
+        (nrows*(h+padding) - padding + 2*border, ncols*(w+padding) - padding + 2*border, c), pad_value, np.uint8,
+    )
+    for i in range(n):
+        y, x = border + (i // ncols) * (h+padding), border + (i % ncols) * (w+padding)
+        to_uint8(img[i], low, high, grid[y:y+h, x:x+w])
+    return grid
+
+def prepare_image(
+    img: np.ndarray,
+    image_format: str,
+    padding: int = 0,
+    border: int = 0,
+    pad_value: int = 0,
+    normalize: Literal["minmax"]|tuple[float, float]|None = None,
+) -> np.ndarray:
+
+    """
+    Convert image data to a uint8 image, assembling batches into a grid.
+
+    Args:
+        img (np.ndarray): The image data, of any bool, integer or float type.
+        image_format (str): Format of the image data, e.g. "NCHW".
+        padding (int, optional): Number of pixels between two images of a batch. Default is 0.
+        border (int, optional): Number of pixels around the image or grid. Default is 0.
+        pad_value (int, optional): Value of the padding and border pixels. Default is 0.
+        normalize (Literal["minmax"] or tuple of float or None, optional): Range of the data mapped to [0, 255], see
+            ``value_range``. Default is [0, 1] for float and bool data and [0, 255] for integer data.
+
+    Returns:
+        np.ndarray: The uint8 image, with shape (height, width) or (height, width, color).
+    """
+
+    if "C" not in image_format: img = np.expand_dims(img, -1); image_format += "C"
+    if "N" not in image_format: img = np.expand_dims(img, -1); image_format += "N"
+    transpose_vector = [image_format.find(rf) for rf in VALID_FORMAT]
+    img = create_image_grid(np.asarray(img).transpose(transpose_vector), padding, border, pad_value, normalize)
+    return img[:, :, 0] if img.shape[2] == 1 else img
+
+def save_image(img: np.ndarray, image_format: str, path: PathLike|str, **options) -> None:
+
+    """
+    Convert image data and save it as a PNG file. Defined at module level so that it can run in a process pool.
+
+    Args:
+        img (np.ndarray): The image data.
+        image_format (str): Format of the image data, e.g. "NCHW".
+        path (PathLike or str): The destination file.
+        **options: Grid and normalization options, see ``prepare_image``.
+    """
+
+    from PIL import Image
+    Image.fromarray(prepare_image(img, image_format, **options)).save(path)
+
+def encode_frame(img: np.ndarray, image_format: str, codec: Literal["png", "zstd", "webp"], **options) -> bytes:
+
+    """
+    Convert image data and encode it as a frame of an ``ImageStore``. Defined at module level so that it can run in a
+    process pool.
+
+    Args:
+        img (np.ndarray): The image data.
+        image_format (str): Format of the image data, e.g. "NCHW".
+        codec (Literal["png", "zstd", "webp"]): The codec of the store.
+        **options: Grid and normalization options, see ``prepare_image``.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+
+    return encode_image(prepare_image(img, image_format, **options), codec)
+
+class ImageWorkers():
+
+    """
+    A pool of workers encoding and writing images off the training thread.
+
+    Args:
+        workers (int): Number of workers.
+        executor (Literal["thread", "process"], optional): Kind of pool. Processes suit CPU heavy compression. Default is "thread".
+        queue_size (int, optional): Maximum number of images waiting or being processed. Default is 16.
+        policy (Literal["block", "drop"], optional): What to do with a new image when ``queue_size`` images are pending:
+            wait for a free slot, or drop the image. Default is "block".
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        executor: Literal["thread", "process"] = "thread",
+        queue_size: int = 16,
+        policy: Literal["block", "drop"] = "block",
+    ):
+        Executor = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+        self.__executor = Executor(workers)
+        self.__slots: BoundedSemaphore = BoundedSemaphore(queue_size)
+        self.__condition: Condition = Condition()
+        self.__pending: int = 0
+        self.__errors: list[Exception] = []
+        self.policy = policy
+        self.dropped: int = 0
+
+    def submit(self, func: Callable, *args, callback: Callable = None) -> bool:
+
+        """
+        Run a function on the workers, applying the queue policy.
+
+        Args:
+            func (Callable): The function, picklable for a process pool.
+            *args: Arguments of the function.
+            callback (Callable, optional): Called in the calling process with the result of the function, e.g. to write
+                it to a file shared by all the workers. Default is None.
+
+        Returns:
+            bool: False if the call was dropped.
+        """
+
+        if not self.__slots.acquire(blocking=self.policy == "block"):
+            self.dropped += 1
+            return False
+        with self.__condition: self.__pending += 1
+        try: future = self.__executor.submit(func, *args)
+        except Exception:
+            self.__finish()
+            raise
+        future.add_done_callback(partial(self.__done, callback))
+        return True
+
+    def __done(self, callback: Callable, future: Future) -> None:
+
+        """
+        Run the callback of a finished call and free its slot, keeping its error for ``flush``.
+        """
+
+        try:
+            result = future.result()
+            if callback is not None: callback(result)
+        except Exception as error:
+            with self.__condition: self.__errors.append(error)
+        finally: self.__finish()
+
+    def __finish(self) -> None:
+
+        """
+        Free the slot of a call and wake up ``flush`` when no call is pending anymore.
+        """
+
+        self.__slots.release()
+        with self.__condition:
+            self.__pending -= 1
+            self.__condition.notify_all()
+
+    def flush(self) -> None:
+
+        """
+        Wait for every pending call, raising the first error that happened in a worker.
+        """
+
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__pending == 0)
+            errors, self.__errors = self.__errors, []
+        if errors: raise errors[0]
+
+    @property
+    def pending(self) -> int:
+
+        """
+        Number of calls waiting or being processed.
+        """
+
+        return self.__pending
+
+    def close(self) -> None:
+
+        """
+        Wait for every pending call and stop the workers.
+        """
+
+        try: self.flush()
+        finally: self.__executor.shutdown()
@@ -0,0 +1,166 @@
+from typing import Literal
+from os import PathLike, listdir, remove
+from os.path import exists, getsize
+from io import BytesIO
+from struct import Struct
+from threading import Lock
+import numpy as np
+
+try: import zstandard
+except ImportError: zstandard = None
+
+CODECS: dict[str: int] = {
+    "png": 0,
+    "zstd": 1,
+    "webp": 2,
+}
+
+INDEX_ENTRY: np.dtype = np.dtype([("timestep", "<f8"), ("offset", "<u8"), ("length", "<u4"), ("codec", "u1")])
+RAW_HEADER: Struct = Struct("<III")
+
+def encode_image(img: np.ndarray, codec: Literal["png", "zstd", "webp"] = "png") -> bytes:
+
+    """
+    Encode a uint8 image. Defined at module level so that it can run in a process pool.
+
+    Args:
+        img (np.ndarray): The image, with shape (height, width) or (height, width, color).
+        codec (Literal["png", "zstd", "webp"], optional): "png" and "webp" (lossless) produce standard image files,
+            "zstd" compresses the raw pixels, which is the fastest. Default is "png".
+
+    Returns:
+        bytes: The encoded frame.
+    """
+
+    if codec == "zstd":
+        if zstandard is None: raise ImportError("The zstd codec requires zstandard: pip install deeplogs[compression]")
+        h, w, c = img.shape if img.ndim == 3 else (*img.shape, 0)
+        return RAW_HEADER.pack(h, w, c) + zstandard.ZstdCompressor().compress(np.ascontiguousarray(img).tobytes())
+    from PIL import Image
+    buffer = BytesIO()
+    if codec == "webp": Image.fromarray(img).save(buffer, "WEBP", lossless=True)
+    else: Image.fromarray(img).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def decode_image(frame: bytes|memoryview, codec: int) -> np.ndarray:
+
+    """
+    Decode a frame encoded with ``encode_image``.
+
+    Args:
+        frame (bytes or memoryview): The encoded frame.
+        codec (int): The codec identifier, from ``CODECS``.
+
+    Returns:
+        np.ndarray: The uint8 image.
+    """
+
+    if codec == CODECS["zstd"]:
+        if zstandard is None: raise ImportError("The zstd codec requires zstandard: pip install deeplogs[compression]")
+        h, w, c = RAW_HEADER.unpack(frame[:RAW_HEADER.size])
+        pixels = zstandard.ZstdDecompressor().decompress(bytes(frame[RAW_HEADER.size:]))
+        return np.frombuffer(pixels, np.uint8).reshape((h, w, c) if c else (h, w))
+    from PIL import Image
+    return np.asarray(Image.open(BytesIO(frame)))
+
+class ImageStore():
+
+    """
+    An append-only container holding all the images of a tag: the encoded frames are appended to ``{tag}.dat``
+    and a fixed-size (timestep, offset, length, codec) entry is appended to ``{tag}.idx`` for each of them.
+    An entry is only written once its frame is, so readers never see a frame that is not complete.
+
+    Args:
+        folder_path (PathLike or str): The images folder of the session.
+        tag (str): The tag of the images.
+        codec (Literal["png", "zstd", "webp"], optional): Codec of the appended images. Default is "png".
+    """
+
+    def __init__(self, folder_path: PathLike|str, tag: str, codec: Literal["png", "zstd", "webp"] = "png"):
+        if codec not in CODECS: raise ValueError(f"Unknown image codec: {codec}")
+        self.data_path: str = f"{folder_path}{tag}.dat"
+        self.index_path: str = f"{folder_path}{tag}.idx"
+        self.codec = codec
+        self.__lock: Lock = Lock()
+        self.__data = None
+        self.__index = None
+
+    def append(self, timestep: int|float, frame: bytes) -> None:
+
+        """
+        Append an encoded frame. Thread safe.
+
+        Args:
+            timestep (int or float): The timestep of the image.
+            frame (bytes): The frame, encoded with ``encode_image`` and the codec of the store.
+        """
+
+        with self.__lock:
+            if self.__data is None:
+                self.__data, self.__index = open(self.data_path, "ab"), open(self.index_path, "ab")
+            offset = self.__data.tell()
+            self.__data.write(frame)
+            self.__data.flush()
+            self.__index.write(np.array([(timestep, offset, len(frame), CODECS[self.codec])], INDEX_ENTRY).tobytes())
+            self.__index.flush()
+
+    def close(self) -> None:
+
+        """
+        Close the files of the store. It is opened again by the next ``append``.
+        """
+
+        with self.__lock:
+            if self.__data is None: return
+            self.__data.close(); self.__index.close()
+            self.__data = self.__index = None
+
+    @staticmethod
+    def reset(folder_path: PathLike|str) -> None:
+
+        """
+        Remove the stores of an images folder, e.g. left by a previous run of a session started again under the same name.
+
+        Args:
+            folder_path (PathLike or str): The images folder of the session.
+        """
+
+        if not exists(folder_path): return
+        for file_name in listdir(folder_path):
+            if file_name.endswith((".dat", ".idx")): remove(f"{folder_path}{file_name}")
+
+    @staticmethod
+    def read(
+        folder_path: PathLike|str,
+        tag: str,
+        timesteps: tuple[int|float, int|float]|list[int|float] = None,
+    ) -> list[tuple[float, np.ndarray]]:
+
+        """
+        Read images from a store through memory maps, only decoding the requested frames.
+
+        Args:
+            folder_path (PathLike or str): The images folder of the session.
+            tag (str): The tag of the images.
+            timesteps (tuple or list of int or float, optional): A (start, stop) tuple selecting the timesteps in
+                ``[start, stop)``, or a list of timesteps. Default is all.
+
+        Returns:
+            list[tuple[float, np.ndarray]]: The (timestep, image) pairs in timestep order, the images logged several times
+            at a timestep being all kept in the order they were saved. Empty if the tag has no store.
+        """
+
+        index_path = f"{folder_path}{tag}.idx"
+        if not exists(index_path): return []
+        nb_entries = getsize(index_path) // INDEX_ENTRY.itemsize
+        if nb_entries == 0: return []
+        index = np.memmap(index_path, INDEX_ENTRY, "r", shape=(nb_entries,))
+        index = index[np.argsort(index["timestep"], kind="stable")]
+        if isinstance(timesteps, tuple): index = index[(index["timestep"] >= timesteps[0]) & (index["timestep"] < timesteps[1])]
+        elif timesteps is not None: index = index[np.isin(index["timestep"], timesteps)]
+        if len(index) == 0: return []
+        data = np.memmap(f"{folder_path}{tag}.dat", np.uint8, "r")
+        return [
+            (float(timestep), decode_image(data[offset:offset+length], codec))
+            for timestep, offset, length, codec in index.tolist()
+        ]
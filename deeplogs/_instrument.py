@@ -0,0 +1,208 @@
+from typing import Any, Callable, Literal
+from threading import Lock
+from time import monotonic
+import re
+
+from deeplogs._sketch import Sketch
+
+PREFIX: str = "_deeplogs/"
+QUANTILES: tuple[float] = (0.5, 0.9, 0.99)
+
+class Timer():
+
+    """
+    Latency of an operation: the number of calls, their cumulative and maximum duration, and a quantile sketch of the
+    durations. Durations are buffered and folded into the sketch in batches, so that recording one costs a list append.
+    Thread safe.
+    """
+
+    BUFFER_SIZE: int = 256
+
+    def __init__(self):
+        self.count: int = 0
+        self.total: float = 0.
+        self.max: float = 0.
+        self.sketch: Sketch = Sketch()
+        self.__buffer: list[float] = []
+        self.__lock: Lock = Lock()
+
+    def record(self, seconds: float) -> None:
+
+        """
+        Record the duration of a call.
+
+        Args:
+            seconds (float): The duration, in seconds.
+        """
+
+        with self.__lock:
+            self.__buffer.append(seconds)
+            if len(self.__buffer) >= self.BUFFER_SIZE: self.__fold()
+
+    def __fold(self) -> None:
+
+        """
+        Fold the buffered durations into the statistics. The lock must be held.
+        """
+
+        if not self.__buffer: return
+        buffer, self.__buffer = self.__buffer, []
+        self.count += len(buffer)
+        self.total += sum(buffer)
+        self.max = max(self.max, max(buffer))
+        self.sketch.add(buffer)
+
+    def to_dict(self) -> dict[str: float]:
+
+        """
+        Snapshot of the statistics.
+
+        Returns:
+            dict[str: float]: The "count", "total_seconds", "mean_seconds", "max_seconds" and quantiles (e.g. "p99_seconds").
+        """
+
+        with self.__lock:
+            self.__fold()
+            quantiles = self.sketch.quantile(QUANTILES)
+            return {
+                "count": self.count,
+                "total_seconds": self.total,
+                "mean_seconds": self.total / self.count if self.count else 0.,
+                "max_seconds": self.max,
+                **{f"p{q * 100:g}_seconds": float(value) if self.count else 0. for q, value in zip(QUANTILES, quantiles)},
+            }
+
+class Instruments():
+
+    """
+    Counters, gauges and timers measuring the time and bytes spent inside deeplogs, shared by a Logger and its threads.
+
+    Args:
+        labels (dict[str: Any], optional): Labels of the exported metrics, e.g. the session name. Default is none.
+        interval (float, optional): Time (in seconds) between two snapshots due to be logged in the session. Default is
+            None, never.
+    """
+
+    def __init__(self, labels: dict[str: Any] = {}, interval: float = None):
+        self.labels = labels
+        self.interval = interval
+        self.timers: dict[str: Timer] = {}
+        self.counters: dict[str: int|float] = {}
+        self.observers: dict[str: tuple[str, Callable[[], float]]] = {}
+        self.__lock: Lock = Lock()
+        self.__next_snapshot: float = None if interval is None else monotonic() + interval
+
+    def record(self, name: str, seconds: float) -> None:
+
+        """
+        Record the duration of a call of an operation.
+
+        Args:
+            name (str): Name of the operation, e.g. "scalar".
+            seconds (float): The duration, in seconds.
+        """
+
+        timer = self.timers.get(name)
+        if timer is None:
+            with self.__lock: timer = self.timers.setdefault(name, Timer())
+        timer.record(seconds)
+
+    def add(self, name: str, value: int|float = 1) -> None:
+
+        """
+        Increase a counter.
+
+        Args:
+            name (str): Name of the counter, e.g. "bytes_written".
+            value (int or float, optional): The increase. Default is 1.
+        """
+
+        with self.__lock: self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, func: Callable[[], float], kind: Literal["gauge", "counter"] = "gauge") -> None:
+
+        """
+        Register a value read when the statistics are, e.g. the depth of a queue.
+
+        Args:
+            name (str): Name of the value.
+            func (Callable): Function returning the current value.
+            kind (Literal["gauge", "counter"], optional): "counter" for values that only increase. Default is "gauge".
+        """
+
+        self.observers[name] = (kind, func)
+
+    def due(self) -> bool:
+
+        """
+        Whether a snapshot is due to be logged in the session, starting a new interval if it is.
+        """
+
+        if self.__next_snapshot is None or monotonic() < self.__next_snapshot: return False
+        self.__next_snapshot = monotonic() + self.interval
+        return True
+
+    def stats(self) -> dict[str: Any]:
+
+        """
+        Snapshot of the statistics.
+
+        Returns:
+            dict[str: Any]: The statistics of each timer as a dict (see ``Timer.to_dict``), and the value of each counter
+            and observed value.
+        """
+
+        with self.__lock: counters, timers = dict(self.counters), dict(self.timers)
+        return {
+            **{name: timer.to_dict() for name, timer in timers.items()},
+            **counters,
+            **{name: func() for name, (_, func) in self.observers.items()},
+        }
+
+    def series(self) -> dict[str: float]:
+
+        """
+        Snapshot of the statistics flattened into scalar logs named ``_deeplogs/{name}`` and ``_deeplogs/{timer}/{stat}``.
+        """
+
+        return {
+            f"{PREFIX}{name}" if stat is None else f"{PREFIX}{name}/{stat}": value
+            for name, values in self.stats().items()
+            for stat, value in (values.items() if isinstance(values, dict) else [(None, values)])
+        }
+
+    def to_prometheus(self, namespace: str = "deeplogs") -> str:
+
+        """
+        Export the statistics in the Prometheus text exposition format: timers as summaries of durations in seconds,
+        counters as counters (with a "_total" suffix) and observed values as gauges or counters.
+
+        Args:
+            namespace (str, optional): Prefix of the metric names. Default is "deeplogs".
+
+        Returns:
+            str: The exposition, ending with a newline.
+        """
+
+        def metric_name(*parts: str) -> str:
+            return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(parts))
+
+        def labels(**extra: Any) -> str:
+            pairs = {**self.labels, **extra}
+            escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in pairs.values())
+            return "{" + ",".join(f'{metric_name(key)}="{value}"' for key, value in zip(pairs, escaped)) + "}" if pairs else ""
+
+        lines = []
+        with self.__lock: counters, timers = dict(self.counters), dict(self.timers)
+        for name, timer in timers.items():
+            stats, metric = timer.to_dict(), metric_name(namespace, name, "seconds")
+            lines.append(f"# TYPE {metric} summary")
+            lines.extend(f"{metric}{labels(quantile=q)} {stats[f'p{q * 100:g}_seconds']!r}" for q in QUANTILES)
+            lines.append(f"{metric}_sum{labels()} {stats['total_seconds']!r}")
+            lines.append(f"{metric}_count{labels()} {stats['count']}")
+        observed = {name: (kind, func()) for name, (kind, func) in self.observers.items()}
+        for name, (kind, value) in {**{name: ("counter", value) for name, value in counters.items()}, **observed}.items():
+            metric = metric_name(namespace, name) + "_total" * (kind == "counter")
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric}{labels()} {float(value)!r}")
+        return "\n".join(lines) + "\n"
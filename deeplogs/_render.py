@@ -0,0 +1,97 @@
+from threading import Thread, RLock, Event
+from time import time
+
+class Renderer():
+
+    """
+    Draw the lines of all the active progress bars, so that nested or concurrent bars (e.g. epochs and batches) share
+    the terminal without overwriting each other. A single bar is redrawn with a carriage return; several bars are drawn
+    one per line, moving the cursor back up with ANSI escape codes.
+
+    Bars either ask for a redraw from their own loop (``draw``) or are sampled periodically by a background thread,
+    started while at least one registered bar asks for it. The same thread monitors the bars drawn from their loop, and
+    redraws them when one was not drawn for its ``max_interval``. A thread that died is started again by the next bar.
+    """
+
+    MIN_INTERVAL: float = 0.01
+
+    def __init__(self):
+        self.bars: list = []
+        self.__lock: RLock = RLock()
+        self.__height: int = 0
+        self.__width: int = 0
+        self.__thread: Thread = None
+        self.__wake: Event = Event()
+
+    def register(self, bar) -> None:
+
+        """
+        Add a bar below the active ones.
+
+        Args:
+            bar (Bar): The bar, rendered with its ``render`` method.
+        """
+
+        with self.__lock:
+            self.bars.append(bar)
+            self.__wake.clear()
+            if (bar.render_thread or bar.max_interval is not None) and (self.__thread is None or not self.__thread.is_alive()):
+                self.__thread = Thread(target=self.__run, name="deeplogs-bar", daemon=True)
+                self.__thread.start()
+
+    def unregister(self, bar) -> None:
+
+        """
+        Draw the final state of a bar and remove it. The line of the last active bar is kept, the others are cleared.
+
+        Args:
+            bar (Bar): A registered bar.
+        """
+
+        with self.__lock:
+            self.draw()
+            self.bars.remove(bar)
+            if not self.bars:
+                print("\n" * max(self.__height, 1), end="", flush=True)
+                self.__height = self.__width = 0
+                self.__wake.set()
+
+    def draw(self) -> None:
+
+        """
+        Draw the current line of every active bar.
+        """
+
+        with self.__lock:
+            lines = [bar.render() for bar in self.bars]
+            if len(lines) <= 1 and self.__height <= 1:
+                line = lines[0] if lines else ""
+                print("\r" + line.ljust(self.__width), end="", flush=True)
+                self.__height, self.__width = len(lines), len(line)
+                return
+            height = max(len(lines), self.__height)
+            lines += [""] * (height - len(lines))
+            print("\n".join("\r\x1b[2K" + line for line in lines) + f"\x1b[{height - 1}A" * (height > 1), end="", flush=True)
+            self.__height, self.__width = len(self.bars), 0
+
+    def __run(self) -> None:
+
+        """
+        Redraw the sampled bars periodically, and the others when they are stale, until none of them needs it.
+        """
+
+        while True:
+            with self.__lock:
+                intervals = [
+                    bar.print_interval if bar.render_thread else bar.max_interval
+                    for bar in self.bars if bar.render_thread or bar.max_interval is not None
+                ]
+                if not intervals:
+                    self.__thread = None
+                    return
+                now = time()
+                stale = lambda bar: bar.max_interval is not None and now - bar.last_draw >= bar.max_interval
+                if any(bar.render_thread or stale(bar) for bar in self.bars): self.draw()
+            self.__wake.wait(max(min(intervals), self.MIN_INTERVAL))
+
+RENDERER: Renderer = Renderer()
@@ -0,0 +1,167 @@
+from typing import Iterable
+from math import log, ceil, isfinite
+import numpy as np
+
+class Sketch():
+
+    """
+    A mergeable quantile sketch with relative error guarantees, in the manner of DDSketch: values are counted in
+    logarithmically sized bins, so that every quantile is estimated within ``relative_accuracy`` of its true value.
+    Positive and negative values have their own bins, values close to zero share a single bin.
+
+    The size of the sketch only depends on the range of the values, and is bounded by ``max_bins`` per sign: beyond it, the
+    bins closest to zero are collapsed together, which only degrades the accuracy of the lowest magnitudes.
+
+    Args:
+        relative_accuracy (float, optional): Relative accuracy of the quantiles. Default is 0.01.
+        max_bins (int, optional): Maximum number of bins per sign. Default is 2048.
+    """
+
+    MIN_MAGNITUDE: float = np.finfo(np.float64).tiny
+    SMALL_BATCH: int = 16
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1: raise ValueError(f"The relative accuracy must be in ]0, 1[, got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma: float = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.max_bins = max_bins
+        self.count: int = 0
+        self.zero_count: int = 0
+        self.sum: float = 0.
+        self.min: float = np.inf
+        self.max: float = -np.inf
+        self.offsets: dict[int: int] = {1: 0, -1: 0}
+        self.bins: dict[int: np.ndarray] = {1: np.zeros(0, np.int64), -1: np.zeros(0, np.int64)}
+
+    def add(self, values: Iterable[float]|np.ndarray) -> None:
+
+        """
+        Fold values into the sketch. NaN and infinite values are ignored.
+
+        Args:
+            values (Iterable of float or np.ndarray): The values, of any shape.
+        """
+
+        values = np.asarray(values, np.float64).ravel()
+        if len(values) <= self.SMALL_BATCH: return self.__add_small(values.tolist())
+        values = values[np.isfinite(values)]
+        if not len(values): return
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min, self.max = min(self.min, float(values.min())), max(self.max, float(values.max()))
+        magnitudes = np.abs(values)
+        nonzero = magnitudes >= self.MIN_MAGNITUDE
+        self.zero_count += len(values) - int(nonzero.sum())
+        for sign, mask in ((1, nonzero & (values > 0)), (-1, nonzero & (values < 0))):
+            if not mask.any(): continue
+            indices = np.ceil(np.log(magnitudes[mask]) / log(self.gamma)).astype(np.int64)
+            offset = int(indices.min())
+            self.__add_bins(sign, offset, np.bincount(indices - offset))
+
+    def __add_small(self, values: list[float]) -> None:
+
+        """
+        Fold a few values one at a time, which is cheaper than the vectorized operations for the sparse metrics of a save.
+        """
+
+        for value in values:
+            if not isfinite(value): continue
+            self.count += 1
+            self.sum += value
+            self.min, self.max = min(self.min, value), max(self.max, value)
+            if abs(value) < self.MIN_MAGNITUDE:
+                self.zero_count += 1
+                continue
+            sign = 1 if value > 0 else -1
+            index = ceil(log(abs(value)) / log(self.gamma))
+            bins, offset = self.bins[sign], self.offsets[sign]
+            if offset <= index < offset + len(bins): bins[index - offset] += 1
+            else: self.__add_bins(sign, index, np.ones(1, np.int64))
+
+    def merge(self, other) -> None:
+
+        """
+        Fold another sketch into this one.
+
+        Args:
+            other (Sketch): A sketch with the same relative accuracy.
+        """
+
+        if other.gamma != self.gamma: raise ValueError("Cannot merge sketches with different relative accuracies")
+        self.count += other.count
+        self.zero_count += other.zero_count
+        self.sum += other.sum
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        for sign in (1, -1):
+            if len(other.bins[sign]): self.__add_bins(sign, other.offsets[sign], other.bins[sign])
+
+    def __add_bins(self, sign: int, offset: int, counts: np.ndarray) -> None:
+
+        """
+        Add counts to the bins of a sign, starting at bin ``offset``, collapsing the lowest bins beyond ``max_bins``.
+        """
+
+        bins, start = self.bins[sign], self.offsets[sign]
+        if len(bins):
+            low, high = min(start, offset), max(start + len(bins), offset + len(counts))
+            merged = np.zeros(high - low, np.int64)
+            merged[start - low:start - low + len(bins)] += bins
+            merged[offset - low:offset - low + len(counts)] += counts
+            bins, start = merged, low
+        else: bins, start = counts.astype(np.int64), offset
+        if (excess := len(bins) - self.max_bins) > 0:
+            bins[excess] += bins[:excess].sum()
+            bins, start = bins[excess:], start + excess
+        self.bins[sign], self.offsets[sign] = bins, start
+
+    def quantile(self, q: float|Iterable[float]) -> float|np.ndarray:
+
+        """
+        Estimate quantiles of the values.
+
+        Args:
+            q (float or Iterable of float): Quantile(s) between 0 and 1.
+
+        Returns:
+            float or np.ndarray: The estimated quantile(s), NaN if the sketch is empty.
+        """
+
+        scalar = np.ndim(q) == 0
+        q = np.atleast_1d(np.asarray(q, np.float64))
+        if self.count == 0: return np.nan if scalar else np.full(q.shape, np.nan)
+        negative, positive = self.bins[-1], self.bins[1]
+        values = np.concatenate([
+            -self.__bin_value(self.offsets[-1] + np.arange(len(negative)))[::-1],
+            [0.],
+            self.__bin_value(self.offsets[1] + np.arange(len(positive))),
+        ])
+        cumulative = np.cumsum(np.concatenate([negative[::-1], [self.zero_count], positive]))
+        estimates = np.clip(values[np.searchsorted(cumulative, q * (self.count - 1), side="right")], self.min, self.max)
+        return float(estimates[0]) if scalar else estimates
+
+    def __bin_value(self, indices: np.ndarray) -> np.ndarray:
+
+        """
+        Value representing bins, within the relative accuracy of all the magnitudes they hold.
+        """
+
+        return 2 * self.gamma ** indices.astype(np.float64) / (self.gamma + 1)
+
+    @property
+    def mean(self) -> float:
+
+        """
+        Exact mean of the values, NaN if the sketch is empty.
+        """
+
+        return self.sum / self.count if self.count else np.nan
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Sketch) and self.gamma == other.gamma and (
+            self.count, self.zero_count, self.sum, self.min, self.max, self.offsets
+        ) == (other.count, other.zero_count, other.sum, other.min, other.max, other.offsets) and all(
+            np.array_equal(self.bins[sign], other.bins[sign]) for sign in (1, -1)
+        )
+
+    def __repr__(self) -> str:
+        return f"Sketch(count={self.count}, min={self.min}, max={self.max}, relative_accuracy={self.relative_accuracy})"
@@ -0,0 +1,260 @@
+from typing import Any
+from collections import deque
+import numpy as np
+
+from deeplogs._sketch import Sketch
+
+class RollingStats():
+
+    """
+    Statistics of the last values of a metric, updated in O(1) amortized time per value: the windowed mean from a running
+    sum, the windowed minimum and maximum from monotonic deques, and an exponential moving average of all the values.
+    The statistics are published as a single tuple at the end of each update, so that they can be read from another
+    thread (e.g. a progress bar) while values are added.
+
+    Args:
+        window (int): Number of most recent values on which the windowed statistics are based.
+        alpha (float, optional): Smoothing factor of the exponential moving average. Default is ``2 / (window + 1)``.
+    """
+
+    def __init__(self, window: int, alpha: float = None):
+        if window < 1: raise ValueError(f"The window must be at least 1, got {window}")
+        self.window = window
+        self.alpha = 2 / (window + 1) if alpha is None else alpha
+        self.count: int = 0
+        self.ema: float = None
+        self.__values: deque[float] = deque()
+        self.__sum: float = 0.
+        self.__min: deque[tuple[int, float]] = deque()
+        self.__max: deque[tuple[int, float]] = deque()
+        self.__snapshot: tuple = (None, None, None, None, None, 0)
+
+    def __publish(self) -> None:
+
+        """
+        Publish the statistics of the values added so far.
+        """
+
+        self.__snapshot = (
+            self.__sum / len(self.__values), self.__min[0][1], self.__max[0][1], self.ema, self.__values[-1], self.count,
+        )
+
+    def update(self, value: Any) -> None:
+
+        """
+        Add a value, dropping the oldest one of the window if it is full.
+
+        Args:
+            value (Any): A value convertible to float.
+        """
+
+        value = float(value)
+        self.__values.append(value)
+        self.__sum += value
+        if len(self.__values) > self.window: self.__sum -= self.__values.popleft()
+        while self.__min and self.__min[-1][1] >= value: self.__min.pop()
+        while self.__max and self.__max[-1][1] <= value: self.__max.pop()
+        self.__min.append((self.count, value))
+        self.__max.append((self.count, value))
+        self.count += 1
+        for extremes in (self.__min, self.__max):
+            if extremes[0][0] <= self.count - 1 - self.window: extremes.popleft()
+        self.ema = value if self.ema is None else self.ema + self.alpha * (value - self.ema)
+        if self.count % self.window == 0: self.__sum = sum(self.__values) # bounds the drift of the running sum
+        self.__publish()
+
+    def extend(self, values: np.ndarray) -> None:
+
+        """
+        Add several values at once, with the same result as adding them one by one. The window and the extremes are
+        rebuilt once from the last ``window`` values, and the moving average is folded in closed form.
+
+        Args:
+            values (np.ndarray): The values, in logging order.
+        """
+
+        values = np.asarray(values, np.float64)
+        if not len(values): return
+        self.__values.extend(values[-self.window:].tolist())
+        for _ in range(len(self.__values) - self.window): self.__values.popleft()
+        self.__sum = sum(self.__values)
+        self.count += len(values)
+        window = np.array(self.__values)
+        first = self.count - len(window)
+        for extremes, accumulate, is_kept in ((self.__min, np.minimum, np.less), (self.__max, np.maximum, np.greater)):
+            # like the monotonic deques of ``update``, keep the values strictly beyond all the later values of the window
+            later = accumulate.accumulate(window[::-1])[::-1]
+            kept = np.append(is_kept(window[:-1], later[1:]), True)
+            extremes.clear()
+            extremes.extend(zip((first + np.flatnonzero(kept)).tolist(), window[kept].tolist()))
+        if self.ema is None: self.ema, values = float(values[0]), values[1:]
+        decay = (1 - self.alpha) ** np.arange(len(values) - 1, -1, -1, dtype=np.float64)
+        self.ema = float((1 - self.alpha) ** len(values) * self.ema + self.alpha * (decay * values).sum())
+        self.__publish()
+
+    @property
+    def mean(self) -> float:
+
+        """
+        Mean of the window, None if no value was added.
+        """
+
+        return self.__snapshot[0]
+
+    @property
+    def min(self) -> float:
+
+        """
+        Minimum of the window, None if no value was added.
+        """
+
+        return self.__snapshot[1]
+
+    @property
+    def max(self) -> float:
+
+        """
+        Maximum of the window, None if no value was added.
+        """
+
+        return self.__snapshot[2]
+
+    @property
+    def last(self) -> float:
+
+        """
+        Last added value, None if no value was added.
+        """
+
+        return self.__snapshot[4]
+
+    def to_dict(self) -> dict[str: float]:
+
+        """
+        Consistent snapshot of the statistics, after the last completed update.
+
+        Returns:
+            dict[str: float]: The "mean", "min", "max", "ema", "last" and "count" statistics.
+        """
+
+        return dict(zip(("mean", "min", "max", "ema", "last", "count"), self.__snapshot))
+
+class Summary():
+
+    """
+    Streaming summary statistics of all the values of a metric, updated one batch at a time: the count, the mean and the
+    sum of squared deviations (Welford's algorithm, with Chan's formula to fold a batch), the minimum and maximum with
+    their timesteps, the last value, and a quantile sketch. Summaries are small and picklable, so that they can be saved
+    as metadata and describe a metric without reading its values.
+
+    Args:
+        relative_accuracy (float, optional): Relative accuracy of the quantiles. Default is 0.01.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count: int = 0
+        self.mean: float = 0.
+        self.m2: float = 0.
+        self.min: float = None
+        self.max: float = None
+        self.argmin: int|float = None
+        self.argmax: int|float = None
+        self.last: float = None
+        self.sketch: Sketch = Sketch(relative_accuracy)
+
+    def update(self, values: np.ndarray, timesteps: np.ndarray) -> None:
+
+        """
+        Fold a batch of values into the summary. NaN values are ignored.
+
+        Args:
+            values (np.ndarray): The values, in logging order.
+            timesteps (np.ndarray): The timestep of each value.
+        """
+
+        values, timesteps = np.asarray(values, np.float64), np.asarray(timesteps)
+        if len(values) <= Sketch.SMALL_BATCH: return self.__update_small(values.tolist(), timesteps.tolist())
+        present = ~np.isnan(values)
+        values, timesteps = values[present], timesteps[present]
+        if not len(values): return
+        count, mean = len(values), float(values.mean())
+        m2 = float(np.square(values - mean).sum())
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        i, j = int(values.argmin()), int(values.argmax())
+        if self.min is None or values[i] < self.min: self.min, self.argmin = float(values[i]), timesteps[i].item()
+        if self.max is None or values[j] > self.max: self.max, self.argmax = float(values[j]), timesteps[j].item()
+        self.last = float(values[-1])
+        self.sketch.add(values)
+
+    def merge(self, other) -> None:
+
+        """
+        Fold the values of another summary into this one, e.g. the summary of the same metric logged by another rank.
+        The last value is the one of ``other``.
+
+        Args:
+            other (Summary): A summary with the same relative accuracy.
+        """
+
+        if not other.count: return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        if self.min is None or other.min < self.min: self.min, self.argmin = other.min, other.argmin
+        if self.max is None or other.max > self.max: self.max, self.argmax = other.max, other.argmax
+        self.last = other.last
+        self.sketch.merge(other.sketch)
+
+    def __update_small(self, values: list[float], timesteps: list[int|float]) -> None:
+
+        """
+        Fold a few values one at a time with Welford's algorithm, which is cheaper than the vectorized operations.
+        """
+
+        for value, timestep in zip(values, timesteps):
+            if value != value: continue
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+            if self.min is None or value < self.min: self.min, self.argmin = value, timestep
+            if self.max is None or value > self.max: self.max, self.argmax = value, timestep
+            self.last = value
+        self.sketch.add(values)
+
+    @property
+    def std(self) -> float:
+
+        """
+        Sample standard deviation of the values, NaN with less than two values.
+        """
+
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else np.nan
+
+    def describe(self, percentiles: list[float] = [0.25, 0.5, 0.75]) -> dict[str: float]:
+
+        """
+        Descriptive statistics in the layout of ``pandas.DataFrame.describe``, the percentiles being estimated from the sketch.
+
+        Args:
+            percentiles (list of float, optional): The percentiles, between 0 and 1. Default is [0.25, 0.5, 0.75].
+
+        Returns:
+            dict[str: float]: The "count", "mean", "std", "min", percentiles (e.g. "25%") and "max" statistics.
+        """
+
+        estimates = self.sketch.quantile(percentiles) if self.count else [np.nan] * len(percentiles)
+        return {
+            "count": float(self.count),
+            "mean": self.mean if self.count else np.nan,
+            "std": self.std,
+            "min": self.min if self.count else np.nan,
+            **{f"{percentile * 100:g}%": float(estimate) for percentile, estimate in zip(percentiles, estimates)},
+            "max": self.max if self.count else np.nan,
+        }
@@ -0,0 +1,328 @@
+from typing import Any, BinaryIO, Iterator
+from os import PathLike, replace, stat, listdir
+from os.path import split
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+from struct import Struct
+from zlib import crc32
+import json
+import numpy as np
+
+from deeplogs._codec import decode_chunk
+
+MAGIC: bytes = b"DPLOGS\x00\x01"
+
+LEGACY: int = 0
+META: int = 1
+CHUNK: int = 2
+HISTOGRAM: int = 3
+PACKED: int = 4
+
+RECORD_HEADER: Struct = Struct("<BII")
+
+def is_session_file(f: BinaryIO) -> bool:
+
+    """
+    Check whether an opened file uses the append-only session format.
+
+    Args:
+        f (BinaryIO): A file opened in binary mode, positioned at its start.
+
+    Returns:
+        bool: True if the file starts with the session magic bytes. The file is left positioned after them.
+    """
+
+    return f.read(len(MAGIC)) == MAGIC
+
+def write_record(f: BinaryIO, kind: int, obj: Any) -> int:
+
+    """
+    Encode an object once and append it to a session file as a framed record.
+
+    Args:
+        f (BinaryIO): A file opened in binary append or write mode.
+        kind (int): The record kind (``META``, ``CHUNK``, ``HISTOGRAM`` or ``PACKED``).
+        obj (Any): The picklable payload of the record.
+
+    Returns:
+        int: The number of bytes written.
+    """
+
+    payload = dumps(obj, protocol=HIGHEST_PROTOCOL)
+    f.write(RECORD_HEADER.pack(kind, len(payload), crc32(payload)))
+    f.write(payload)
+    return RECORD_HEADER.size + len(payload)
+
+def iter_records(f: BinaryIO, end: int = None) -> Iterator[tuple[int, Any]]:
+
+    """
+    Iterate over the complete records of a session file.
+
+    A truncated or corrupted trailing record, e.g. one that is still being written, ends the iteration
+    instead of raising, so readers always see a consistent prefix of the session.
+    ``PACKED`` records are decompressed one at a time and yielded as ``CHUNK`` records.
+
+    Args:
+        f (BinaryIO): A file opened in binary mode, positioned after the magic bytes.
+        end (int, optional): Offset at which to stop reading, e.g. the size committed in the manifest. Default is the end of the file.
+
+    Yields:
+        tuple[int, Any]: The kind and the decoded payload of each record.
+    """
+
+    while (end is None or f.tell() < end) and (header := f.read(RECORD_HEADER.size)):
+        if len(header) < RECORD_HEADER.size: return
+        kind, length, checksum = RECORD_HEADER.unpack(header)
+        payload = f.read(length)
+        if len(payload) < length or crc32(payload) != checksum: return
+        if kind == PACKED: yield CHUNK, decode_chunk(loads(payload))
+        else: yield kind, loads(payload)
+
+def read_record(f: BinaryIO, offset: int) -> tuple[int, Any]|None:
+
+    """
+    Read the record starting at an offset of a session file, e.g. one found in its chunk index.
+
+    Args:
+        f (BinaryIO): A file opened in binary mode.
+        offset (int): Offset of the record header.
+
+    Returns:
+        tuple[int, Any] or None: The kind and the decoded payload of the record, None if it is truncated or corrupted.
+    """
+
+    f.seek(offset)
+    return next(iter_records(f), None)
+
+def shard_path(path: PathLike|str, rank: int) -> str:
+
+    """
+    Path of the shard written by one rank of a session file.
+
+    Args:
+        path (PathLike or str): The session file.
+        rank (int): The rank of the writer.
+
+    Returns:
+        str: The shard path.
+    """
+
+    return f"{path}.rank{rank}"
+
+def shard_paths(path: PathLike|str) -> dict[int: str]:
+
+    """
+    Paths of the existing shards of a session file.
+
+    Args:
+        path (PathLike or str): The session file.
+
+    Returns:
+        dict[int: str]: The shard paths by rank, sorted by rank. Empty if the session is not sharded or its folder does not exist.
+    """
+
+    folder_path, file_name = split(str(path))
+    try: file_names = listdir(folder_path or ".")
+    except (FileNotFoundError, NotADirectoryError): return {}
+    ranks = sorted(
+        int(name[len(file_name) + 5:]) for name in file_names
+        if name.startswith(f"{file_name}.rank") and name[len(file_name) + 5:].isdigit()
+    )
+    return {rank: shard_path(path, rank) for rank in ranks}
+
+def manifest_path(path: PathLike|str) -> str:
+
+    """
+    Path of the manifest of a session file.
+
+    Args:
+        path (PathLike or str): The session file.
+
+    Returns:
+        str: The manifest path.
+    """
+
+    return f"{path}.manifest"
+
+def write_manifest(path: PathLike|str, size: int, generation: int, session: str) -> None:
+
+    """
+    Atomically publish the committed state of a session file, through a temporary file and a rename.
+
+    Args:
+        path (PathLike or str): The session file.
+        size (int): Number of bytes of the session file made of complete records.
+        generation (int): Counter incremented on each commit.
+        session (str): Identifier of the session file, changed each time the file is rewritten from scratch.
+    """
+
+    temp_path = manifest_path(path) + ".tmp"
+    with open(temp_path, "w") as f: json.dump({"size": size, "generation": generation, "session": session}, f)
+    replace(temp_path, manifest_path(path))
+
+def read_manifest(path: PathLike|str) -> dict|None:
+
+    """
+    Read the last published manifest of a session file.
+
+    Args:
+        path (PathLike or str): The session file.
+
+    Returns:
+        dict or None: The manifest, or None if the session file has none (e.g. legacy pickle sessions).
+    """
+
+    try:
+        with open(manifest_path(path)) as f: return json.load(f)
+    except FileNotFoundError: return None
+
+def index_path(path: PathLike|str) -> str:
+
+    """
+    Path of the chunk index of a session file.
+
+    Args:
+        path (PathLike or str): The session file.
+
+    Returns:
+        str: The index path.
+    """
+
+    return f"{path}.index"
+
+def timestep_bounds(timesteps: np.ndarray) -> list[int|float]|None:
+
+    """
+    Minimum and maximum of timesteps, ignoring missing (``NaN``) ones.
+
+    Args:
+        timesteps (np.ndarray): The timesteps, in any order.
+
+    Returns:
+        list[int or float] or None: The bounds, None if there are no numeric timesteps.
+    """
+
+    if timesteps.dtype.kind not in "biuf": return None
+    if timesteps.dtype.kind == "f": timesteps = timesteps[~np.isnan(timesteps)]
+    return [timesteps.min().item(), timesteps.max().item()] if len(timesteps) else None
+
+def write_index(path: PathLike|str, size: int, session: str) -> None:
+
+    """
+    Atomically start the chunk index of a session file rewritten from scratch, through a temporary file and a rename.
+    It must be written before the manifest of the new session is published.
+
+    Args:
+        path (PathLike or str): The session file.
+        size (int): Number of bytes of the session file before its first chunk.
+        session (str): Identifier of the session file, see ``write_manifest``.
+    """
+
+    temp_path = index_path(path) + ".tmp"
+    with open(temp_path, "w") as f: f.write(json.dumps({"session": session, "end": size}) + "\n")
+    replace(temp_path, index_path(path))
+
+def append_index(path: PathLike|str, size: int, offset: int = None, chunk: dict = None) -> None:
+
+    """
+    Append the entry of a commit to the chunk index of a session file. It must be written before the manifest of the
+    commit is published, so that the index always covers the committed part of the file.
+
+    The entry of a commit that wrote a chunk holds the offset of the chunk record, its rows, the bounds of its timesteps
+    and, for each log of the chunk, the bounds of the timesteps at which it was logged.
+
+    Args:
+        path (PathLike or str): The session file.
+        size (int): Number of bytes of the session file after the commit.
+        offset (int, optional): Offset of the ``CHUNK`` or ``PACKED`` record of the commit. Default is None, no chunk.
+        chunk (dict, optional): The chunk written by the commit. Default is None.
+    """
+
+    entry = {"end": size}
+    if chunk is not None:
+        timesteps = chunk["timestep"].values
+        entry.update({
+            "offset": offset,
+            "start": chunk["start"],
+            "rows": len(timesteps),
+            "timestep": timestep_bounds(timesteps),
+            "logs": {
+                log_name: timestep_bounds(timesteps[series.rows.values - chunk["start"]])
+                for log_name, series in chunk["logs"].items()
+            },
+        })
+    with open(index_path(path), "a") as f: f.write(json.dumps(entry) + "\n")
+
+def read_index(path: PathLike|str, manifest: dict) -> list[dict]|None:
+
+    """
+    Read the chunk entries of the index of a session file, up to the size committed in its manifest.
+
+    Args:
+        path (PathLike or str): The session file.
+        manifest (dict): The manifest of the session file, as returned by ``read_manifest``.
+
+    Returns:
+        list of dict or None: The entries of the committed chunks, in file order (see ``append_index``). None if the
+        index is missing, belongs to another session, or does not cover the committed part of the file (e.g. a session
+        written by an older version), in which case the session file has to be read whole.
+    """
+
+    try:
+        with open(index_path(path)) as f: lines = f.readlines()
+    except FileNotFoundError: return None
+    entries = []
+    for line in lines:
+        try: entry = json.loads(line)
+        except ValueError: break # an entry that is still being written
+        if entry["end"] > manifest["size"]: break
+        entries.append(entry)
+    if not entries or entries[0].get("session") != manifest.get("session") or entries[-1]["end"] != manifest["size"]: return None
+    return [entry for entry in entries if "offset" in entry]
+
+class SessionReader():
+
+    """
+    Incrementally read the records committed in a session file.
+    Each call to ``read`` only decodes the records appended since the previous call.
+
+    Args:
+        path (PathLike or str): The session file.
+    """
+
+    def __init__(self, path: PathLike|str):
+        self.path = path
+        self.offset: int = 0
+        self.version: tuple = None
+
+    def read(self) -> list[tuple[int, Any]]:
+
+        """
+        Read the records committed since the last call.
+
+        When the session file was rewritten from scratch (e.g. a restarted run) or has no manifest, it is read again from
+        its start, and the returned records start with a ``META`` (or ``LEGACY``) record.
+
+        Returns:
+            list of tuple[int, Any]: The kind and the decoded payload of the new records.
+        """
+
+        manifest = read_manifest(self.path)
+        if manifest is None:
+            file_stat = stat(self.path)
+            version = (None, file_stat.st_size, file_stat.st_mtime_ns)
+        else: version = (manifest.get("session"), manifest["generation"])
+        if version == self.version: return []
+        if self.version is None or version[0] != self.version[0] or manifest is None: self.offset = 0
+        self.version = version
+        with open(self.path, "rb") as f:
+            if self.offset == 0:
+                if not is_session_file(f):
+                    f.seek(0)
+                    return [(LEGACY, loads(f.read()))]
+                self.offset = f.tell()
+            else: f.seek(self.offset)
+            records = []
+            for kind, record in iter_records(f, manifest and manifest["size"]):
+                records.append((kind, record))
+                self.offset = f.tell()
+        return records
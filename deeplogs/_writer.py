@@ -0,0 +1,371 @@
+from os import PathLike
+from os.path import exists, getsize
+from typing import Any, Callable
+from threading import Thread, Event, Lock
+from queue import Queue, Empty, Full
+from time import monotonic, perf_counter
+import sqlite3
+import numpy as np
+
+from deeplogs._column import Column, Series
+from deeplogs._catalog import Catalog
+from deeplogs._sketch import Sketch
+from deeplogs._stats import Summary
+from deeplogs._codec import check_encoding, encode_chunk
+from deeplogs._instrument import Instruments
+from deeplogs._storage import CHUNK, HISTOGRAM, PACKED, write_record, write_manifest, read_manifest, append_index, index_path
+
+class Writer(Thread):
+
+    """
+    A long-lived thread that appends the rows and histograms logged by a Logger to its session file.
+    The training thread hands the rows over as chunks copied from its Log object, which are written as they are, and
+    pushes them with the histograms in a bounded queue, so it never shares mutable state with the writes. The rows
+    logged since the last chunk are also recorded with ``put_row``: when no chunk comes for ``save_interval`` seconds
+    (e.g. while the training thread evaluates), the thread assembles them into a chunk itself.
+    Each write is published by a new generation of the session manifest. A failed write is removed from the session
+    file and retried with the next one, up to ``RETRIES`` times before its rows are dropped and counted in ``lost_rows``.
+
+    Args:
+        path (PathLike or str): The session file, already created with ``Log.save``.
+        save_interval (float, optional): Maximum time (in seconds) a logged row or histogram waits before being written.
+            Default is 5.0 seconds.
+        batch_size (int, optional): Number of pending histograms that triggers a write before ``save_interval``, and maximum
+            number of rows of queued chunks gathered in a single write. Default is 4096.
+        queue_size (int, optional): Maximum number of records waiting in the queue. ``put_chunk`` and ``put_histogram``
+            block when it is full, and raise if the thread stopped. Default is 65536.
+        dtype (str, optional): Type used to store the values of the rows assembled by the thread. Default is inferred from
+            the values.
+        catalog (Catalog, optional): Catalog of the log folder, updated after a write at most once per ``save_interval``,
+            and on flush and close. Default is None.
+        session_name (str, optional): Name of the session in the catalog. Default is None.
+        encoding (dict, optional): Arguments of ``encode_chunk`` (``timestep_encoding``, ``value_encoding`` and
+            ``compression``) to write encoded and compressed chunks. Default is None, writing raw chunks.
+        instruments (Instruments, optional): Instruments recording the duration and size of the writes. Default is None.
+        rank (int, optional): Rank of the process, whose shard entry is updated in the catalog. Default is None.
+    """
+
+    RETRIES: int = 3
+
+    def __init__(
+        self,
+        path: PathLike|str,
+        save_interval: float = 5.,
+        batch_size: int = 4096,
+        queue_size: int = 65536,
+        dtype: str = None,
+        catalog: Catalog = None,
+        session_name: str = None,
+        encoding: dict = None,
+        instruments: Instruments = None,
+        rank: int = None,
+    ):
+        super().__init__(name="deeplogs-writer", daemon=True)
+        self.path = path
+        self.save_interval = save_interval
+        self.batch_size = batch_size
+        self.dtype = dtype
+        self.catalog = catalog
+        self.session_name = session_name
+        self.encoding = encoding
+        if encoding: check_encoding(**encoding)
+        self.instruments = instruments
+        self.rank = rank
+        self.queue: Queue = Queue(queue_size)
+        self.error: Exception = None
+        self.lost_rows: int = 0
+        self.__rows: int = 0
+        self.__generation: int = 0
+        self.__session: str = None
+        self.__metrics: dict[str: None] = {}
+        self.__summary: dict[str: Summary] = {}
+        self.__closed: bool = False
+        self.__lock: Lock = Lock()
+        self.__handed: int = 0
+        self.__unsent: list[tuple] = []
+        self.__unsent_since: float = None
+        self.__last_timestep: int|float = None
+        self.__catalog_pending: bool = False
+        self.__catalog_deadline: float = 0.
+        self.__connection: sqlite3.Connection = None
+
+    def put_row(self, timestep: int|float, logs: dict[str: Any]) -> int:
+
+        """
+        Record a row logged since the last chunk was handed over, to be written by the thread if no chunk comes in time.
+
+        Args:
+            timestep (int or float): The timestep of the row.
+            logs (dict[str: Any]): The values of the row.
+
+        Returns:
+            int: The number of rows logged since the last chunk was handed over, this one included.
+        """
+
+        with self.__lock:
+            if not self.__unsent: self.__unsent_since = monotonic()
+            self.__unsent.append((timestep, logs))
+            return len(self.__unsent)
+
+    def put_chunk(self, chunk_of: Callable[[int, int], dict], end: int) -> None:
+
+        """
+        Queue the rows logged before ``end`` that were not handed over yet as a chunk, blocking while the queue is full.
+        It is written as soon as the thread gets it.
+
+        Args:
+            chunk_of (Callable[[int, int], dict]): Function copying the rows in ``[start, end)`` into a chunk, e.g. ``Log.chunk``.
+            end (int): Index after the last logged row.
+        """
+
+        with self.__lock:
+            if end <= self.__handed: return
+            self.__put((CHUNK, chunk_of(self.__handed, end)))
+            self.__handed, self.__unsent = end, []
+
+    def put_histogram(self, timestep: int|float, tag: str, sketch: Sketch) -> None:
+
+        """
+        Queue a histogram to be written, blocking while the queue is full.
+
+        Args:
+            timestep (int or float): The timestep of the histogram.
+            tag (str): The tag of the histogram.
+            sketch (Sketch): The sketch of the logged values.
+        """
+
+        self.__put((HISTOGRAM, {"timestep": timestep, "tag": tag, "sketch": sketch}))
+
+    def flush(self) -> None:
+
+        """
+        Write every queued row and wait until it is on disk.
+        """
+
+        if self.__closed: return
+        done = Event()
+        self.__put(done)
+        while not done.wait(0.1) and self.is_alive(): pass
+        self.__raise_error()
+
+    def close(self) -> None:
+
+        """
+        Write every queued row and stop the thread. Calling it again does nothing.
+        """
+
+        if self.__closed: return
+        self.__closed = True
+        try: self.__put(None)
+        finally: self.join()
+        self.__raise_error()
+
+    def __put(self, item: Any) -> None:
+
+        """
+        Queue an item, blocking while the queue is full, and raise instead of blocking forever if the thread stopped.
+        """
+
+        while True:
+            if not self.is_alive():
+                self.__raise_error()
+                raise RuntimeError("The writer thread is not running")
+            try: return self.queue.put(item, timeout=0.1)
+            except Full: pass
+
+    def __raise_error(self) -> None:
+
+        """
+        Raise in the caller's thread the last error that happened while writing.
+        """
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def run(self) -> None:
+        try:
+            f = open(self.path, "ab")
+            manifest = read_manifest(self.path)
+            self.__generation, self.__session = manifest["generation"], manifest["session"]
+        except Exception as error:
+            self.error = error
+            return
+        with f:
+            chunks, histograms, nb_rows, deadline, retries = [], [], 0, None, 0
+            while True:
+                now = monotonic()
+                unsent_deadline = (self.__unsent_since if self.__unsent else now) + self.save_interval
+                timeout = max((min(deadline, unsent_deadline) if histograms or chunks else unsent_deadline) - now, 0)
+                try: item = self.queue.get(timeout=timeout)
+                except Empty: item = False
+                if item is False and (chunk := self.__take_unsent()) is not None:
+                    chunks.append(chunk)
+                    nb_rows += len(chunk["timestep"])
+                elif item is False and not (histograms or chunks):
+                    self.__update_catalog()
+                    continue
+                if isinstance(item, tuple):
+                    kind, record = item
+                    if not (histograms or chunks): deadline = monotonic() + self.save_interval
+                    if kind == HISTOGRAM:
+                        histograms.append(record)
+                        if len(histograms) < self.batch_size: continue
+                    else:
+                        chunks.append(record)
+                        nb_rows += len(record["timestep"])
+                        if nb_rows < self.batch_size and not self.queue.empty(): continue # gather a backlog of chunks
+                start, position, failed = perf_counter(), f.tell(), False
+                try: self.__write(f, chunks, histograms)
+                except Exception as error: self.error, failed = error, True
+                self.__update_catalog(force=isinstance(item, Event) or item is None)
+                if self.instruments is not None and (chunks or histograms):
+                    self.__instrument(nb_rows, len(histograms), perf_counter() - start, f.tell() - position, failed)
+                if failed and retries < self.RETRIES and item is not None: # retried with the next write
+                    retries, deadline = retries + 1, monotonic() + self.save_interval
+                else:
+                    if failed: self.__lose(nb_rows)
+                    chunks, histograms, nb_rows, retries = [], [], 0, 0
+                if isinstance(item, Event): item.set()
+                elif item is None:
+                    if self.__connection is not None: self.__connection.close()
+                    return
+
+    def __instrument(self, nb_rows: int, nb_histograms: int, seconds: float, nb_bytes: int, failed: bool) -> None:
+
+        """
+        Record the duration (catalog update included) and size of a write, and whether it failed.
+        """
+
+        self.instruments.record("save", seconds)
+        self.instruments.add("bytes_written", nb_bytes)
+        self.instruments.add("rows_written", nb_rows)
+        self.instruments.add("histograms_written", nb_histograms)
+        if failed: self.instruments.add("write_errors")
+
+    def __lose(self, nb_rows: int) -> None:
+
+        """
+        Count the rows of a write dropped after failing ``RETRIES + 1`` times.
+        """
+
+        self.lost_rows += nb_rows
+        if self.instruments is not None: self.instruments.add("rows_lost", nb_rows)
+
+    def __write(self, f, chunks: list[dict], histograms: list[dict]) -> None:
+
+        """
+        Append chunks of rows to the session file as a single chunk, followed by the histograms, and index the chunk.
+        A write failing before its manifest is published is removed from the session file and its index to be retried. The
+        summary statistics are folded afterwards, and an error folding them is raised later without retrying the write.
+        """
+
+        if not (chunks or histograms): return
+        chunk, offset = self.__chunk(chunks), f.tell()
+        index_size = getsize(index_path(self.path)) if exists(index_path(self.path)) else 0
+        try:
+            if chunk and self.encoding: write_record(f, PACKED, encode_chunk(chunk, **self.encoding))
+            elif chunk: write_record(f, CHUNK, chunk)
+            for histogram in histograms: write_record(f, HISTOGRAM, histogram)
+            f.flush()
+            append_index(self.path, f.tell(), offset, chunk)
+            write_manifest(self.path, f.tell(), self.__generation + 1, self.__session)
+        except Exception:
+            self.__rollback(f, offset, index_size)
+            raise
+        self.__generation += 1
+        if chunk is None: return
+        self.__rows += len(chunk["timestep"])
+        self.__metrics.update(dict.fromkeys(chunk["logs"]))
+        if self.catalog is None: return
+        last_timestep = chunk["timestep"][-1]
+        if isinstance(last_timestep, np.generic): last_timestep = last_timestep.item()
+        self.__last_timestep, self.__catalog_pending = last_timestep, True
+        try: self.__summarize(chunk)
+        except Exception as error: self.error = error
+
+    def __update_catalog(self, force: bool = False) -> None:
+
+        """
+        Write the catalog entry of the session if it changed, at most once per ``save_interval`` unless forced, through a
+        connection kept open by the thread. An error is raised later without retrying the writes.
+        """
+
+        if not self.__catalog_pending or not force and monotonic() < self.__catalog_deadline: return
+        self.__catalog_pending, self.__catalog_deadline = False, monotonic() + self.save_interval
+        try:
+            if self.__connection is None: self.__connection = self.catalog.connect()
+            self.catalog.update(
+                self.session_name, list(self.__metrics), self.__rows, self.__last_timestep, self.__summary, self.rank,
+                self.__connection,
+            )
+        except Exception as error: self.error = error
+
+    def __rollback(self, f, offset: int, index_size: int) -> None:
+
+        """
+        Truncate the session file and its index back to their size before a failed write, as far as possible.
+        """
+
+        try:
+            f.seek(offset)
+            f.truncate()
+        except Exception: pass
+        try:
+            with open(index_path(self.path), "r+") as index: index.truncate(index_size)
+        except Exception: pass
+
+    def __take_unsent(self) -> dict|None:
+
+        """
+        Assemble the rows recorded with ``put_row`` more than ``save_interval`` seconds ago into a chunk, unless a chunk is
+        queued (to be written first) or being handed over by the training thread.
+        """
+
+        if not self.__lock.acquire(blocking=False): return None
+        try:
+            if not self.__unsent or not self.queue.empty() or monotonic() < self.__unsent_since + self.save_interval: return None
+            rows, start = self.__unsent, self.__handed
+            self.__unsent, self.__handed = [], start + len(rows)
+        finally: self.__lock.release()
+        row_logs: dict[str: tuple[list, list]] = {}
+        for row, (_, logs) in enumerate(rows, start):
+            for log_name, value in logs.items():
+                if value is None: continue
+                log_rows, values = row_logs.setdefault(log_name, ([], []))
+                log_rows.append(row)
+                values.append(value)
+        return {
+            "start": start,
+            "timestep": Column([timestep for timestep, _ in rows]),
+            "logs": {log_name: Series(log_rows, values, self.dtype) for log_name, (log_rows, values) in row_logs.items()},
+        }
+
+    def __chunk(self, chunks: list[dict]) -> dict|None:
+
+        """
+        Concatenate consecutive chunks into a single one, copying each series once. None without chunks.
+        """
+
+        if len(chunks) <= 1: return chunks[0] if chunks else None
+        log_names = {log_name: None for chunk in chunks for log_name in chunk["logs"]}
+        return {
+            "start": chunks[0]["start"],
+            "timestep": Column.concatenate([chunk["timestep"] for chunk in chunks]),
+            "logs": {
+                log_name: Series.concatenate([chunk["logs"][log_name] for chunk in chunks if log_name in chunk["logs"]])
+                for log_name in log_names
+            },
+        }
+
+    def __summarize(self, chunk: dict) -> None:
+
+        """
+        Fold the numeric values of a chunk into the summary statistics of their metrics.
+        """
+
+        timesteps = chunk["timestep"].values
+        for log_name, series in chunk["logs"].items():
+            if series.dtype is None or series.dtype.kind not in "biuf": continue
+            if log_name not in self.__summary: self.__summary[log_name] = Summary()
+            self.__summary[log_name].update(series.values.values, timesteps[series.rows.values - chunk["start"]])
@@ -1,8 +1,10 @@
 from typing import Iterable, Generator
-from time import time
+from time import time, perf_counter
 from datetime import timedelta
 
 from deeplogs.logger import Logger
+from deeplogs._render import RENDERER
+from deeplogs._instrument import PREFIX
 
 class Bar():
     
@@ -17,6 +19,17 @@ class Bar():
         empty_char (str, optional): Character to represent empty space in the progress bar. Default is a single space ' '.
         fill_char (str, optional): Character to represent filled space in the progress bar. Default is the Unicode block character u"\u2588".
         print_interval (float, optional): Time interval (in seconds) between progress bar updates. Default is 0.2 seconds.
+        render_thread (bool, optional): Draw the progress bar from a background thread sampling the iteration counter, so
+            that the loop only increments it. Default is False.
+        max_interval (float, optional): Maximum time (in seconds) between two updates when the iterations slow down.
+            None to disable it. Default is 10.0 seconds.
+
+    Without a render thread, the clock is only read every ``miniters`` iterations, ``miniters`` being calibrated on the
+    observed iteration rate so that the bar is still updated about every ``print_interval``. As in tqdm, a monitor thread
+    redraws the bar when it was not updated for ``max_interval``, so that a slowdown after fast iterations does not
+    freeze it until the next ``miniters`` iterations.
+    Nested or concurrent bars are drawn on separate lines by a shared renderer. With an instrumented logger, the draws
+    made from the loop are timed as "bar_draw", and the ``_deeplogs/*`` logs are not displayed.
     """
     
     def __init__(
@@ -28,6 +41,8 @@ class Bar():
         empty_char: str = " ",
         fill_char: str = u"\u2588",
         print_interval: float = 0.2,
+        render_thread: bool = False,
+        max_interval: float = 10.,
     ):
 
         self.logger = logger
@@ -37,6 +52,12 @@ class Bar():
         self.empty_char = empty_char
         self.fill_char = fill_char
         self.print_interval = print_interval
+        self.render_thread = render_thread
+        self.max_interval = max_interval
+        self.n: int = 0
+        self.total: int = None
+        self.t0: float = None
+        self.last_draw: float = None
     
     @staticmethod
     def __format_seconds(seconds: float) -> str:
@@ -64,37 +85,66 @@ class Bar():
             Generator[int, float, str]: A generator that yields elements from the original iterator.
         """
 
-        if self.description: 
-            self.description += ": "
         try: iterator_length = len(iterator)
         except: assert iterator_length, "Need to specify the iterator_length"
-        t0 = time()
-        last_print = t0 - self.print_interval
-        for i, args in enumerate(iterator):
-            yield args
-            if time() - last_print >= self.print_interval or (i+1) == iterator_length:
-                logs_string = []
-                if self.logger:
-                    for log_name, log_list in self.logger.L.logs.items():
-                        running_list = log_list[-self.rms:]
-                        logs_string.append(
-                            f"{log_name}: {round(sum(running_list)/len(running_list), 3):>5}"
-                        )
-                
-                perc = (i+1) / iterator_length
-                nb_fill = int(self.bar_size * perc)
-                nb_empty = self.bar_size - nb_fill
-                elapsed_time = time() - t0
-                eta = (elapsed_time / perc) - elapsed_time
-                iter_per_sec = (i+1) / elapsed_time
-                
-                string = "{}{:>4.0%}|{}{}| {}/{} [{}<{}, {:.2F}it/s] {}"
-                print(string.format(
-                    self.description,
-                    perc,
-                    self.fill_char*nb_fill, self.empty_char*nb_empty,
-                    i+1, iterator_length,
-                    self.__format_seconds(elapsed_time), self.__format_seconds(eta), iter_per_sec,
-                    " | ".join(logs_string),
-                ), end="\r")
-                last_print = time()
\ No newline at end of file
+        if self.logger: self.logger.running_stats(self.rms)
+        self.n, self.total, self.t0 = 0, iterator_length, time()
+        self.last_draw = self.t0
+        RENDERER.register(self)
+        try:
+            if self.render_thread:
+                for args in iterator:
+                    yield args
+                    self.n += 1
+                return
+            instruments = self.logger.instruments if self.logger else None
+            miniters, next_check = 1, 1
+            last_print, last_n = self.t0 - self.print_interval, 0
+            for args in iterator:
+                yield args
+                self.n += 1
+                if self.n < next_check: continue
+                now = time()
+                if now - last_print >= self.print_interval:
+                    if instruments is None: RENDERER.draw()
+                    else:
+                        start = perf_counter()
+                        RENDERER.draw()
+                        instruments.record("bar_draw", perf_counter() - start)
+                    if now > last_print: miniters = max(1, int((self.n - last_n) * self.print_interval / (now - last_print)))
+                    last_print, last_n = now, self.n
+                next_check = self.n + miniters
+        finally: RENDERER.unregister(self)
+    
+    def render(self) -> str:
+        
+        """
+        Format the current line of the progress bar, with the running means of the logs.
+
+        Returns:
+            str: The line.
+        """
+        
+        logs_string = []
+        if self.logger:
+            for log_name, stats in self.logger.running_stats(self.rms).items():
+                if log_name.startswith(PREFIX): continue
+                logs_string.append(f"{log_name}: {round(stats['mean'], 3):>5}")
+        
+        perc = self.n / self.total if self.total else 1.
+        nb_fill = int(self.bar_size * perc)
+        nb_empty = self.bar_size - nb_fill
+        self.last_draw = time()
+        elapsed_time = self.last_draw - self.t0
+        eta = (elapsed_time / perc) - elapsed_time if perc else 0
+        iter_per_sec = self.n / elapsed_time if elapsed_time else 0
+        
+        string = "{}{:>4.0%}|{}{}| {}/{} [{}<{}, {:.2F}it/s] {}"
+        return string.format(
+            f"{self.description}: " if self.description else "",
+            perc,
+            self.fill_char*nb_fill, self.empty_char*nb_empty,
+            self.n, self.total,
+            self.__format_seconds(elapsed_time), self.__format_seconds(eta), iter_per_sec,
+            " | ".join(logs_string),
+        )
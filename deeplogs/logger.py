@@ -1,15 +1,31 @@
-from typing import Any
-from pickle import dump, load
-from os import PathLike, makedirs, remove
-from threading import Timer
+from typing import Any, Iterable, Literal, TYPE_CHECKING
+from os import PathLike, makedirs, remove, replace
+from os.path import exists, getsize
+import atexit
+from numbers import Real
+from functools import partial
+from contextlib import ExitStack
+from uuid import uuid4
+from time import perf_counter, monotonic
 from dataclasses import dataclass, field
-import pandas as pd
 import numpy as np
-from PIL import Image
-from math import ceil
-from functools import wraps
 from shutil import copy
-from time import sleep
+
+from deeplogs._column import Column, Series
+from deeplogs._writer import Writer
+from deeplogs._catalog import Catalog
+from deeplogs._image import VALID_FORMAT, ImageWorkers, save_image, encode_frame
+from deeplogs._imagestore import ImageStore
+from deeplogs._stats import RollingStats
+from deeplogs._sketch import Sketch
+from deeplogs._arrow import log_to_arrow
+from deeplogs._instrument import Instruments
+from deeplogs._storage import (
+    MAGIC, LEGACY, META, CHUNK, HISTOGRAM, SessionReader, write_record, read_record, write_manifest, read_manifest, shard_path,
+    shard_paths, write_index, append_index, read_index,
+)
+
+if TYPE_CHECKING: import pandas as pd
 
 @dataclass
 class Log():
@@ -21,66 +37,353 @@ class Log():
         name (str): Name of the model or log entry.
         description (str, optional): Description of the log. Default is an empty string.
         hyperparams (dict, optional): Dictionary containing hyperparameters for the model. Default is an empty dictionary.
-        timestep (list of int or float, optional): List to store the timesteps of logged data. Default is an empty list.
-        logs (dict of str to list, optional): Dictionary to store the logged data with keys as log names and values as lists
-            of corresponding log values. Default is an empty dictionary.
+        timestep (Column or list of int or float, optional): Column to store the timesteps of logged data. Default is empty.
+        logs (dict of str to Series or list, optional): Dictionary to store the logged data with keys as log names and values as
+            sparse series of (row, value) pairs, the timestep of a row being ``timestep[row]``. Dense lists are accepted,
+            ``None`` marking a missing value. Default is an empty dictionary.
+        histograms (dict of str to list, optional): Dictionary to store the logged distributions with keys as tags and values
+            as lists of (timestep, Sketch) pairs. Default is an empty dictionary.
     """
     
     name: str
     description: str = ""
     hyperparams: dict = field(default_factory=lambda: {})
-    timestep: list[int|float] = field(default_factory=lambda: [])
-    logs: dict[str: list] = field(default_factory=lambda: {})
+    timestep: Column = field(default_factory=Column)
+    logs: dict[str: Series] = field(default_factory=lambda: {})
+    histograms: dict[str: list[tuple[int|float, Sketch]]] = field(default_factory=lambda: {})
+    
+    def __post_init__(self):
+        if not isinstance(self.timestep, Column): self.timestep = Column(self.timestep)
+        self.logs = {
+            log_name: series if isinstance(series, Series) else Series.from_dense(series)
+            for log_name, series in self.logs.items()
+        }
     
     def save(self, path: PathLike|str) -> None:
         
         """
-        Save the Log object to a file using pickle.
+        Save the whole Log object to a session file, replacing any previous content.
+        The file is written next to its destination and renamed, so readers never see a partial file.
 
         Args:
             path (PathLike or str): The file path where the Log object will be saved.
         """
         
-        with open(path, "wb") as f: dump(self.__dict__, f)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(MAGIC)
+            write_record(f, META, {"name": self.name, "description": self.description, "hyperparams": self.hyperparams})
+            for tag, histograms in self.histograms.items():
+                for timestep, sketch in histograms: write_record(f, HISTOGRAM, {"timestep": timestep, "tag": tag, "sketch": sketch})
+            size = f.tell()
+        replace(f"{path}.tmp", path)
+        session = uuid4().hex
+        write_index(path, size, session)
+        write_manifest(path, size, 0, session)
+        self.append(path)
+    
+    def append(self, path: PathLike|str, start: int = 0) -> int:
+        
+        """
+        Append the rows logged since ``start`` to a session file as a single chunk, and index the chunk.
+        Rows are encoded once, so each call only costs the size of what is new.
+
+        Args:
+            path (PathLike or str): The session file previously created with ``save``.
+            start (int, optional): Index of the first row that is not saved yet. Default is 0.
+
+        Returns:
+            int: The number of rows saved in the file, to be passed as ``start`` on the next call.
+        """
+        
+        end = len(self.timestep)
+        if end <= start: return start
+        chunk = self.chunk(start, end)
+        with open(path, "ab") as f:
+            offset = f.tell()
+            write_record(f, CHUNK, chunk)
+            size = f.tell()
+        append_index(path, size, offset, chunk)
+        manifest = read_manifest(path)
+        write_manifest(path, size, manifest["generation"] + 1, manifest["session"])
+        return end
+    
+    def chunk(self, start: int, end: int) -> dict:
+        
+        """
+        Copy the rows in ``[start, end)`` into a chunk, as appended in ``CHUNK`` records.
+
+        Args:
+            start (int): Index of the first row.
+            end (int): Index after the last row.
+
+        Returns:
+            dict: The chunk, with the "start" row, the "timestep" Column and the non empty Series of each log.
+        """
+        
+        logs = {log_name: series for log_name, series in list(self.logs.items()) if series.last_row >= start}
+        logs = {log_name: series.take_rows(start, end) for log_name, series in logs.items()}
+        return {
+            "start": start,
+            "timestep": self.timestep.take(start, end),
+            "logs": {log_name: series for log_name, series in logs.items() if len(series)},
+        }
+    
+    def extend(self, chunks: list[dict]) -> None:
+        
+        """
+        Extend the Log object in place with the rows of chunks read from a session file.
+        The chunks are concatenated first so that each series is only extended once.
+
+        Args:
+            chunks (list of dict): Decoded chunk records, in file order.
+        """
+        
+        log_names = {log_name: None for chunk in chunks for log_name in chunk["logs"]}
+        for log_name in log_names:
+            series = Series.concatenate([chunk["logs"][log_name] for chunk in chunks if log_name in chunk["logs"]])
+            if log_name in self.logs: self.logs[log_name].extend(series)
+            else: self.logs[log_name] = series
+        self.timestep.extend(Column.concatenate([chunk["timestep"] for chunk in chunks]))
+    
+    def extend_records(self, records: list[tuple[int, Any]]) -> None:
+        
+        """
+        Extend the Log object in place with records read from a session file.
+
+        Args:
+            records (list of tuple[int, Any]): ``CHUNK`` and ``HISTOGRAM`` records, in file order.
+        """
+        
+        self.extend([record for kind, record in records if kind == CHUNK])
+        for kind, record in records:
+            if kind == HISTOGRAM: self.histograms.setdefault(record["tag"], []).append((record["timestep"], record["sketch"]))
+    
+    def is_consistent(self) -> bool:
+        
+        """
+        Check that every series of the Log only refers to existing rows.
+
+        Returns:
+            bool: True if the Log is consistent.
+        """
+        
+        return all(series.is_consistent(len(self.timestep)) for series in self.logs.values())
+    
+    @classmethod
+    def from_records(cls, records: list[tuple[int, Any]], path: PathLike|str = ""):
+        
+        """
+        Create a Log object from the records of a session file, starting with its ``META`` (or ``LEGACY``) record.
+
+        Args:
+            records (list of tuple[int, Any]): The records, as returned by ``SessionReader.read``.
+            path (PathLike or str, optional): The session file, used in error messages. Default is an empty string.
+
+        Returns:
+            Log: The created Log object.
+        """
+        
+        kind, record = records[0]
+        if kind == LEGACY:
+            logs_lengths = [len(log_list) for log_list in record["logs"].values()] + [len(record["timestep"])]
+            if len(set(logs_lengths)) != 1: raise ValueError(f"Inconsistent session file: {path}")
+            return cls(**record)
+        L = cls(**record)
+        L.extend_records(records[1:])
+        if not L.is_consistent(): raise ValueError(f"Inconsistent session file: {path}")
+        return L
+    
+    @classmethod
+    def merge(cls, logs: dict[int: "Log"], reduce: Literal["mean", "sum", "min", "max"]|None = None):
+        
+        """
+        Merge the Log objects written by several ranks of a session, aligning their rows on the timesteps.
+        A timestep logged several times by a rank (e.g. after a restart from a checkpoint) keeps the last value of each log
+        before the ranks are combined. The metadata of the session is taken from the lowest rank.
+
+        Args:
+            logs (dict[int: Log]): The Log objects, by rank.
+            reduce (Literal["mean", "sum", "min", "max"] or None, optional): How the values logged by several ranks at the
+                same timestep are combined into one log. With None, each rank keeps its own logs, named ``{log}/rank{k}``.
+                Non numeric logs keep the value of the lowest rank. Default is None. The histograms logged by several ranks
+                at the same timestep are always merged into the distribution of all their values.
+
+        Returns:
+            Log: The merged Log object.
+        """
+        
+        import pandas as pd
+        frames = []
+        for rank, L in sorted(logs.items()):
+            df = L.scalar_to_dataframe().droplevel(0)
+            df = df.groupby(level=0, sort=False).last()
+            if reduce is None: df.columns = [f"{log_name}/rank{rank}" for log_name in df.columns]
+            frames.append(df)
+        df = pd.concat(frames)
+        df = df.groupby(level=0, sort=True).agg({
+            log_name: reduce if reduce and pd.api.types.is_numeric_dtype(df[log_name]) else "first" for log_name in df.columns
+        }) if len(df.columns) else df.groupby(level=0, sort=True).first()
+        histograms: dict[str: dict] = {}
+        for rank, L in sorted(logs.items()):
+            for tag, tag_histograms in L.histograms.items():
+                merged = histograms.setdefault(tag, {})
+                for timestep, sketch in tag_histograms:
+                    if timestep not in merged: merged[timestep] = Sketch(sketch.relative_accuracy, sketch.max_bins)
+                    merged[timestep].merge(sketch)
+        first = logs[min(logs)]
+        return cls(
+            first.name, first.description, first.hyperparams, Column(df.index.to_numpy()),
+            {log_name: Series.from_pandas(df[log_name]) for log_name in df.columns},
+            {tag: sorted(merged.items(), key=lambda item: item[0]) for tag, merged in histograms.items()},
+        )
     
     @classmethod
-    def load(cls, path: PathLike|str):
+    def load(cls, path: PathLike|str, reduce: Literal["mean", "sum", "min", "max"]|None = None):
         
         """
-        Load a Log object from a file using pickle.
+        Load a Log object from a session file.
+        Only the part of the file committed in its manifest is read, so a session that is being written is always read
+        as its last complete snapshot, in a single pass. Sessions saved with the legacy pickle format are still supported.
+        A session written by several ranks is loaded from its shards and merged (see ``merge``).
 
         Args:
             path (PathLike or str): The file path from which the Log object will be loaded.
+            reduce (Literal["mean", "sum", "min", "max"] or None, optional): How the shards of a session written by several
+                ranks are combined, see ``merge``. Default is None.
+
+        Returns:
+            Log: The loaded Log object.
+        """
+        
+        if not exists(path) and (shards := shard_paths(path)):
+            return cls.merge({rank: cls.load(shard) for rank, shard in shards.items()}, reduce)
+        return cls.from_records(SessionReader(path).read(), path)
+        
+    @classmethod
+    def load_range(
+        cls,
+        path: PathLike|str,
+        start: int|float = None,
+        stop: int|float = None,
+        logs: list[str] = [],
+        reduce: Literal["mean", "sum", "min", "max"]|None = None,
+    ):
+        
+        """
+        Load the rows of a session file logged at a timestep in ``[start, stop)``, with only some of its scalar logs.
+        Only the chunks whose timesteps overlap the range and that hold one of the logs in it are read, as found in the
+        chunk index written next to the session file. Sessions without a valid index (e.g. written by an older version)
+        are loaded whole, then sliced. Histograms are not loaded.
+
+        Args:
+            path (PathLike or str): The session file.
+            start (int or float, optional): First timestep of the range. Default is None, unbounded.
+            stop (int or float, optional): Timestep after the range. Default is None, unbounded.
+            logs (list of str, optional): Names of the scalar logs to load. Default is all.
+            reduce (Literal["mean", "sum", "min", "max"] or None, optional): How the shards of a session written by several
+                ranks are combined, see ``merge``. Default is None.
 
         Returns:
             Log: The loaded Log object.
         """
         
-        SLEEP_TIME: float = 0.1
-        try: 
-            with open(path, "rb") as f: L = cls(**load(f))
-        except: 
-            sleep(SLEEP_TIME)
-            return Log.load(path)
-        logs_lengths = [len(log_list) for log_list in L.logs.values()] + [len(L.timestep)]
-        if len(set(logs_lengths)) == 1: return L
-        sleep(SLEEP_TIME)
-        return Log.load(path)
+        if not exists(path) and (shards := shard_paths(path)):
+            return cls.merge({rank: cls.load_range(shard, start, stop, logs) for rank, shard in shards.items()}, reduce)
+        manifest = read_manifest(path)
+        entries = None if manifest is None else read_index(path, manifest)
+        if entries is None: return cls.load(path).select(start, stop, logs)
+
+        def overlaps(bounds: list|None) -> bool:
+            return bounds is None or ((start is None or bounds[1] >= start) and (stop is None or bounds[0] < stop))
+
+        entries = [
+            entry for entry in entries if overlaps(entry["timestep"])
+            and (not logs or any(log_name in entry["logs"] and overlaps(entry["logs"][log_name]) for log_name in logs))
+        ]
+        with open(path, "rb") as f:
+            records = [read_record(f, offset) for offset in [len(MAGIC)] + [entry["offset"] for entry in entries]]
+        if any(record is None for record in records): raise ValueError(f"Inconsistent session file: {path}")
+        L = cls(**records[0][1])
+        L.extend(cls.__slice([record for _, record in records[1:]], start, stop, logs))
+        return L
+    
+    def select(self, start: int|float = None, stop: int|float = None, logs: list[str] = []):
+        
+        """
+        Copy the rows logged at a timestep in ``[start, stop)``, with only some of the scalar logs, into a new Log object.
+        Timesteps do not have to increase (e.g. in a run restarted from a checkpoint): every row in the range is kept, in
+        logging order. Histograms are not copied.
+
+        Args:
+            start (int or float, optional): First timestep of the range. Default is None, unbounded.
+            stop (int or float, optional): Timestep after the range. Default is None, unbounded.
+            logs (list of str, optional): Names of the scalar logs to copy. Default is all.
+
+        Returns:
+            Log: The new Log object.
+        """
         
-    def scalar_to_dataframe(self) -> pd.DataFrame:
+        L = Log(self.name, self.description, self.hyperparams)
+        L.extend(self.__slice([{"start": 0, "timestep": self.timestep, "logs": self.logs}], start, stop, logs))
+        return L
+    
+    @staticmethod
+    def __slice(chunks: list[dict], start: int|float, stop: int|float, logs: list[str]) -> list[dict]:
+        
+        """
+        Select the rows of chunks logged at a timestep in ``[start, stop)``, and the given logs, into chunks numbered from 0.
+        Each row is tested on its own, so timesteps do not have to increase.
+        """
+        
+        sliced, nb_rows = [], 0
+        for chunk in chunks:
+            timesteps = chunk["timestep"].values
+            keep = np.ones(len(timesteps), bool)
+            if start is not None: keep &= timesteps >= start
+            if stop is not None: keep &= timesteps < stop
+            sliced.append({
+                "start": nb_rows,
+                "timestep": chunk["timestep"].compress(keep),
+                "logs": {
+                    log_name: series.select_rows(keep, chunk["start"], nb_rows) for log_name, series in chunk["logs"].items()
+                    if not logs or log_name in logs
+                },
+            })
+            nb_rows += int(keep.sum())
+        return sliced
+        
+    def scalar_to_dataframe(self) -> "pd.DataFrame":
         
         """
         Convert the scalar log data to a pandas DataFrame for easy analysis and visualization.
+        The sparse series are outer joined on the rows. The values are copied, so the DataFrame can be modified freely.
 
         Returns:
             pd.DataFrame: A pandas DataFrame with log data and timesteps organized in columns and rows, respectively.
         """
         
+        import pandas as pd
+        nb_rows = len(self.timestep)
         return pd.DataFrame(
-            self.logs,
-            index=pd.MultiIndex.from_product([[self.name], self.timestep])
+            {log_name: series.to_dense(nb_rows) for log_name, series in self.logs.items()},
+            index=pd.MultiIndex.from_product([[self.name], self.timestep.values]),
         )
 
+    def to_arrow(self, logs: list[str] = []):
+        
+        """
+        Convert the scalar log data to an Arrow table, with a "timestep" column and a column per log. Requires pyarrow.
+        Numeric logs logged at every timestep are not copied.
+
+        Args:
+            logs (list of str, optional): Names of the logs to convert. Default is all.
+
+        Returns:
+            pyarrow.Table: The table, with the name, description and hyperparameters of the session in its schema metadata.
+        """
+        
+        return log_to_arrow(self, logs)
+
 class Logger():
     
     """
@@ -91,7 +394,47 @@ class Logger():
         description (str, optional): Description of the session. Default is an empty string.
         hyperparams (dict, optional): Dictionary containing hyperparameters of the session. Default is an empty dictionary.
         folder_path (PathLike or str, optional): Path to the folder where logs will be saved. Default is './dplogs/'.
-        save_interval (float, optional): Time interval (in seconds) between automatic saves. Default is 5.0 seconds.
+        save_interval (float, optional): Time interval (in seconds) between automatic saves. The rows logged since the last
+            save are handed over to the background thread every ``batch_size`` rows, by the first ``scalar`` call near the end of
+            the interval, or else by the thread itself. Default is 5.0 seconds.
+        scalar_dtype (str, optional): Type used to store the values of new scalar logs (e.g. "float32" to halve memory),
+            other numeric values being cast to it. Default is inferred from the logged values, and widened without loss
+            (e.g. float32 to float64 when a float64 is logged).
+        batch_size (int, optional): Number of logged rows that triggers a save before ``save_interval``. Default is 4096.
+        queue_size (int, optional): Maximum number of saves (chunks of rows or histograms) waiting to be written. Logging
+            blocks when it is reached. Default is 65536.
+        timestep_encoding (Literal["raw", "delta", "delta2"], optional): On-disk encoding of integer timesteps: raw, first
+            differences or second differences, in the narrowest integer type. Float timesteps are XOR encoded with any
+            encoding but "raw". Default is "raw".
+        value_encoding (Literal["raw", "xor", "float32"], optional): On-disk encoding of float values: raw, XOR with the
+            previous value (lossless), or downcast to float32 (lossy). Default is "raw".
+        compression (Literal["none", "zlib", "zstd", "lz4"], optional): Compression of each saved chunk. "zstd" and "lz4"
+            require the zstandard and lz4 packages. Default is "none".
+        histogram_accuracy (float, optional): Relative accuracy of the quantiles of the logged histograms. Default is 0.01.
+        image_workers (int, optional): Number of workers encoding and writing images in the background. With 0, ``image``
+            saves synchronously. Default is 0.
+        image_executor (Literal["thread", "process"], optional): Kind of pool of the image workers. Default is "thread".
+        image_queue_size (int, optional): Maximum number of images waiting to be saved. Default is 16.
+        image_policy (Literal["block", "drop"], optional): What ``image`` does when ``image_queue_size`` images are waiting:
+            wait for one of them to be saved, or drop the new image. Default is "block".
+        rank (int, optional): Rank of the process in a multi-process run. Each rank writes its own shard of the session
+            (``.log.rank{k}``) without locking, and the shards are merged when the session is read. Only rank 0 registers
+            the session in the catalog, where each rank updates the shape of its shard. Images should be logged by a
+            single rank. Default is None (single process).
+        image_store (Literal["files", "packed"], optional): How images are saved: one PNG file per image, or one
+            append-only container per tag (``images/{tag}.dat`` with its ``images/{tag}.idx`` index), which keeps the number
+            of files constant on long runs. Default is "files".
+        image_codec (Literal["png", "zstd", "webp"], optional): Codec of the packed images. "zstd" stores the raw pixels
+            losslessly compressed and requires the zstandard package. Default is "png".
+        instrument (bool, optional): Measure the time and bytes spent inside deeplogs: calls and latency of ``scalar``,
+            ``histogram`` and ``image``, duration and size of the saves, and queue depths. See ``stats``. Default is False.
+        instrument_interval (float, optional): Time (in seconds) between two snapshots of the instrumentation logged in the
+            session by ``scalar``, as ``_deeplogs/*`` scalar logs. Setting it enables the instrumentation. Default is None.
+
+    The logs are saved by a single background thread, to which the logged rows are handed over as chunks copied from
+    the Log object. Use ``close`` (or the Logger as a context
+    manager) to save the last rows and stop it; it is also called when the interpreter exits. The session is also registered in the catalog
+    of the log folder, which is refreshed on each save.
     """
     
     def __init__(
@@ -101,87 +444,192 @@ class Logger():
         hyperparams: dict = {},
         folder_path: PathLike[str]|str = "./dplogs/",
         save_interval: float = 5.,
+        scalar_dtype: str = None,
+        batch_size: int = 4096,
+        queue_size: int = 65536,
+        timestep_encoding: Literal["raw", "delta", "delta2"] = "raw",
+        value_encoding: Literal["raw", "xor", "float32"] = "raw",
+        compression: Literal["none", "zlib", "zstd", "lz4"] = "none",
+        histogram_accuracy: float = 0.01,
+        image_workers: int = 0,
+        image_executor: Literal["thread", "process"] = "thread",
+        image_queue_size: int = 16,
+        image_policy: Literal["block", "drop"] = "block",
+        rank: int = None,
+        image_store: Literal["files", "packed"] = "files",
+        image_codec: Literal["png", "zstd", "webp"] = "png",
+        instrument: bool = False,
+        instrument_interval: float = None,
     ):
         self.L: Log = Log(name, description, hyperparams)
         
         self.log_folder_path: str = f"{folder_path}{name}/"
         self.image_folder_path: str = f"{self.log_folder_path}images/"
         self.save_interval = save_interval
-        self.__need_save: bool = True
+        self.batch_size = batch_size
+        self.scalar_dtype = scalar_dtype
+        self.histogram_accuracy = histogram_accuracy
+        self.image_store = image_store
+        self.image_codec = image_codec
+        self.rank = rank
         
+        path = self.log_folder_path + ".log" if rank is None else shard_path(self.log_folder_path + ".log", rank)
         makedirs(self.image_folder_path, exist_ok=True)
+        self.L.save(path)
+        if not rank: ImageStore.reset(self.image_folder_path) # as the session file, the images of a previous run are reset
+        catalog = Catalog(folder_path)
+        if not rank: catalog.register(name, description, hyperparams)
+        self.__instruments: Instruments = Instruments(
+            {"session": name} if rank is None else {"session": name, "rank": rank}, instrument_interval,
+        ) if instrument or instrument_interval is not None else None
+        encoding = {"timestep_encoding": timestep_encoding, "value_encoding": value_encoding, "compression": compression}
+        self.__writer: Writer = Writer(
+            path, save_interval, batch_size, queue_size, scalar_dtype, catalog, name,
+            encoding if encoding != {"timestep_encoding": "raw", "value_encoding": "raw", "compression": "none"} else None,
+            self.__instruments, rank,
+        )
+        self.__writer.start()
+        self.__deadline: float = None
+        self.__images: ImageWorkers = ImageWorkers(
+            image_workers, image_executor, image_queue_size, image_policy,
+        ) if image_workers > 0 else None
+        self.__image_stores: dict[str: ImageStore] = {}
+        self.__stats: dict[int: dict[str: RollingStats]] = {}
+        if self.__instruments is not None:
+            self.__instruments.observe("queue_depth", self.__writer.queue.qsize)
+            if self.__images is not None:
+                self.__instruments.observe("image_queue_depth", lambda: self.__images.pending)
+                self.__instruments.observe("images_dropped", lambda: self.__images.dropped, "counter")
+        atexit.register(self.close)
     
-    def __save_timer(func):
+    def scalar(self, timestep: int|float, **logs: dict[str: Any]) -> None:
         
         """
-        Decorator to schedule automatic log saving.
+        Log scalar data at a specific timestep.
 
         Args:
-            func (Callable): A function or method that triggers log changes.
-
-        Returns:
-            Callable: A wrapped function or method that schedules log saving after a specified interval.
+            timestep (int or float): The timestep associated with the logged data.
+            **logs (dict[str: Any]): Keyword arguments representing the logged data with log names as keys and
+                corresponding scalar values as values.
         """
         
-        @wraps(func)
-        def wrapper(self, *args, **kwargs):
-            if self.__need_save:
-                self.__need_save = False
-                Timer(self.save_interval, self.__save_logs).start()
-            results = func(self, *args, **kwargs)
-            return results
-        return wrapper
+        instruments = self.__instruments
+        if instruments is not None:
+            start = perf_counter()
+            if instruments.due(): logs = {**logs, **instruments.series()}
+        row, series = len(self.L.timestep), self.L.logs
+        for log_name, value in logs.items():
+            if value is None: continue
+            if log_name not in series: series[log_name] = Series(dtype=self.scalar_dtype)
+            series[log_name].append(row, value)
+            if not self.__stats or not isinstance(value, Real): continue
+            for window, stats in self.__stats.items():
+                if log_name not in stats: stats[log_name] = RollingStats(window)
+                stats[log_name].update(value)
+        self.L.timestep.append(timestep)
+        unsent = self.__writer.put_row(timestep, logs)
+        if unsent >= self.batch_size: self.__hand_over()
+        elif unsent == 1: self.__deadline = monotonic() + 0.9 * self.save_interval # before the thread assembles the rows itself
+        elif monotonic() >= self.__deadline: self.__hand_over()
+        if instruments is not None: instruments.record("scalar", perf_counter() - start)
+
+    def scalars_batch(self, timesteps: np.ndarray|Iterable[int|float], **logs: np.ndarray) -> None:
+
+        """
+        Log the scalar data of several timesteps at once, e.g. metrics accumulated on a device and pulled back every few
+        steps. The values are appended with vectorized operations, the running statistics are updated once per log, and
+        the rows are handed over to be saved as a single chunk.
 
-    def __save_logs(self) -> None:
+        Args:
+            timesteps (np.ndarray or Iterable of int or float): The timesteps of the rows.
+            **logs (np.ndarray): Arrays of values by log name, with one value per timestep. Missing values are ``NaN``,
+                ``None`` in object arrays, or masked in a ``numpy.ma.MaskedArray``.
+        """
+
+        instruments = self.__instruments
+        if instruments is not None: start = perf_counter()
+        timesteps = np.asarray(timesteps)
+        if timesteps.ndim != 1: raise ValueError(f"The timesteps must be one dimensional, got shape {timesteps.shape}")
+        if not len(timesteps): return
+        if instruments is not None and instruments.due():
+            padding = np.full(len(timesteps) - 1, np.nan)
+            logs = {**logs, **{log_name: np.r_[padding, value] for log_name, value in instruments.series().items()}}
+        present_values: dict[str: tuple[np.ndarray, np.ndarray]] = {}
+        for log_name, values in logs.items():
+            present = ~np.ma.getmaskarray(values)
+            values = np.asarray(np.ma.getdata(values))
+            if values.shape != timesteps.shape:
+                raise ValueError(f"The values of {log_name} must have the shape of the timesteps {timesteps.shape}, got {values.shape}")
+            if values.dtype.kind == "f": present &= ~np.isnan(values)
+            elif values.dtype.kind == "O": present &= np.array([value is not None for value in values], bool)
+            rows = np.flatnonzero(present)
+            if len(rows): present_values[log_name] = (rows, values if len(rows) == len(values) else values[present])
+        first_row = len(self.L.timestep)
+        for log_name, (rows, values) in present_values.items():
+            if log_name not in self.L.logs: self.L.logs[log_name] = Series(dtype=self.scalar_dtype)
+            series = self.L.logs[log_name]
+            series.rows.extend(rows + first_row)
+            series.values.extend(values)
+            if values.dtype.kind not in "biuf": continue
+            for window, stats in self.__stats.items():
+                if log_name not in stats: stats[log_name] = RollingStats(window)
+                stats[log_name].extend(values)
+        self.L.timestep.extend(timesteps)
+        self.__hand_over()
+        if instruments is not None: instruments.record("scalars_batch", perf_counter() - start)
+    
+    def __hand_over(self) -> None:
         
         """
-        Save the logs to the log file.
+        Queue the rows logged since the last hand over to be saved, as a chunk copied from the Log object.
         """
         
-        self.__need_save = True
-        self.L.save(self.log_folder_path + ".log")
-    
-    @__save_timer
-    def scalar(self, timestep: int|float, **logs: dict[str: Any]) -> None:
+        self.__writer.put_chunk(self.L.chunk, len(self.L.timestep))
+
+    def histogram(self, timestep: int|float, tag: str, values: np.ndarray) -> None:
         
         """
-        Log scalar data at a specific timestep.
+        Log the distribution of values at a specific timestep, e.g. weights or gradients.
+        The values are folded into a compact quantile sketch, only the sketch is kept and saved.
 
         Args:
-            timestep (int or float): The timestep associated with the logged data.
-            **logs (dict[str: Any]): Keyword arguments representing the logged data with log names as keys and
-                corresponding scalar values as values.
+            timestep (int or float): The timestep associated with the logged distribution.
+            tag (str): A descriptive tag for the logged distribution.
+            values (np.ndarray): The values, of any shape. NaN and infinite values are ignored.
         """
         
-        for log_name in logs:
-            if log_name not in self.L.logs.keys():
-                self.L.logs[log_name] = [None for _ in range(len(self.L.timestep))]
-        for log_name in self.L.logs.keys():
-            self.L.logs[log_name].append(logs.get(log_name))
-        self.L.timestep.append(timestep)
+        if self.__instruments is not None: start = perf_counter()
+        sketch = Sketch(self.histogram_accuracy)
+        sketch.add(values)
+        self.L.histograms.setdefault(tag, []).append((timestep, sketch))
+        self.__writer.put_histogram(timestep, tag, sketch)
+        if self.__instruments is not None: self.__instruments.record("histogram", perf_counter() - start)
     
-    @staticmethod
-    def __create_image_grid(img: np.ndarray) -> np.ndarray:
+    def running_stats(self, window: int = 1) -> dict[str: dict[str: float]]:
         
         """
-        Create a single image with a grid layout from a batch of images.
+        Statistics of the last logged values of each numeric scalar log, ignoring missing values.
+        The statistics of a window are maintained incrementally by ``scalar`` from the first call with that window,
+        which seeds them with the last values already logged.
 
         Args:
-            img (np.ndarray): A numpy array representing a batch of images.
+            window (int, optional): Number of most recent values on which the mean, minimum and maximum are based, and span
+                of the exponential moving average. Default is 1.
 
         Returns:
-            np.ndarray: A numpy array representing the grid layout of the images.
+            dict[str: dict[str: float]]: The "mean", "min", "max", "ema", "last" and "count" statistics, by log name.
         """
         
-        n, h, w, c = img.shape
-        nrows = int(n**(1/2))
-        ncols = ceil(n / nrows)
-        if mod:= nrows * ncols % n:
-            img = np.concatenate([img, np.zeros((mod, w, h, c))], 0)
-        grid = img.reshape(nrows, ncols, h, w, c).swapaxes(1,2).reshape(h*nrows, w*ncols, c)
-        return grid
+        if window not in self.__stats:
+            self.__stats[window] = {}
+            for log_name, series in self.L.logs.items():
+                values = [value for value in series.values.take(max(len(series) - window, 0)).tolist() if isinstance(value, Real)]
+                if not values: continue
+                stats = self.__stats[window][log_name] = RollingStats(window)
+                for value in values: stats.update(value)
+        return {log_name: stats.to_dict() for log_name, stats in list(self.__stats[window].items())}
     
-    VALID_FORMAT: str = "NHWC"
+    VALID_FORMAT: str = VALID_FORMAT
     
     def image(
         self,
@@ -189,30 +637,152 @@ class Logger():
         img: np.ndarray,
         tag: str,
         image_format: str = "NCHW",
+        padding: int = 0,
+        border: int = 0,
+        pad_value: int = 0,
+        normalize: Literal["minmax"]|tuple[float, float]|None = None,
     ) -> None:
         
         """
-        Log image data at a specific timestep with the provided tag.
+        Log image data at a specific timestep with the provided tag. Batches of images are assembled into a grid.
+        The data is converted to uint8 without float64 intermediates: float data is expected in [0, 1] and integer data in
+        [0, 255], unless ``normalize`` is given. With image workers, the image data is copied and the call returns immediately.
 
         Args:
             timestep (int or float): The timestep associated with the logged image.
             img (np.ndarray): The image data to be logged as a NumPy array.
             tag (str): A descriptive tag for the logged image.
             image_format (str, optional): Format of the image data. Default is "NCHW".
+            padding (int, optional): Number of pixels between two images of a batch. Default is 0.
+            border (int, optional): Number of pixels around the image or grid. Default is 0.
+            pad_value (int, optional): Value (from 0 to 255) of the padding and border pixels. Default is 0.
+            normalize (Literal["minmax"] or tuple of float or None, optional): Range of the data mapped to [0, 255]: "minmax"
+                uses the lowest and highest values of the data, a (low, high) tuple a fixed range. Default is None.
         """
         
-        if "C" not in image_format: img = np.expand_dims(img, -1); image_format += "C"
-        if "N" not in image_format: img = np.expand_dims(img, -1); image_format += "N"
-        transpose_vector = [image_format.find(rf) for rf in self.VALID_FORMAT]
-        img = img.transpose(transpose_vector)
-        if img.shape[0] > 1: img = self.__create_image_grid(img)
-        img = (img.squeeze() * 255).astype(np.uint8)
-        Image.fromarray(img).save(self.image_folder_path + f"{tag}_{timestep}.png")
+        if self.__instruments is not None: start = perf_counter()
+        options = {"padding": padding, "border": border, "pad_value": pad_value, "normalize": normalize}
+        if self.image_store == "packed":
+            if tag not in self.__image_stores:
+                self.__image_stores[tag] = ImageStore(self.image_folder_path, tag, self.image_codec)
+            append = partial(self.__append_frame, self.__image_stores[tag], timestep)
+            if self.__images is None: append(encode_frame(img, image_format, self.image_codec, **options))
+            else: self.__images.submit(
+                partial(encode_frame, **options), np.array(img), image_format, self.image_codec, callback=append,
+            )
+        else:
+            path = self.image_folder_path + f"{tag}_{timestep}.png"
+            count = None if self.__instruments is None else partial(self.__count_image_file, path)
+            if self.__images is None:
+                save_image(img, image_format, path, **options)
+                if count is not None: count()
+            else: self.__images.submit(partial(save_image, **options), np.array(img), image_format, path, callback=count)
+        if self.__instruments is not None: self.__instruments.record("image", perf_counter() - start)
+    
+    def __append_frame(self, store: ImageStore, timestep: int|float, frame: bytes) -> None:
         
+        """
+        Append an encoded image to its container, counting its bytes.
+        """
+        
+        store.append(timestep, frame)
+        if self.__instruments is not None: self.__instruments.add("image_bytes_written", len(frame))
+    
+    def __count_image_file(self, path: str, result: Any = None) -> None:
+        
+        """
+        Count the bytes of a saved image file.
+        """
+        
+        self.__instruments.add("image_bytes_written", getsize(path))
+    
+    @property
+    def dropped_images(self) -> int:
+        
+        """
+        Number of images dropped because too many images were waiting to be saved.
+        """
+        
+        return 0 if self.__images is None else self.__images.dropped
+        
+    @property
+    def lost_rows(self) -> int:
+        
+        """
+        Number of rows dropped because their write kept failing.
+        """
+        
+        return self.__writer.lost_rows
+        
+    @property
+    def instruments(self) -> Instruments:
+        
+        """
+        The instruments measuring the time and bytes spent inside deeplogs, None without instrumentation.
+        """
+        
+        return self.__instruments
+    
+    def stats(self) -> dict[str: Any]:
+        
+        """
+        Time and bytes spent inside deeplogs since the Logger was created. Empty without instrumentation.
+
+        Returns:
+            dict[str: Any]: The latency of ``scalar``, ``histogram``, ``image``, the saves ("save", measured in the
+            background thread) and the Bar draws ("bar_draw"), as dicts of "count", "total_seconds", "mean_seconds",
+            "max_seconds", "p50_seconds", "p90_seconds" and "p99_seconds"; the "bytes_written", "rows_written",
+            "histograms_written", "image_bytes_written" and "write_errors" counters; and the current "queue_depth",
+            "image_queue_depth" and "images_dropped".
+        """
+        
+        return {} if self.__instruments is None else self.__instruments.stats()
+    
+    def export_stats(self, path: PathLike|str = None) -> str:
+        
+        """
+        Export the statistics of ``stats`` in the Prometheus text format, labelled by session (and rank). Writing them to
+        a ``.prom`` file read by the textfile collector of the Prometheus node exporter makes them scrapable.
+
+        Args:
+            path (PathLike or str, optional): File replaced atomically by the export. Default is None, not writing it.
+
+        Returns:
+            str: The export, empty without instrumentation.
+        """
+        
+        text = "" if self.__instruments is None else self.__instruments.to_prometheus()
+        if path is not None:
+            with open(f"{path}.tmp", "w") as f: f.write(text)
+            replace(f"{path}.tmp", path)
+        return text
+    
     def flush(self) -> None:
         
         """
-        Save the logs immediately.
+        Save the logs immediately and wait until they are written, pending images included.
+        Only the rows logged since the last save are written.
+        """
+        
+        self.__hand_over()
+        self.__writer.flush()
+        if self.__images is not None: self.__images.flush()
+    
+    def close(self) -> None:
+        
+        """
+        Save the last logs and stop the background thread. Calling it again does nothing.
         """
         
-        self.L.save(self.log_folder_path + ".log")
+        atexit.unregister(self.close)
+        with ExitStack() as stack: # closes the rest even if a step raises, the last registered first
+            for store in self.__image_stores.values(): stack.callback(store.close)
+            if self.__images is not None: stack.callback(self.__images.close)
+            stack.callback(self.__writer.close)
+            self.__hand_over()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,27 +1,71 @@
 from os import listdir, PathLike
+from os.path import isfile, isdir
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from math import ceil
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
-from typing import Literal, Callable
+from typing import Literal, Callable, Generator, Iterable
+from functools import partial
+from time import sleep
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from warnings import warn
+from collections import OrderedDict
 
 from deeplogs.logger import Log
+from deeplogs.bar import Bar
+from deeplogs._storage import META, LEGACY, SessionReader, shard_paths
+from deeplogs._catalog import Catalog
+from deeplogs._decimate import DOWNSAMPLE
+from deeplogs._imagestore import ImageStore
+from deeplogs._arrow import import_pyarrow, write_table, read_table
+
+def _load_session(
+    reader: SessionReader|dict[int: SessionReader],
+    reduce: Literal["mean", "sum", "min", "max"]|None = None,
+) -> tuple[SessionReader|dict[int: SessionReader], Log]:
+    
+    """
+    Load a session with its reader. Defined at module level so that it can run in a process pool.
+
+    Args:
+        reader (SessionReader or dict[int: SessionReader]): The reader of the session file, or the readers of its shards by rank.
+        reduce (Literal["mean", "sum", "min", "max"] or None, optional): How shards are combined, see ``Log.merge``.
+            Default is None.
+
+    Returns:
+        tuple[SessionReader or dict[int: SessionReader], Log]: The reader, positioned after the loaded records, and the
+        loaded Log object.
+    """
+    
+    if isinstance(reader, dict):
+        return reader, Log.merge({rank: Log.from_records(shard.read(), shard.path) for rank, shard in reader.items()}, reduce)
+    return reader, Log.from_records(reader.read(), reader.path)
 
 class Reader():
     
     """
     A utility to read and analyze logs generated during the training or execution of multiple models.
+    Sessions are loaded lazily, the first time they are needed, and in parallel when several of them are.
+    Session metadata is read from the catalog of the log folder, without loading the logs.
+    Matplotlib, Plotly and Pillow are only imported by the methods drawing or reading images.
 
     Args:
         log_names (list of str, optional): List of session names to load. Default is all sessions.
         log_folder_path (PathLike or str, optional): Path to the folder where logs are saved. Default is './dplogs/'.
+        workers (int, optional): Maximum number of sessions loaded in parallel. Default is 8.
+        executor (Literal["thread", "process"], optional): Kind of pool used to load sessions in parallel. Default is "thread".
+        progress (bool, optional): Display a progress Bar while loading sessions. Default is False.
+        reduce (Literal["mean", "sum", "min", "max"] or None, optional): How the shards of sessions written by several ranks
+            are combined, see ``Log.merge``. Default is None.
     """
     
     def __init__(
         self,
         log_names: list[str] = [],
         log_folder_path: PathLike|str = "./dplogs/",
+        workers: int = 8,
+        executor: Literal["thread", "process"] = "thread",
+        progress: bool = False,
+        reduce: Literal["mean", "sum", "min", "max"]|None = None,
     ):
         self.PLOT_USING: dict[str: Callable] = {
             "plotly": self.__scalar_plotly,
@@ -29,36 +73,260 @@ class Reader():
         }
         
         self.log_folder_path: str = log_folder_path
-        self.log_names: list[str] = log_names if len(log_names) > 0 else listdir(log_folder_path)
+        self.log_names: list[str] = list(log_names) if len(log_names) > 0 else sorted(
+            log_name for log_name in listdir(log_folder_path)
+            if isfile(f"{log_folder_path}{log_name}/.log") or shard_paths(f"{log_folder_path}{log_name}/.log")
+        )
+        self.workers = workers
+        self.executor = executor
+        self.progress = progress
+        self.reduce = reduce
         
-        self.LS: list[Log] = [Log.load(self.log_folder_path + log_name + "/.log") for log_name in self.log_names]
+        self.__readers: dict[str: SessionReader|dict[int: SessionReader]] = {
+            log_name: self.__session_reader(log_name) for log_name in self.log_names
+        }
+        self.__logs: dict[str: Log] = {}
+        self.__catalog: Catalog = Catalog(log_folder_path)
+        self.__generations: dict[str: int] = {}
+        self.__curves: OrderedDict[tuple: pd.Series] = OrderedDict()
+        self.__curves_bytes: int = 0
     
-    def describe(self, name: list[str] = [], percentiles: list[float] = [0.25, 0.5, 0.75, 0.9]) -> pd.DataFrame:
+    def __session_reader(self, log_name: str) -> SessionReader|dict[int: SessionReader]:
+        
+        """
+        Create the reader of a session, or the readers of its shards by rank if it was written by several ranks.
+        """
+        
+        path = self.log_folder_path + log_name + "/.log"
+        if not isfile(path) and (shards := shard_paths(path)):
+            return {rank: SessionReader(shard) for rank, shard in shards.items()}
+        return SessionReader(path)
+    
+    @property
+    def LS(self) -> list[Log]:
+        
+        """
+        The Log objects of all the sessions, loading the ones that are not loaded yet.
+        """
+        
+        return self.load()
+    
+    def load(self, names: list[str] = []) -> list[Log]:
+        
+        """
+        Load sessions that are not loaded yet, in parallel. Sessions that cannot be read are skipped with a warning.
+
+        Args:
+            names (list of str, optional): List of session names to load. Default is all sessions.
+
+        Returns:
+            list of Log: The Log objects of the requested sessions.
+        """
+        
+        names = [log_name for log_name in (names or self.log_names) if log_name in self.__readers]
+        to_load = [log_name for log_name in names if log_name not in self.__logs]
+        if len(to_load) > 1 and self.workers > 1:
+            Executor = ThreadPoolExecutor if self.executor == "thread" else ProcessPoolExecutor
+            with Executor(min(self.workers, len(to_load))) as pool:
+                futures = {pool.submit(_load_session, self.__readers[log_name], self.reduce): log_name for log_name in to_load}
+                self.__store(((futures[future], future.result) for future in as_completed(futures)), len(to_load))
+        else:
+            self.__store(
+                ((log_name, partial(_load_session, self.__readers[log_name], self.reduce)) for log_name in to_load), len(to_load),
+            )
+        return [self.__logs[log_name] for log_name in names if log_name in self.__logs]
+    
+    def __store(self, results: Iterable[tuple[str, Callable]], nb_results: int) -> None:
+        
+        """
+        Store loaded sessions, skipping with a warning the ones that could not be read.
+
+        Args:
+            results (Iterable of tuple[str, Callable]): Session names with a callable returning their reader and Log object.
+            nb_results (int): Number of results, for the progress Bar.
+        """
+        
+        if self.progress and nb_results: results = Bar(description="Loading sessions")(results, nb_results)
+        for log_name, result in results:
+            try: self.__readers[log_name], self.__logs[log_name] = result()
+            except Exception as error:
+                warn(f"Skipping session '{log_name}' that could not be read: {error!r}")
+                del self.__readers[log_name]
+                self.log_names.remove(log_name)
+    
+    def refresh(self) -> list[str]:
+        
+        """
+        Read the logs written since the sessions were loaded or last refreshed.
+        Only the newly committed records of each loaded session are read, and the sessions are extended in place.
+        A session that was restarted from scratch, or a session written by several ranks whose shards changed or gained a new
+        rank, is loaded again.
+
+        Returns:
+            list of str: Names of the sessions that changed.
+        """
+        
+        updated: list[str] = []
+        for log_name, L in list(self.__logs.items()):
+            reader = self.__readers[log_name]
+            if isinstance(reader, dict):
+                changed = any([shard.read() for shard in reader.values()])
+                if not changed and shard_paths(self.log_folder_path + log_name + "/.log").keys() == reader.keys(): continue
+                self.__readers[log_name], self.__logs[log_name] = _load_session(self.__session_reader(log_name), self.reduce)
+                self.__generations[log_name] = self.__generations.get(log_name, 0) + 1
+                updated.append(log_name)
+                continue
+            records = reader.read()
+            if not records: continue
+            if records[0][0] in (META, LEGACY): self.__logs[log_name] = Log.from_records(records, reader.path)
+            else: L.extend_records(records)
+            self.__generations[log_name] = self.__generations.get(log_name, 0) + 1
+            updated.append(log_name)
+        return updated
+    
+    def follow(self, interval: float = 1.) -> Generator[list[str], None, None]:
+        
+        """
+        Follow live sessions, refreshing them periodically.
+
+        Args:
+            interval (float, optional): Time interval (in seconds) between refreshes. Default is 1.0 second.
+
+        Yields:
+            list of str: Names of the sessions that changed, each time at least one of them did.
+        """
+        
+        self.load()
+        while True:
+            if updated := self.refresh(): yield updated
+            sleep(interval)
+    
+    def describe(
+        self,
+        name: list[str] = [],
+        percentiles: list[float] = [0.25, 0.5, 0.75, 0.9],
+        exact: bool = False,
+    ) -> pd.DataFrame:
         
         """
         Generate descriptive statistics of the scalar logs.
+        By default, they are read from the summary statistics saved in the catalog while the sessions were logged, without
+        loading the logs; the percentiles are then estimated within 1%. Sessions without a saved summary (e.g. written by
+        several ranks or by an older version) are loaded and described exactly.
 
         Args:
             name (list of str, optional): List of session names for which statistics will be generated. Default is all.
             percentiles (list of float, optional): List of percentiles to include in the statistics. Default is [0.25, 0.5, 0.75, 0.9].
+            exact (bool, optional): Load every session and compute the statistics from all the values. Default is False.
 
         Returns:
             pd.DataFrame: A DataFrame containing descriptive statistics.
         """
         
-        if not name: name = [L.name for L in self.LS]
+        names = [log_name for log_name in (name or self.log_names) if log_name in self.__readers]
+        summaries = {} if exact else {
+            log_name: entry["summary"] for log_name, entry in self.__catalog.read(names).items()
+            if entry["summary"] is not None and not isinstance(self.__readers[log_name], dict)
+        }
+        loaded = {L.name: L for L in self.load([log_name for log_name in names if log_name not in summaries])}
         describe_dfs: list[pd.DataFrame] = []
-        for L in self.LS:
-            if L.name not in name: continue
-            df = L.scalar_to_dataframe().describe(percentiles=percentiles)
-            df.index = pd.MultiIndex.from_product([[L.name], df.index])
+        for log_name in names:
+            if log_name in summaries:
+                df = pd.DataFrame({
+                    metric: summary.describe(sorted({*percentiles, 0.5})) for metric, summary in summaries[log_name].items()
+                })
+            elif log_name in loaded: df = loaded[log_name].scalar_to_dataframe().describe(percentiles=percentiles)
+            else: continue
+            df.index = pd.MultiIndex.from_product([[log_name], df.index])
             describe_dfs.append(df)
         return pd.concat(describe_dfs)
     
+    def images(
+        self,
+        tag: str,
+        timesteps: tuple[int|float, int|float]|list[int|float] = None,
+        name: list[str] = [],
+    ) -> list[tuple[str, float, np.ndarray]]:
+        
+        """
+        Read the images logged with a tag, without loading the scalar logs.
+        Packed images are read through memory maps, only decoding the requested frames. Images saved as one file each
+        are read from their files.
+
+        Args:
+            tag (str): The tag of the images.
+            timesteps (tuple or list of int or float, optional): A (start, stop) tuple selecting the timesteps in
+                ``[start, stop)``, like ``query``, or a list of timesteps. Default is all.
+            name (list of str, optional): List of session names. Default is all.
+
+        Returns:
+            list[tuple[str, float, np.ndarray]]: The (session name, timestep, image) triples, with uint8 images, by session
+            and in timestep order. Packed images logged several times at a timestep are all kept, in the order they were saved.
+        """
+        
+        images: list[tuple[str, float, np.ndarray]] = []
+        for log_name in (name or self.log_names):
+            folder_path = f"{self.log_folder_path}{log_name}/images/"
+            if not isdir(folder_path): continue
+            frames = ImageStore.read(folder_path, tag, timesteps)
+            if not frames: frames = self.__read_image_files(folder_path, tag, timesteps)
+            images.extend((log_name, timestep, img) for timestep, img in frames)
+        return images
+    
+    @staticmethod
+    def __read_image_files(
+        folder_path: str,
+        tag: str,
+        timesteps: tuple[int|float, int|float]|list[int|float] = None,
+    ) -> list[tuple[float, np.ndarray]]:
+        
+        """
+        Read the images of a tag saved as one PNG file each, named ``{tag}_{timestep}.png``, as (timestep, image) pairs.
+        """
+        
+        files: dict[float: str] = {}
+        for file_name in listdir(folder_path):
+            if not (file_name.startswith(f"{tag}_") and file_name.endswith(".png")): continue
+            try: files[float(file_name[len(tag)+1:-4])] = file_name
+            except ValueError: continue
+        selected = sorted(
+            timestep for timestep in files if timesteps is None
+            or (timesteps[0] <= timestep < timesteps[1] if isinstance(timesteps, tuple) else timestep in timesteps)
+        )
+        from PIL import Image
+        return [(timestep, np.asarray(Image.open(folder_path + files[timestep]))) for timestep in selected]
+    
+    def __entries(self, name: list[str] = []) -> list[dict]:
+        
+        """
+        Read the catalog entries of sessions. Sessions missing from the catalog (e.g. saved by an older version) are loaded
+        to build their entry.
+
+        Args:
+            name (list of str, optional): List of session names. Default is all.
+
+        Returns:
+            list of dict: The entries, in the order of ``log_names``.
+        """
+        
+        names = [log_name for log_name in (name or self.log_names) if log_name in self.__readers]
+        entries = self.__catalog.read(names)
+        if missing := [log_name for log_name in names if log_name not in entries]:
+            for L in self.load(missing):
+                entries[L.name] = {
+                    "name": L.name,
+                    "description": L.description,
+                    "hyperparams": L.hyperparams,
+                    "metrics": list(L.logs),
+                    "rows": len(L.timestep),
+                    "last_timestep": L.timestep[-1] if len(L.timestep) else None,
+                }
+        return [entries[log_name] for log_name in names if log_name in entries]
+    
     def infos(self, name: list[str] = []) -> pd.DataFrame:
         
         """
-        Generate a summary of sessions information.
+        Generate a summary of sessions information, read from the catalog without loading the logs.
 
         Args:
             name (list of str, optional): List of session names for which information will be generated. Default is all.
@@ -67,11 +335,207 @@ class Reader():
             pd.DataFrame: A DataFrame containing the informations.
         """
         
-        if not name: name = [L.name for L in self.LS]
         return pd.concat([pd.Series(
-            {"name": L.name, "description": L.description, **L.hyperparams}    
-        ).to_frame().T for L in self.LS if L.name in name]).set_index("name", drop=True)
+            {"name": entry["name"], "description": entry["description"], **entry["hyperparams"]}
+        ).to_frame().T for entry in self.__entries(name)]).set_index("name", drop=True)
+    
+    def catalog(self, name: list[str] = []) -> pd.DataFrame:
+        
+        """
+        Generate a summary of the scalar logs of sessions, read from the catalog without loading the logs.
+
+        Args:
+            name (list of str, optional): List of session names for which the summary will be generated. Default is all.
+
+        Returns:
+            pd.DataFrame: A DataFrame containing the description, the metric names, the number of rows and the last timestep
+            of each session.
+        """
+        
+        return pd.DataFrame(
+            self.__entries(name),
+            columns=["name", "description", "metrics", "rows", "last_timestep"],
+        ).set_index("name", drop=True)
+    
+    def filter(self, query: str):
+        
+        """
+        Select the sessions whose hyperparameters match a predicate, without loading their logs.
+
+        Args:
+            query (str): A pandas query over the columns of ``infos``, e.g. ``"lr < 1e-3 and batch_size == 256"``.
+
+        Returns:
+            Reader: A new Reader restricted to the matching sessions.
+        """
+        
+        names = self.infos().infer_objects().query(query).index.to_list()
+        reader = Reader(self.log_names, self.log_folder_path, self.workers, self.executor, self.progress, self.reduce)
+        reader.log_names = names
+        reader.__readers = {log_name: reader.__readers[log_name] for log_name in names}
+        return reader
             
+    def query(
+        self,
+        metrics: list[str] = [],
+        start: int|float = None,
+        stop: int|float = None,
+        runs: list[str] = [],
+        keep: Literal["all", "first", "last"] = "all",
+    ) -> pd.DataFrame:
+        
+        """
+        Select the values of scalar logs at the timesteps in ``[start, stop)``, across sessions.
+        Loaded sessions are sliced in memory. The others are not loaded: only the chunks of their session files that
+        overlap the range and hold one of the metrics are read, in parallel, as found in their chunk index (see
+        ``Log.load_range``). Timesteps do not have to increase: every row in the range is selected, e.g. both the rows
+        logged before and after a run was restarted from a checkpoint. Rows at which none of the metrics was logged are
+        dropped. Sessions that cannot be read are skipped with a warning.
+
+        Args:
+            metrics (list of str, optional): Names of the scalar logs. Default is all. The logs of the ranks of a session
+                merged without ``reduce`` (named ``{metric}/rank{k}``) are selected by their metric.
+            start (int or float, optional): First timestep of the range. Default is None, unbounded.
+            stop (int or float, optional): Timestep after the range. Default is None, unbounded.
+            runs (list of str, optional): List of session names. Default is all.
+            keep (Literal["all", "first", "last"], optional): With "all", the rows are kept in logging order, including
+                timesteps logged several times. With "first" or "last", only the first or last row logged at each timestep
+                is kept (e.g. "last" for the values logged after a restart), and the rows are sorted by timestep. Default is "all".
+
+        Returns:
+            pd.DataFrame: A DataFrame indexed by session name and timestep, with a column per selected log.
+        """
+        
+        names = [log_name for log_name in (runs or self.log_names) if log_name in self.__readers]
+        to_read = [log_name for log_name in names if log_name not in self.__logs]
+        load_range = partial(Log.load_range, start=start, stop=stop, logs=metrics, reduce=self.reduce)
+        if len(to_read) > 1 and self.workers > 1:
+            Executor = ThreadPoolExecutor if self.executor == "thread" else ProcessPoolExecutor
+            with Executor(min(self.workers, len(to_read))) as pool:
+                results = [
+                    (log_name, pool.submit(load_range, self.log_folder_path + log_name + "/.log").result) for log_name in to_read
+                ]
+        else: results = [(log_name, partial(load_range, self.log_folder_path + log_name + "/.log")) for log_name in to_read]
+        read = {}
+        for log_name, result in results:
+            try: read[log_name] = result()
+            except Exception as error: warn(f"Skipping session '{log_name}' that could not be read: {error!r}")
+        frames = []
+        for log_name in names:
+            if log_name in read: L = read[log_name]
+            elif log_name in self.__logs:
+                L = self.__logs[log_name]
+                L = L.select(start, stop, [
+                    metric for metric in L.logs if metric in metrics or metric.rpartition("/rank")[0] in metrics
+                ] or metrics)
+            else: continue
+            df = L.scalar_to_dataframe()
+            if metrics: df = df.dropna(how="all")
+            if keep != "all": df = df[~df.index.duplicated(keep=keep)].sort_index(kind="stable")
+            frames.append(df)
+        return pd.concat(frames) if frames else pd.DataFrame(columns=metrics)
+    
+    def to_arrow(self, path: PathLike|str = None, logs: list[str] = [], name: list[str] = []):
+        
+        """
+        Export the scalar logs of sessions to a single Arrow table, with "name" and "timestep" columns and a column per log.
+        Requires pyarrow.
+
+        Args:
+            path (PathLike or str, optional): Arrow IPC file (or Parquet file, with a ".parquet" extension) where the
+                table is also written. Default is None.
+            logs (list of str, optional): Names of the logs to export. Default is all.
+            name (list of str, optional): List of session names to export. Default is all.
+
+        Returns:
+            pyarrow.Table: The table.
+        """
+        
+        pa = import_pyarrow()
+        LS = self.load(name)
+        names = pa.array([L.name for L in LS])
+        tables = []
+        for i, L in enumerate(LS):
+            table = L.to_arrow(logs).replace_schema_metadata(None)
+            tables.append(table.add_column(0, "name", pa.DictionaryArray.from_arrays(
+                pa.array(np.full(len(table), i, np.int32)), names,
+            )))
+        table = pa.concat_tables(tables, promote_options="permissive")
+        if path is not None: write_table(table, path)
+        return table
+    
+    def to_parquet(self, path: PathLike|str, logs: list[str] = [], name: list[str] = []) -> None:
+        
+        """
+        Export the scalar logs of sessions to a Parquet file, see ``to_arrow``. Requires pyarrow.
+
+        Args:
+            path (PathLike or str): The Parquet file.
+            logs (list of str, optional): Names of the logs to export. Default is all.
+            name (list of str, optional): List of session names to export. Default is all.
+        """
+        
+        write_table(self.to_arrow(logs=logs, name=name), path, parquet=True)
+    
+    @staticmethod
+    def read_arrow(path: PathLike|str, logs: list[str] = [], name: list[str] = []):
+        
+        """
+        Read scalar logs exported with ``to_arrow`` or ``to_parquet``, through a memory map. Only the columns of the
+        requested logs are read from disk, and Arrow IPC files are not copied in memory. Requires pyarrow.
+
+        Args:
+            path (PathLike or str): The Arrow IPC or Parquet file.
+            logs (list of str, optional): Names of the logs to read. Default is all.
+            name (list of str, optional): List of session names to keep. Default is all.
+
+        Returns:
+            pyarrow.Table: The table, e.g. to be converted with ``to_pandas`` or analyzed with polars or DuckDB.
+        """
+        
+        table = read_table(path, ["name", "timestep", *logs] if logs else None)
+        if name:
+            pa = import_pyarrow()
+            import pyarrow.compute as pc
+            table = table.filter(pc.is_in(table["name"].cast(pa.string()), pa.array(name)))
+        return table
+    
+    CACHE_BYTES: int = 256 * 2**20
+    
+    def smooth(self, logs: list[str] = [], smooth_perc: float = 0.99) -> dict[tuple[str, str]: pd.Series]:
+        
+        """
+        Smooth the scalar logs of all sessions with an exponentially weighted mean.
+        Each session is smoothed in a single pass over all its requested logs, and the curves are memoized per session, log,
+        smoothing factor and data generation (bumped by ``refresh``), so that going back to a previous ``smooth_perc`` is
+        instant. The least recently used curves are evicted beyond ``CACHE_BYTES`` bytes of curves.
+
+        Args:
+            logs (list of str, optional): List of scalar log names to smooth. Default is all.
+            smooth_perc (float, optional): Percentage of smoothing. Default is 0.99.
+
+        Returns:
+            dict[tuple[str, str]: pd.Series]: The smoothed curves indexed by timestep, by (session name, log name).
+        """
+        
+        curves: dict[tuple[str, str]: pd.Series] = {}
+        LS = self.LS
+        for log_name, L in zip(self.log_names, LS):
+            generation = self.__generations.get(log_name, 0)
+            keys = {log: (log_name, log, smooth_perc, generation) for log in (logs or L.logs) if log in L.logs}
+            if missing := [log for log, key in keys.items() if key not in self.__curves]:
+                df = L.scalar_to_dataframe()[missing].droplevel(0).astype(float)
+                smoothed = df.ewm(alpha=1-smooth_perc, ignore_na=True).mean()
+                for log in missing:
+                    self.__curves[keys[log]] = curve = smoothed[log][df[log].notna()]
+                    self.__curves_bytes += curve.memory_usage()
+            for log, key in keys.items():
+                self.__curves.move_to_end(key)
+                curves[(log_name, log)] = self.__curves[key]
+        while self.__curves_bytes > self.CACHE_BYTES and self.__curves:
+            self.__curves_bytes -= self.__curves.popitem(last=False)[1].memory_usage()
+        return curves
+    
     FIGSIZE_TRANSLATION: dict[str: float] = {
         "matplotlib": 1.,
         "plotly": 75.,
@@ -85,10 +549,13 @@ class Reader():
         figsize: tuple[int, int] = (20,10),
         xlabel: str = "timestep",
         smooth_perc: float = 0.99,
+        max_points: int = None,
+        downsample: Literal["minmax", "lttb"]|None = "minmax",
     ) -> None:
         
         """
         Plot scalar logs over timesteps using different visualization libraries.
+        Each curve is smoothed on all its points (see ``smooth``), then decimated to a point budget before being drawn.
 
         Args:
             logs (list of str, optional): List of scalar log names to plot. Default is all.
@@ -97,14 +564,36 @@ class Reader():
             figsize (tuple of int, optional): Figure size (width, height) for the plot. Default is (20, 10).
             xlabel (str, optional): Label for the x-axis in the plot. Default is "timestep".
             smooth_perc (float, optional): Percentage of smoothing for the plot. Default is 0.99.
+            max_points (int, optional): Maximum number of points drawn per curve. Default is two points per horizontal pixel
+                of a subplot.
+            downsample (Literal["minmax", "lttb"] or None, optional): Decimation algorithm: "minmax" keeps the lowest and
+                highest point of each pixel so that spikes are preserved, "lttb" keeps the visually most significant point
+                of each bucket, None draws every point. Default is "minmax".
         """
         
         figsize = tuple(map(lambda x: int(x*self.FIGSIZE_TRANSLATION[using]), figsize))
-        dfs = pd.concat([L.scalar_to_dataframe() for L in self.LS], axis=0)
-        if not logs: logs = dfs.columns.to_list()
+        if max_points is None:
+            width = figsize[0]
+            if using == "matplotlib":
+                import matplotlib.pyplot as plt
+                width *= plt.rcParams["figure.dpi"]
+            max_points = 2 * int(width / ncols)
+        curves = self.smooth(logs, smooth_perc)
+        if not logs: logs = list(dict.fromkeys(log for _, log in curves))
         nrows: int = int(ceil(len(logs) / ncols))
         
-        self.PLOT_USING[using](logs, ncols, figsize, xlabel, smooth_perc, dfs, nrows)
+        self.PLOT_USING[using](logs, ncols, figsize, xlabel, curves, nrows, max_points, downsample)
+    
+    @staticmethod
+    def __decimate(log_df: pd.Series, max_points: int, downsample: Literal["minmax", "lttb"]|None) -> pd.Series:
+        
+        """
+        Decimate a curve to at most ``max_points`` points.
+        """
+        
+        if downsample and len(log_df) > max_points:
+            log_df = log_df.iloc[DOWNSAMPLE[downsample](log_df.index.to_numpy(), log_df.to_numpy(), max_points)]
+        return log_df
         
     def __scalar_plt(
         self,
@@ -112,22 +601,25 @@ class Reader():
         ncols: int,
         figsize: tuple[int, int],
         xlabel: str,
-        smooth_perc: float,
-        dfs: pd.DataFrame,
+        curves: dict[tuple[str, str]: pd.Series],
         nrows: int,
+        max_points: int,
+        downsample: Literal["minmax", "lttb"]|None,
     ) -> None:
         
         """
         Plot scalar logs over timesteps using Matplotlib.
         """
         
+        import matplotlib.pyplot as plt
         plt.figure(figsize=figsize)
         for i, log in enumerate(logs):
             ax = plt.subplot(nrows, ncols, i+1)
             ax.set_xlabel(xlabel)
             ax.set_ylabel(log)
             for name in self.log_names:
-                ax.plot(dfs.loc[name, log].dropna().ewm(alpha=1-smooth_perc).mean(), label=name)
+                if (name, log) not in curves: continue
+                ax.plot(self.__decimate(curves[(name, log)], max_points, downsample), label=name)
             ax.legend(loc="upper left")
         plt.show()
         
@@ -137,20 +629,24 @@ class Reader():
         ncols: int,
         figsize: tuple[int, int],
         xlabel: str,
-        smooth_perc: float,
-        dfs: pd.DataFrame,
+        curves: dict[tuple[str, str]: pd.Series],
         nrows: int,
+        max_points: int,
+        downsample: Literal["minmax", "lttb"]|None,
     ) -> None:
         
         """
         Plot scalar logs over timesteps using Plotly.
         """
 
+        from plotly.subplots import make_subplots
+        import plotly.graph_objects as go
         fig = make_subplots(rows=nrows, cols=ncols)
         for i, log in enumerate(logs):
             for name in self.log_names:
                 col=(i%ncols)+1; row=(i//ncols)+1
-                log_df = dfs.loc[name, log].dropna().ewm(alpha=1-smooth_perc).mean()
+                if (name, log) not in curves: continue
+                log_df = self.__decimate(curves[(name, log)], max_points, downsample)
                 fig.add_trace(go.Scatter(
                         x=log_df.index, y=log_df.to_list(),
                         name=name,
@@ -160,4 +656,118 @@ class Reader():
             fig.update_yaxes(title_text=log, row=row, col=col)
         fig.update_layout(width=figsize[0], height=figsize[1])
         fig.show()
-        
\ No newline at end of file
+            
+    def quantiles(
+        self,
+        tag: str,
+        q: list[float] = [0.05, 0.25, 0.5, 0.75, 0.95],
+        name: list[str] = [],
+    ) -> pd.DataFrame:
+        
+        """
+        Estimate quantiles of the distributions logged with ``Logger.histogram``, from their sketches.
+
+        Args:
+            tag (str): The tag of the histograms.
+            q (list of float, optional): The quantiles, between 0 and 1. Default is [0.05, 0.25, 0.5, 0.75, 0.95].
+            name (list of str, optional): List of session names. Default is all.
+
+        Returns:
+            pd.DataFrame: A DataFrame with a column per quantile, indexed by session name and timestep.
+        """
+        
+        index, rows = [], []
+        for L in self.load(name):
+            for timestep, sketch in L.histograms.get(tag, []):
+                index.append((L.name, timestep))
+                rows.append(sketch.quantile(q))
+        return pd.DataFrame(
+            rows, index=pd.MultiIndex.from_tuples(index, names=["name", "timestep"]), columns=list(q),
+        ).sort_index()
+    
+    def distribution(
+        self,
+        tag: str,
+        using: Literal["plotly", "matplotlib"] = "plotly",
+        bands: list[tuple[float, float]] = [(0.05, 0.95), (0.25, 0.75)],
+        figsize: tuple[int, int] = (20,10),
+        xlabel: str = "timestep",
+    ) -> None:
+        
+        """
+        Plot the median of the distributions logged with a tag over timesteps, with shaded bands between quantiles.
+
+        Args:
+            tag (str): The tag of the histograms.
+            using (Literal["plotly", "matplotlib"], optional): Visualization library to use for plotting. Default is "plotly".
+            bands (list of tuple of float, optional): The (low, high) quantiles of each band, from the widest to the
+                narrowest. Default is [(0.05, 0.95), (0.25, 0.75)].
+            figsize (tuple of int, optional): Figure size (width, height) for the plot. Default is (20, 10).
+            xlabel (str, optional): Label for the x-axis in the plot. Default is "timestep".
+        """
+        
+        figsize = tuple(map(lambda x: int(x*self.FIGSIZE_TRANSLATION[using]), figsize))
+        df = self.quantiles(tag, sorted({0.5, *(q for band in bands for q in band)}))
+        if using == "plotly": self.__distribution_plotly(tag, df, bands, figsize, xlabel)
+        else: self.__distribution_plt(tag, df, bands, figsize, xlabel)
+    
+    def __distribution_plt(
+        self,
+        tag: str,
+        df: pd.DataFrame,
+        bands: list[tuple[float, float]],
+        figsize: tuple[int, int],
+        xlabel: str,
+    ) -> None:
+        
+        """
+        Plot distributions over timesteps using Matplotlib.
+        """
+        
+        import matplotlib.pyplot as plt
+        plt.figure(figsize=figsize)
+        ax = plt.subplot(1, 1, 1)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(tag)
+        for name in df.index.unique(0):
+            quantiles = df.loc[name]
+            line, = ax.plot(quantiles.index, quantiles[0.5], label=name)
+            for i, (low, high) in enumerate(bands):
+                ax.fill_between(quantiles.index, quantiles[low], quantiles[high], color=line.get_color(), alpha=0.15 * (i+1))
+        ax.legend(loc="upper left")
+        plt.show()
+    
+    def __distribution_plotly(
+        self,
+        tag: str,
+        df: pd.DataFrame,
+        bands: list[tuple[float, float]],
+        figsize: tuple[int, int],
+        xlabel: str,
+    ) -> None:
+        
+        """
+        Plot distributions over timesteps using Plotly.
+        """
+        
+        import plotly.graph_objects as go
+        import plotly.colors
+        fig = go.Figure()
+        colors = plotly.colors.DEFAULT_PLOTLY_COLORS
+        for n, name in enumerate(df.index.unique(0)):
+            quantiles = df.loc[name]
+            color = colors[n % len(colors)]
+            for i, (low, high) in enumerate(bands):
+                fill = color.replace("rgb", "rgba").replace(")", f", {0.15 * (i+1)})")
+                fig.add_trace(go.Scatter(
+                    x=quantiles.index, y=quantiles[high].to_list(), line={"width": 0}, showlegend=False, hoverinfo="skip",
+                ))
+                fig.add_trace(go.Scatter(
+                    x=quantiles.index, y=quantiles[low].to_list(), line={"width": 0}, fill="tonexty", fillcolor=fill,
+                    showlegend=False, hoverinfo="skip",
+                ))
+            fig.add_trace(go.Scatter(x=quantiles.index, y=quantiles[0.5].to_list(), name=name, line={"color": color}))
+        fig.update_xaxes(title_text=xlabel)
+        fig.update_yaxes(title_text=tag)
+        fig.update_layout(width=figsize[0], height=figsize[1])
+        fig.show()
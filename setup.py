@@ -7,6 +7,11 @@ install_requires = [
     "plotly==5.15.0",
 ]
 
+extras_require = {
+    "arrow": ["pyarrow"],
+    "compression": ["zstandard", "lz4"],
+}
+
 setup(
     name="deeplogs",
     version=__version__,
@@ -16,6 +21,7 @@ setup(
     author_email="guychahine@gmail.com",
     packages=["deeplogs"],
     install_requires=install_requires,
+    extras_require=extras_require,
     license="BSD",
     classifiers=[
         "Development Status :: 5 - Production/Stable",
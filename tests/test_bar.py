@@ -1,5 +1,5 @@
 from tempfile import TemporaryDirectory
-from time import sleep
+from time import sleep, time
 
 from deeplogs import Bar
 from deeplogs import Logger
@@ -40,10 +40,50 @@ class TestBar():
             self.SAVE_INTERVAL,
         )
         self.B.logger = L
-        for i in range(self.TEST_SIZE):
-            L.scalar(i, **{"log1": 1, "log2": 2})
+        for i in self.B(range(self.TEST_SIZE)):
+            L.scalar(i, **{"log1": 1, "log2": 2 if i % 2 else None, "log3": "text"})
             sleep(self.BAR_SLEEP)
+        assert L.running_stats(20)["log2"]["mean"] == 2
+        L.close()
             
+    def test_instrumented_logger(self, capsys):
+        with Logger("test2", folder_path=self.temp_folder.name + "/", instrument_interval=0.) as L:
+            self.B.logger = L
+            for i in self.B(range(self.TEST_SIZE)): L.scalar(i, log1=1)
+            assert L.stats()["bar_draw"]["count"] > 0
+        out = capsys.readouterr().out
+        assert "log1: " in out and "_deeplogs" not in out
+            
+    def test_render_thread(self, capsys):
+        self.B.render_thread = True
+        assert list(self.B(range(self.TEST_SIZE))) == list(range(self.TEST_SIZE))
+        assert f"{self.TEST_SIZE}/{self.TEST_SIZE}" in capsys.readouterr().out
+        
+    def test_nested(self, capsys):
+        outer = Bar(None, "Epoch", print_interval=0.)
+        for _ in outer(range(2)):
+            for _ in self.B(range(self.TEST_SIZE)): pass
+        out = capsys.readouterr().out
+        assert "\x1b[1A" in out and f"{self.TEST_SIZE}/{self.TEST_SIZE}" in out and "Epoch: 100%" in out
+        
+    def test_miniters(self, capsys):
+        B = Bar(print_interval=10.)
+        for _ in B(range(100000)): pass
+        assert capsys.readouterr().out.count("\r") == 2
+        
+    def test_max_interval(self, capsys):
+        B = Bar(print_interval=0.05, max_interval=0.05)
+        def iterations():
+            start = time()
+            while time() - start < 0.2: yield "fast"
+            for _ in range(5):
+                sleep(0.1)
+                yield "slow"
+        draws = []
+        for phase in B(iterations(), 10 ** 9):
+            if phase == "slow": draws.append(capsys.readouterr().out.count("\r"))
+        assert sum(draws[1:]) >= 3
+        
     def test_call_generator(self):
         generator = iter(range(self.TEST_SIZE))
         bar_generator = [i for i in self.B(generator, self.TEST_SIZE)]
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+HEAVY_MODULES: tuple[str] = ("pandas", "matplotlib", "plotly", "PIL")
+
+def loaded_modules(code: str) -> set[str]:
+    
+    """
+    Run code in a fresh interpreter and return the heavy modules it imported.
+    """
+    
+    code += f"\nimport sys; print(' '.join(module for module in {HEAVY_MODULES!r} if module in sys.modules), file=sys.stderr)"
+    return set(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stderr.split())
+
+class TestImport():
+    
+    def test_import(self):
+        assert loaded_modules("import deeplogs") == set()
+    
+    def test_write_path(self):
+        assert loaded_modules(
+            "from tempfile import TemporaryDirectory\n"
+            "import numpy as np\n"
+            "from deeplogs import Logger, Bar\n"
+            "with TemporaryDirectory() as folder:\n"
+            "    with Logger('test', folder_path=folder + '/', image_workers=1) as L:\n"
+            "        for i in Bar(L)(range(10)): L.scalar(i, log1=i, log2='text')\n"
+            "        L.histogram(0, 'weights', np.ones(10))\n"
+        ) == set()
+    
+    def test_lazy_attributes(self):
+        assert loaded_modules("from deeplogs import Reader") == {"pandas"}
+        assert loaded_modules("import deeplogs; deeplogs.Log.load") == set()
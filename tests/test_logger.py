@@ -1,11 +1,25 @@
+import sys
 from random import random
 from tempfile import TemporaryDirectory
 import pandas as pd
 from time import sleep
-from os.path import exists
+from os import listdir
+from os.path import exists, getsize
+from pickle import dump
+from threading import Thread, Event
 import numpy as np
+import pytest
+from unittest.mock import patch
 
 from deeplogs import Log, Logger
+from deeplogs import _storage as storage
+from deeplogs._writer import Writer
+from deeplogs._column import Series
+from deeplogs._catalog import Catalog
+from deeplogs._imagestore import ImageStore
+from deeplogs._image import prepare_image
+from deeplogs._stats import Summary, RollingStats
+from deeplogs._sketch import Sketch
 
 class TestLog():
     
@@ -43,10 +57,48 @@ class TestLog():
         loaded_L = Log.load(self.temp_folder.name + "/test_load.log")
         assert loaded_L.__dict__ == self.L.__dict__
     
+    def test_load_snapshot(self):
+        self.L.save(self.temp_folder.name + "/test_snapshot.log")
+        with open(self.temp_folder.name + "/test_snapshot.log", "ab") as f: f.write(b"\x02partial record")
+        assert Log.load(self.temp_folder.name + "/test_snapshot.log") == self.L
+    
+    def test_load_legacy_pickle(self):
+        with open(self.temp_folder.name + "/test_legacy.log", "wb") as f: dump(self.L.__dict__, f)
+        loaded_L = Log.load(self.temp_folder.name + "/test_legacy.log")
+        assert loaded_L.__dict__ == self.L.__dict__
+    
+    def test_append(self):
+        path = self.temp_folder.name + "/test_append.log"
+        L = Log("test2")
+        L.save(path)
+        saved_rows, chunk_sizes = 0, set()
+        for i in range(self.TEST_SIZE):
+            L.timestep.append(i)
+            L.logs.setdefault("log1", Series()).append(i, random())
+            size_before = getsize(path)
+            saved_rows = L.append(path, saved_rows)
+            chunk_sizes.add(getsize(path) - size_before)
+        assert len(chunk_sizes) == 1
+        assert L.append(path, saved_rows) == saved_rows
+        assert Log.load(path).__dict__ == L.__dict__
+    
+    def test_merge_restart(self):
+        shards = {rank: Log("restart", timestep=[0, 1, 2, 1, 2], logs={"log1": [6] * 5, "log2": [rank, rank, 1, 5, None]}) for rank in range(2)}
+        L = Log.merge(shards, reduce="sum")
+        assert L.timestep == [0, 1, 2] and L.logs["log1"] == [12, 12, 12] and L.logs["log2"] == [1, 10, 2]
+        L = Log.merge(shards)
+        assert L.logs["log2/rank1"] == [1, 5, 1]
+    
+    def test_is_consistent(self):
+        assert self.L.is_consistent()
+        assert not Log("test3", timestep=[0], logs={"log1": Series([0, 1], [1., 2.])}).is_consistent()
+    
     def test_scalar_to_dataframe(self):
         df = self.L.scalar_to_dataframe()
         assert type(df) == pd.DataFrame
         assert df.shape == (self.TEST_SIZE, len(self.L.logs))
+        df.iloc[0, 0] = -1.
+        assert self.L.logs["log1"][0] != -1.
 
 class TestLogger():
     
@@ -78,7 +130,7 @@ class TestLogger():
         )
     
     def teardown_method(self):
-        sleep(self.SAVE_INTERVAL + 0.1)
+        self.L.close()
         del self.L
         self.temp_folder.cleanup()
     
@@ -88,9 +140,31 @@ class TestLogger():
             self.L.scalar(i, **logs)
         assert self.L.L.logs == self.logs
     
+    def test_scalar_sparse(self):
+        self.L.scalar(0, **{"log1": 1.})
+        self.L.scalar(1, **{"log2": 2})
+        assert self.L.L.logs == {"log1": [1., None], "log2": [None, 2]}
+        df = self.L.L.scalar_to_dataframe()
+        assert df.isna().sum().to_list() == [1, 1]
+    
+    def test_scalar_promotion(self):
+        self.L.scalar(0, log1=np.float32(0.5), log2=True)
+        self.L.scalar(1, log1=1e-300, log2=False)
+        self.L.scalar(2, log1=2 ** 60 + 1)
+        self.L.flush()
+        for L in (self.L.L, Log.load(self.L.log_folder_path + ".log")):
+            assert L.logs["log1"].dtype == np.float64 and L.logs["log1"] == [0.5, 1e-300, float(2 ** 60 + 1)]
+            assert L.logs["log2"].dtype == bool and L.logs["log2"] == [True, False]
+        df = self.L.L.scalar_to_dataframe()
+        assert df["log2"].dtype == "boolean" and df["log2"].isna().to_list() == [False, False, True]
+        with Logger("fixed", folder_path=self.temp_folder.name + "/", scalar_dtype="float32") as L:
+            L.scalar(0, log1=0.5)
+            L.scalar(1, log1=1e-300)
+            assert L.L.logs["log1"].dtype == np.float32 and L.L.logs["log1"] == [0.5, 0.]
+    
     def test_save_timer(self):
         self.L.scalar(0, **{"log1": 1})
-        sleep(self.SAVE_INTERVAL)
+        sleep(self.SAVE_INTERVAL + 0.1)
         loaded_L = Log.load(f"{self.temp_folder.name}/{self.L.L.name}/.log")
         assert loaded_L.__dict__ == self.L.L.__dict__
         
@@ -100,6 +174,174 @@ class TestLogger():
         loaded_L = Log.load(f"{self.temp_folder.name}/{self.L.L.name}/.log")
         assert loaded_L.__dict__ == self.L.L.__dict__
         
+    def test_close(self):
+        with Logger("name2", folder_path=self.temp_folder.name + "/", queue_size=2) as L:
+            for i in range(self.TEST_SIZE):
+                L.scalar(i, **{"log1": i, "log2": None if i % 2 else random()})
+        assert Log.load(f"{self.temp_folder.name}/name2/.log") == L.L
+        L.close()
+        
+    def test_write_errors(self):
+        writer = Writer(self.temp_folder.name + "/missing/.log", queue_size=1)
+        writer.start()
+        writer.join()
+        with pytest.raises(FileNotFoundError): writer.put_histogram(0, "tag", Sketch())
+        with pytest.raises(RuntimeError): writer.flush()
+        calls = []
+        def write_manifest(*args):
+            calls.append(args)
+            if len(calls) == 1: raise OSError("disk full")
+            storage.write_manifest(*args)
+        self.L.scalar(0, log1=1.)
+        with patch("deeplogs._writer.write_manifest", write_manifest):
+            with pytest.raises(OSError): self.L.flush()
+            self.L.scalar(1, log1=2.)
+            self.L.flush()
+        assert Log.load(self.L.log_folder_path + ".log") == self.L.L and self.L.lost_rows == 0
+        
+    def test_catalog_interval(self):
+        folder_path = self.temp_folder.name + "/"
+        with patch.object(Catalog, "update", autospec=True, side_effect=Catalog.update) as update:
+            with Logger("throttled", folder_path=folder_path, save_interval=60., batch_size=10) as L:
+                for i in range(self.TEST_SIZE): L.scalar(i, log1=i)
+                L.flush()
+                assert update.call_count == 2
+            assert update.call_count == 2
+        entry = Catalog(folder_path).read(["throttled"])["throttled"]
+        assert entry["rows"] == self.TEST_SIZE and entry["summary"]["log1"].count == self.TEST_SIZE
+        
+    def test_rank(self):
+        folder_path = self.temp_folder.name + "/"
+        loggers = [Logger("ranks", folder_path=folder_path, rank=rank) for rank in range(2)]
+        for i in range(self.TEST_SIZE):
+            for rank, L in enumerate(loggers): L.scalar(i, log1=i + rank, log2=rank if i % 2 else None, log3="text")
+        for L in loggers: L.close()
+        assert not exists(f"{folder_path}ranks/.log")
+        L = Log.load(f"{folder_path}ranks/.log", reduce="mean")
+        assert L.timestep == list(range(self.TEST_SIZE)) and L.is_consistent()
+        assert L.logs["log1"] == [i + 0.5 for i in range(self.TEST_SIZE)]
+        assert L.logs["log2"] == [None if i % 2 == 0 else 0.5 for i in range(self.TEST_SIZE)]
+        assert L.logs["log3"] == ["text"] * self.TEST_SIZE
+        L = Log.load(f"{folder_path}ranks/.log")
+        assert sorted(L.logs) == sorted(f"log{n}/rank{rank}" for n in range(1, 4) for rank in range(2))
+        assert L.logs["log1/rank1"] == list(range(1, self.TEST_SIZE + 1))
+        entry = Catalog(folder_path).read(["ranks"])["ranks"]
+        assert entry["rows"] == self.TEST_SIZE and entry["metrics"] == ["log1", "log3", "log2"]
+        assert entry["summary"]["log1"].count == 2 * self.TEST_SIZE and entry["summary"]["log1"].max == self.TEST_SIZE
+    
+    def test_encoding(self):
+        folder_path = self.temp_folder.name + "/"
+        for timestep_encoding, value_encoding, compression in [("delta", "xor", "zlib"), ("delta2", "raw", "none"), ("raw", "float32", "zlib")]:
+            with Logger("encoded", folder_path=folder_path, batch_size=30, timestep_encoding=timestep_encoding,
+                        value_encoding=value_encoding, compression=compression) as L:
+                for i in range(self.TEST_SIZE):
+                    L.scalar(i * 2, log1=random(), log2=i if i % 3 else None, log3="text", log4=float(i))
+                    L.scalar(i * 2 + 0.5, log1=random())
+            loaded = Log.load(f"{folder_path}encoded/.log")
+            assert loaded.timestep == L.L.timestep and loaded.is_consistent()
+            assert loaded.logs["log2"] == L.L.logs["log2"] and loaded.logs["log3"] == L.L.logs["log3"]
+            assert loaded.logs["log4"] == L.L.logs["log4"]
+            assert np.allclose(loaded.logs["log1"].values.values, L.L.logs["log1"].values.values, rtol=1e-6)
+        with pytest.raises(ValueError):
+            Logger("encoded", folder_path=folder_path, compression="unknown")
+    
+    def test_scalars_batch(self):
+        self.L.running_stats(10)
+        self.L.scalar(0, log1=0.)
+        log1, log2 = np.random.random(self.TEST_SIZE), np.arange(self.TEST_SIZE)
+        log1[::3] = np.nan
+        self.L.scalars_batch(
+            np.arange(1, self.TEST_SIZE + 1), log1=log1,
+            log2=np.ma.masked_array(log2, log2 % 2 == 0), log3=np.array([None, "text"] * (self.TEST_SIZE // 2), object),
+        )
+        self.L.scalar(self.TEST_SIZE + 1, log2=1)
+        with pytest.raises(ValueError): self.L.scalars_batch([0, 1], log1=[0.])
+        self.L.flush()
+        assert self.L.L.timestep == list(range(self.TEST_SIZE + 2)) and self.L.L.is_consistent()
+        assert self.L.L.logs["log1"] == [0.] + [None if i % 3 == 0 else value for i, value in enumerate(log1)] + [None]
+        assert self.L.L.logs["log2"] == [None] + [value if value % 2 else None for value in log2] + [1]
+        assert self.L.L.logs["log3"] == [None] + [None, "text"] * (self.TEST_SIZE // 2) + [None]
+        assert Log.load(f"{self.temp_folder.name}/{self.L.L.name}/.log") == self.L.L
+        stats = RollingStats(10)
+        for value in [0., *log1[~np.isnan(log1)]]: stats.update(value)
+        assert self.L.running_stats(10)["log1"] == pytest.approx(stats.to_dict())
+        
+    def test_histogram(self):
+        values = np.random.standard_normal((10, 1000)) * 2 + 1
+        for i in range(10): self.L.histogram(i, "weights", values[i])
+        self.L.flush()
+        L = Log.load(f"{self.temp_folder.name}/{self.L.L.name}/.log")
+        assert L == self.L.L
+        timestep, sketch = L.histograms["weights"][3]
+        assert timestep == 3 and sketch.count == 1000 and sketch.min == values[3].min()
+        assert sketch.quantile(0.5) == pytest.approx(np.quantile(values[3], 0.5), rel=0.05)
+        merged = Log.merge({0: L, 1: L})
+        assert merged.histograms["weights"][0][1].count == 2000
+    
+    def test_running_stats(self):
+        values = [random() for _ in range(self.TEST_SIZE)]
+        for i, value in enumerate(values[:50]): self.L.scalar(i, log1=value, log2=None)
+        assert self.L.running_stats(10)["log1"]["mean"] == pytest.approx(sum(values[40:50]) / 10)
+        for i, value in enumerate(values[50:], 50): self.L.scalar(i, log1=value, log2=None if i % 3 else i)
+        stats = self.L.running_stats(10)
+        assert stats["log1"]["mean"] == pytest.approx(sum(values[-10:]) / 10)
+        assert (stats["log1"]["min"], stats["log1"]["max"], stats["log1"]["last"]) == (min(values[-10:]), max(values[-10:]), values[-1])
+        assert stats["log2"]["mean"] == pytest.approx(sum(range(72, 100, 3)) / 10)
+        assert stats["log2"]["ema"] is not None
+        
+    def test_running_stats_thread(self):
+        stats, stop = RollingStats(3), Event()
+        def update():
+            i = 0
+            while not stop.is_set():
+                stats.update(i % 7)
+                i += 1
+        thread, switch_interval = Thread(target=update), sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        thread.start()
+        try:
+            for _ in range(20000):
+                snapshot = stats.to_dict()
+                assert snapshot["count"] == 0 or snapshot["min"] <= snapshot["mean"] <= snapshot["max"]
+        finally:
+            stop.set()
+            thread.join()
+            sys.setswitchinterval(switch_interval)
+        
+    def test_summary(self):
+        values = np.random.standard_normal(1000)
+        summary = Summary()
+        summary.update(values[:300], np.arange(300))
+        summary.update(np.r_[values[300:], np.nan], np.arange(300, 1001))
+        assert summary.count == 1000 and summary.last == values[-1]
+        assert summary.mean == pytest.approx(values.mean()) and summary.std == pytest.approx(values.std(ddof=1))
+        assert (summary.min, summary.argmin, summary.max, summary.argmax) == (values.min(), values.argmin(), values.max(), values.argmax())
+        small_batches = Summary()
+        for start in range(0, 1000, 7): small_batches.update(values[start:start + 7], np.arange(start, min(start + 7, 1000)))
+        assert small_batches.mean == pytest.approx(summary.mean) and small_batches.std == pytest.approx(summary.std)
+        assert (small_batches.min, small_batches.argmin, small_batches.last) == (summary.min, summary.argmin, summary.last)
+        assert small_batches.sketch.quantile(0.5) == summary.sketch.quantile(0.5)
+        
+    def test_instrument(self):
+        assert self.L.stats() == {} and self.L.export_stats() == ""
+        folder_path = self.temp_folder.name + "/"
+        with Logger("instrumented", folder_path=folder_path, image_workers=1, instrument_interval=0.) as L:
+            for i in range(self.TEST_SIZE): L.scalar(i, log1=i)
+            L.image(0, np.zeros((4, 4)), "image1", "HW")
+            L.flush()
+            stats = L.stats()
+            assert stats["scalar"]["count"] == self.TEST_SIZE and stats["image"]["count"] == 1
+            assert 0 < stats["scalar"]["p50_seconds"] <= stats["scalar"]["max_seconds"]
+            assert stats["rows_written"] == self.TEST_SIZE and stats["bytes_written"] > 0
+            assert stats["image_bytes_written"] == getsize(f"{folder_path}instrumented/images/image1_0.png")
+            assert stats["queue_depth"] == stats["image_queue_depth"] == stats["images_dropped"] == 0
+            text = L.export_stats(f"{folder_path}deeplogs.prom")
+        assert open(f"{folder_path}deeplogs.prom").read() == text
+        assert "# TYPE deeplogs_scalar_seconds summary" in text
+        assert f'deeplogs_scalar_seconds_count{{session="instrumented"}} {self.TEST_SIZE}' in text
+        assert '# TYPE deeplogs_bytes_written_total counter' in text
+        assert L.L.logs["_deeplogs/scalar/count"] == [None] + list(range(1, self.TEST_SIZE))
+        
     def test_image(self):
         img = np.random.random((self.TEST_SIZE, self.TEST_SIZE))
         self.L.image(0., img, "image1", "HW")
@@ -109,6 +351,63 @@ class TestLogger():
         self.L.image(0., img[None].repeat(3,0)[None].repeat(4,0), "image3", "NCHW")
         assert exists(f"{self.temp_folder.name}/{self.L.L.name}/images/image3_0.0.png")
         
+    def test_image_grid(self):
+        img = np.random.random((5, 3, 20, 30)).astype(np.float16)
+        grid = prepare_image(img, "NCHW", padding=2, border=1, pad_value=255)
+        assert grid.shape == (2*20 + 2 + 2, 3*30 + 2*2 + 2, 3) and grid.dtype == np.uint8
+        assert (grid[1:21, 33:63] == (img[1].transpose(1, 2, 0).astype(np.float32) * 255).astype(np.uint8)).all()
+        assert (grid[0] == 255).all() and (grid[23:43, 65:95] == 255).all()
+        img = np.random.randint(0, 256, (2, 20, 30), np.uint8)
+        assert (prepare_image(img, "NHW")[:, 30:] == img[1]).all()
+        grid = prepare_image(img.astype(np.float32) - 100, "NHW", normalize="minmax")
+        assert grid.min() == 0 and grid.max() == 255
+        grid = prepare_image(img, "NHW", normalize=(0, 127.5))
+        assert (grid[:, :30] == np.minimum(img[0].astype(np.float32) * 2, 255).astype(np.uint8)).all()
+        mask = img > 127
+        assert (prepare_image(mask, "NHW") == mask.transpose(1, 0, 2).reshape(20, 60) * 255).all()
+    
+    def test_image_async(self):
+        img = np.random.random((4, 3, self.TEST_SIZE, self.TEST_SIZE))
+        with Logger("name3", folder_path=self.temp_folder.name + "/", image_workers=2) as L:
+            for i in range(10): L.image(i, img, "image1", "NCHW")
+            L.flush()
+            assert all(exists(f"{self.temp_folder.name}/name3/images/image1_{i}.png") for i in range(10))
+        with Logger("name4", folder_path=self.temp_folder.name + "/", image_workers=1, image_queue_size=1, image_policy="drop") as L:
+            for i in range(10): L.image(i, img, "image1", "NCHW")
+        assert L.dropped_images > 0
+    
+    def test_image_packed(self):
+        img = np.random.random((3, self.TEST_SIZE, self.TEST_SIZE)).astype(np.float32)
+        folder_path = self.temp_folder.name + "/"
+        for codec in ["png", "webp"]:
+            with Logger(f"packed_{codec}", folder_path=folder_path, image_store="packed", image_codec=codec) as L:
+                for i in range(10): L.image(i, img, "image1", "CHW")
+                L.image(0, img[:, ::-1], "image1", "CHW")
+            images = ImageStore.read(f"{folder_path}packed_{codec}/images/", "image1")
+            assert [timestep for timestep, _ in images] == [0] + list(range(10))
+            assert (images[0][1] == (img.transpose(1, 2, 0) * 255).astype(np.uint8)).all()
+            assert (images[1][1] == images[0][1][::-1]).all() or codec == "webp"
+        with Logger("packed_async", folder_path=folder_path, image_workers=2, image_executor="process", image_store="packed") as L:
+            for i in range(10): L.image(i, img, "image1", "CHW")
+        assert [timestep for timestep, _ in ImageStore.read(f"{folder_path}packed_async/images/", "image1", (2, 5))] == [2, 3, 4]
+        assert sorted(listdir(f"{folder_path}packed_async/images/")) == ["image1.dat", "image1.idx"]
+    
+    def test_image_packed_restart(self):
+        folder_path = self.temp_folder.name + "/"
+        for value in [0., 0.5]:
+            with Logger("restarted", folder_path=folder_path, image_store="packed") as L:
+                L.image(0, np.full((4, 4), value), "image1", "HW")
+        images = ImageStore.read(f"{folder_path}restarted/images/", "image1")
+        assert len(images) == 1 and images[0][1].mean() == 127
+    
+    def test_image_packed_zstd(self):
+        pytest.importorskip("zstandard")
+        img = np.random.random((self.TEST_SIZE, self.TEST_SIZE, 3)).astype(np.float32)
+        with Logger("packed_zstd", folder_path=self.temp_folder.name + "/", image_store="packed", image_codec="zstd") as L:
+            L.image(0, img, "image1", "HWC")
+        images = ImageStore.read(f"{self.temp_folder.name}/packed_zstd/images/", "image1")
+        assert (images[0][1] == (img * 255).astype(np.uint8)).all()
+    
     def test_scalar_inconsistancy(self):
         # https://github.com/GuyChahine/deeplogs/issues/3#issue-1841820163
         temp_file_path = f"{self.temp_folder.name}/name1/.log"
@@ -1,13 +1,20 @@
 from tempfile import TemporaryDirectory
-from time import sleep
 from random import random
+from os import remove
+from os.path import getsize
 import pandas as pd
+import numpy as np
+import pytest
 from plotly import io
 import matplotlib.pyplot as plt
 import matplotlib
 
 from deeplogs import Logger
 from deeplogs import Reader
+from deeplogs import Log
+from deeplogs import logger
+from deeplogs._storage import read_record, read_index, read_manifest
+from deeplogs._decimate import DOWNSAMPLE
 
 
 class TestReader():
@@ -33,10 +40,15 @@ class TestReader():
                 self.HYPERPARAM,
                 self.temp_folder.name + "/",
                 self.SAVE_INTERVAL,
+                image_store="packed" if n % 2 else "files",
             )
             for i in range(self.TEST_SIZE):
                 L.scalar(i, **{"log1": random(), "log2": random()})
-        sleep(self.SAVE_INTERVAL + 0.1)
+            for i in range(3):
+                L.image(i, np.full((2, 4, 4), i / 4), "image1", "HWN")
+            for i in range(5):
+                L.histogram(i, "weights", np.random.standard_normal(10000))
+            L.close()
             
         self.R = Reader([], self.temp_folder.name + "/")
     
@@ -44,20 +56,175 @@ class TestReader():
         del self.R
         self.temp_folder.cleanup()
     
+    def test_load(self):
+        R = Reader([f"{self.NAME}1", "missing"], self.temp_folder.name + "/", progress=True)
+        with pytest.warns(UserWarning):
+            assert len(R.LS) == 1
+        assert R.log_names == [f"{self.NAME}1"]
+        R = Reader([], self.temp_folder.name + "/", executor="process")
+        assert [L.name for L in R.LS] == R.log_names
+        
     def test_describe(self):
         percentiles = [0.1, 0.2, 0.3, 0.4, 0.5]
         df = self.R.describe(percentiles=percentiles)
         assert type(df) == pd.DataFrame
         assert (df.shape[0] / self.NB_VERSION) == (5 + len(percentiles))
         assert df.shape[1] == 2
+        exact = self.R.describe(percentiles=percentiles, exact=True)
+        assert (df.index == exact.index).all()
+        labels = [f"{int(percentile * 100)}%" for percentile in percentiles]
+        pd.testing.assert_frame_equal(df.drop(index=labels, level=1), exact.drop(index=labels, level=1), check_dtype=False)
+        assert np.allclose(df.to_numpy(), exact.to_numpy(), atol=0.1)
         
     def test_infos(self):
         infos = self.R.infos()
         assert type(infos) == pd.DataFrame
         assert infos.shape == (self.NB_VERSION, 1 + len(self.HYPERPARAM))
         
+    def test_images(self):
+        images = self.R.images("image1")
+        assert len(images) == self.NB_VERSION * 3
+        assert all(img.shape == (4, 8) and (img == int(timestep / 4 * 255)).all() for _, timestep, img in images)
+        assert [(name, timestep) for name, timestep, _ in self.R.images("image1", (1, 3), [f"{self.NAME}2"])] == [
+            (f"{self.NAME}2", 1.), (f"{self.NAME}2", 2.),
+        ]
+        assert [(name, timestep) for name, timestep, _ in self.R.images("image1", [0], [f"{self.NAME}1"])] == [(f"{self.NAME}1", 0.)]
+        assert self.R.images("missing") == []
+        
+    def test_shards(self):
+        with TemporaryDirectory(dir="./") as folder_path:
+            loggers = [Logger("ranks", folder_path=folder_path + "/", rank=rank) for rank in range(2)]
+            for i in range(self.TEST_SIZE):
+                loggers[0].scalar(i, log1=1)
+                loggers[1].scalar(i + 0.5, log1=3)
+            loggers[0].scalar(self.TEST_SIZE, log1=5)
+            for L in loggers: L.flush()
+            R = Reader([], folder_path + "/", reduce="sum")
+            assert R.log_names == ["ranks"]
+            assert len(R.LS[0].timestep) == 2 * self.TEST_SIZE + 1
+            loggers[1].scalar(self.TEST_SIZE, log1=3)
+            for L in loggers: L.close()
+            assert R.refresh() == ["ranks"]
+            assert R.LS[0].logs["log1"][-1] == 8
+            with Logger("late", folder_path=folder_path + "/", rank=0) as L: L.scalar(0, x=1)
+            R = Reader([], folder_path + "/", reduce="mean")
+            assert R.load(["late"])[0].logs["x"] == [1.]
+            with Logger("late", folder_path=folder_path + "/", rank=1) as L: L.scalar(0, x=3)
+            assert R.refresh() == ["late"]
+            assert R.load(["late"])[0].logs["x"] == [2.]
+            
+    def test_arrow(self):
+        pytest.importorskip("pyarrow")
+        table = self.R.to_arrow(logs=["log1"])
+        assert table.column_names == ["name", "timestep", "log1"] and len(table) == self.NB_VERSION * self.TEST_SIZE
+        L = self.R.LS[0]
+        assert table.slice(0, self.TEST_SIZE)["log1"].to_pylist() == L.logs["log1"].values.tolist()
+        for file_name in ["logs.arrow", "logs.parquet"]:
+            self.R.to_arrow(f"{self.temp_folder.name}/{file_name}")
+            table = Reader.read_arrow(f"{self.temp_folder.name}/{file_name}", ["log2"], [f"{self.NAME}2"])
+            assert table.column_names == ["name", "timestep", "log2"] and len(table) == self.TEST_SIZE
+            df = table.to_pandas()
+            assert (df["log2"].to_numpy() == self.R.LS[1].logs["log2"].values.values).all()
+        self.R.to_parquet(f"{self.temp_folder.name}/logs.data")
+        assert len(Reader.read_arrow(f"{self.temp_folder.name}/logs.data".replace(".data", ".parquet"))) == len(table) * self.NB_VERSION
+        
+    def test_smooth(self):
+        curves = self.R.smooth(smooth_perc=0.9)
+        assert len(curves) == self.NB_VERSION * 2
+        for (name, log), curve in curves.items():
+            L = next(L for L in self.R.LS if L.name == name)
+            expected = L.scalar_to_dataframe().loc[name, log].dropna().ewm(alpha=0.1).mean()
+            pd.testing.assert_series_equal(curve, expected, check_names=False, check_index_type=False)
+        assert all(self.R.smooth(smooth_perc=0.9)[key] is curve for key, curve in curves.items())
+        self.R.CACHE_BYTES = 0
+        curves = self.R.smooth(smooth_perc=0.9)
+        assert not any(self.R.smooth(smooth_perc=0.9)[key] is curve for key, curve in curves.items())
+        del self.R.CACHE_BYTES
+        
     def test_scalar(self):
         io.renderers.default = None
         self.R.scalar(using="plotly")
         plt.ion()
-        self.R.scalar(using="matplotlib")
\ No newline at end of file
+        self.R.scalar(using="matplotlib")
+        self.R.scalar(using="plotly", max_points=10, downsample="lttb")
+        self.R.scalar(using="matplotlib", max_points=10, downsample="minmax")
+        
+    def test_downsample(self):
+        x = np.r_[np.arange(100), np.arange(50, 150)].astype(float)
+        y = np.sin(x / 7) + np.r_[np.zeros(100), np.ones(100)]
+        order = np.argsort(x, kind="stable")
+        for downsample in DOWNSAMPLE.values():
+            kept, kept_sorted = downsample(x, y, 20), order[downsample(x[order], y[order], 20)]
+            assert len(kept) <= 20 and (np.diff(kept) > 0).all()
+            assert sorted(zip(x[kept], y[kept])) == sorted(zip(x[kept_sorted], y[kept_sorted]))
+        
+    def test_distribution(self):
+        df = self.R.quantiles("weights", [0.5, 0.99])
+        assert df.shape == (self.NB_VERSION * 5, 2)
+        assert df[0.5].between(-0.1, 0.1).all() and (df[0.99] > 2).all()
+        io.renderers.default = None
+        self.R.distribution("weights", using="plotly")
+        plt.ion()
+        self.R.distribution("weights", using="matplotlib")
+        
+    def test_refresh(self):
+        with TemporaryDirectory(dir="./") as temp_folder:
+            L = Logger("live", self.DESCRIPTION, self.HYPERPARAM, temp_folder + "/", self.SAVE_INTERVAL)
+            R = Reader([], temp_folder + "/")
+            R.load()
+            assert R.refresh() == []
+            L.scalar(0, **{"log1": random()})
+            L.flush()
+            assert R.refresh() == ["live"]
+            assert R.LS[0] == L.L
+            L.scalar(1, **{"log2": random()})
+            L.close()
+            assert next(R.follow(0.)) == ["live"]
+            assert R.LS[0] == L.L == Log.load(temp_folder + "/live/.log")
+
+    def test_filter(self):
+        with TemporaryDirectory(dir="./") as temp_folder:
+            for name, lr in [("a", 1e-2), ("b", 1e-4)]:
+                with Logger(name, self.DESCRIPTION, {"lr": lr}, temp_folder + "/") as L:
+                    for i in range(self.TEST_SIZE): L.scalar(i, **{"log1": random()})
+            R = Reader([], temp_folder + "/")
+            assert R.filter("lr < 1e-3").log_names == ["b"]
+            assert R.filter("lr > 1").log_names == []
+            catalog = R.catalog()
+            assert catalog["rows"].to_list() == [self.TEST_SIZE] * 2
+            assert catalog["metrics"].to_list() == [["log1"]] * 2
+            assert catalog["last_timestep"].to_list() == [self.TEST_SIZE - 1] * 2
+    
+    def test_query(self, monkeypatch):
+        with TemporaryDirectory(dir="./") as folder_path:
+            L = Logger("restarted", folder_path=folder_path + "/", batch_size=10, compression="zlib")
+            for i in range(50): L.scalar(i, log1=i, **({"log2": -i} if i % 5 == 0 else {}))
+            for i in range(30, 60): L.scalar(i, log1=100 + i)
+            L.close()
+            path = folder_path + "/restarted/.log"
+            R = Reader([], folder_path + "/")
+            df = R.query(["log1", "log2"], 25, 35)
+            assert df.index.get_level_values(1).to_list() == list(range(25, 35)) + list(range(30, 35))
+            assert df["log1"].to_list() == list(range(25, 35)) + list(range(130, 135))
+            assert df["log2"].dropna().to_list() == [-25, -30]
+            assert R.query(["log2"], 25, 35).index.get_level_values(1).to_list() == [25, 30]
+            assert R.query(["log1"], 25, 35, keep="last")["log1"].to_list() == list(range(25, 30)) + list(range(130, 135))
+            assert len(R.query(["log2"], 50)) == 0
+            offsets = []
+            monkeypatch.setattr(logger, "read_record", lambda f, offset: offsets.append(offset) or read_record(f, offset))
+            L = Log.load_range(path, 25, 35)
+            assert L.is_consistent() and len(L.timestep) == 15
+            assert 1 < len(offsets) - 1 < len(read_index(path, read_manifest(path)))
+            assert len(Log.load_range(path, 50, logs=["log2"]).timestep) == 0
+            R.load()
+            assert R.query(["log1", "log2"], 25, 35).equals(df)
+            remove(path + ".index")
+            assert Reader([], folder_path + "/").query(["log1", "log2"], 25, 35).equals(df)
+            with Logger("truncated", folder_path=folder_path + "/") as L:
+                for i in range(50): L.scalar(i, log1=i)
+            R = Reader([], folder_path + "/")
+            with open(folder_path + "/truncated/.log", "r+b") as f: f.truncate(getsize(f.name) // 2)
+            for workers in (1, 2):
+                R.workers = workers
+                with pytest.warns(UserWarning, match="truncated"):
+                    assert R.query(["log1", "log2"], 25, 35).equals(df)